@@ -0,0 +1,244 @@
+"""Local stand-in for the preciodelaluz.org API, for load and soak tests.
+
+    python -m benchmarks.fake_api --port 8000 --latency 0.05 --error-rate 0.1
+
+Serves `/v1/prices/all?zone=ZONE&date=DD-MM-YYYY` with recorded payloads when
+there is one for the zone and date, or a synthetic day seeded by them, so every
+request for the same day gets the same body. Responses can be delayed, fail
+with a 503 at random, or be throttled with a 429 past a request rate. Bodies
+carry an ETag and conditional requests get a 304.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import generate_day
+from pvpc.adapter import DirectoryInputAdapter, NDJSONInputAdapter
+from pvpc.ratelimit import TokenBucket
+from pvpc.record import DATE_FORMAT, DayRecord
+
+PATH = "/v1/prices/all"
+ZONES = ("PCB", "CYM")
+
+
+class FakeAPIConfig(NamedTuple):
+    # Seconds every response is delayed, plus up to `jitter` more at random.
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Fraction of the requests answered with a 503.
+    error_rate: float = 0.0
+    # Requests per second served before answering 429, or None for no limit.
+    rate: Optional[float] = None
+    burst: float = 1
+    seed: int = 0
+
+
+class FakeAPIStats(NamedTuple):
+    requests: int
+    served: int
+    not_modified: int
+    errors: int
+    throttled: int
+
+
+def get_recorded_payloads(
+    days: Iterable[Mapping], zone: str = "PCB"
+) -> Dict[Tuple[str, str], bytes]:
+    """Payload bodies keyed by zone and API date."""
+    payloads = {}
+    for raw_data in days:
+        record = DayRecord.from_payload(raw_data)
+        payloads[(zone, record.date)] = json.dumps(dict(raw_data)).encode()
+    return payloads
+
+
+class FakeAPIServer:
+    """The fake API on a background thread, listening on localhost.
+
+    Use it as a context manager; `base_endpoint` is the URL to give to
+    `PrecioLuzInputAdapter`. Port 0 picks a free port.
+    """
+
+    config: FakeAPIConfig
+    payloads: Dict[Tuple[str, str], bytes]
+    server: ThreadingHTTPServer
+
+    def __init__(
+        self,
+        config: FakeAPIConfig = FakeAPIConfig(),
+        payloads: Optional[Dict[Tuple[str, str], bytes]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.config = config
+        self.payloads = payloads or {}
+        self.rng = random.Random(config.seed)
+        self.bucket = None
+        if config.rate is not None:
+            self.bucket = TokenBucket(config.rate, config.burst)
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(FakeAPIStats._fields, 0)
+
+        fake_api = self
+
+        class Handler(FakeAPIHandler):
+            api = fake_api
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+
+    @property
+    def base_endpoint(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{PATH}"
+
+    @property
+    def stats(self) -> FakeAPIStats:
+        with self.lock:
+            return FakeAPIStats(**self.counts)
+
+    def __enter__(self) -> "FakeAPIServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counts[name] += 1
+
+    def get_delay(self) -> float:
+        with self.lock:
+            return self.config.latency + self.rng.uniform(0, self.config.jitter)
+
+    def fails(self) -> bool:
+        with self.lock:
+            return self.rng.random() < self.config.error_rate
+
+    def get_payload(self, zone: str, raw_date: str) -> bytes:
+        payload = self.payloads.get((zone, raw_date))
+        if payload is None:
+            day = datetime.strptime(raw_date, DATE_FORMAT).date()
+            rng = random.Random(f"{zone}{raw_date}")
+            payload = json.dumps(generate_day(day, rng)).encode()
+        return payload
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    api: FakeAPIServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        api = self.api
+        api.count("requests")
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        zone = query.get("zone", "PCB")
+        raw_date = query.get("date", date.today().strftime(DATE_FORMAT))
+        if url.path != PATH or zone not in ZONES:
+            return self.reply(404, b'{"error": "Not Found"}')
+        try:
+            datetime.strptime(raw_date, DATE_FORMAT)
+        except ValueError:
+            return self.reply(400, b'{"error": "Bad date"}')
+
+        time.sleep(api.get_delay())
+        if api.bucket is not None and not api.bucket.try_acquire():
+            api.count("throttled")
+            return self.reply(
+                429, b'{"error": "Too Many Requests"}', {"Retry-After": "1"}
+            )
+        if api.fails():
+            api.count("errors")
+            return self.reply(503, b'{"error": "Service Unavailable"}')
+
+        payload = api.get_payload(zone, raw_date)
+        etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            api.count("not_modified")
+            return self.reply(304, b"", {"ETag": etag})
+        api.count("served")
+        return self.reply(200, payload, {"ETag": etag})
+
+    def reply(
+        self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def load_recorded(path: str) -> Dict[Tuple[str, str], bytes]:
+    if path.endswith((".ndjson", ".jsonl")):
+        with open(path, "r") as stream:
+            return get_recorded_payloads(NDJSONInputAdapter(stream).get_raw_days())
+    return get_recorded_payloads(DirectoryInputAdapter(path).get_raw_days())
+
+
+def get_config(parsed: argparse.Namespace) -> FakeAPIConfig:
+    return FakeAPIConfig(
+        latency=parsed.latency,
+        jitter=parsed.jitter,
+        error_rate=parsed.error_rate,
+        rate=parsed.rate,
+        burst=parsed.burst,
+        seed=parsed.seed,
+    )
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, help="Requests/s before 429s.")
+    parser.add_argument("--burst", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--recorded",
+        metavar="PATH",
+        help="Directory of daily JSON payloads or NDJSON file to serve.",
+    )
+
+
+def main(args: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Fake preciodelaluz.org API.")
+    parser.add_argument("--port", type=int, default=8000)
+    add_arguments(parser)
+    parsed = parser.parse_args(args)
+
+    payloads = load_recorded(parsed.recorded) if parsed.recorded else None
+    with FakeAPIServer(get_config(parsed), payloads, port=parsed.port) as server:
+        print(f"Serving {server.base_endpoint}", file=sys.stderr)
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,218 @@
+"""Load and soak tests of the API input adapters against the fake API.
+
+    python -m benchmarks.load_test --days 200 --concurrency 8 --latency 0.05
+    python -m benchmarks.load_test --duration 600 --error-rate 0.05 --rate 50
+
+Fetches a run of days with `PrecioLuzInputAdapter` on a thread pool ("sync")
+and with `AsyncPrecioLuzInputAdapter` ("async"), both through HTTPTransport's
+retries, and reports throughput and latency percentiles per fetched day. With
+`--duration`, runs are repeated until the time is up.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from math import ceil
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence
+
+from benchmarks.fake_api import (
+    FakeAPIServer,
+    add_arguments,
+    get_config,
+    load_recorded,
+)
+from pvpc.http_adapter import AsyncPrecioLuzInputAdapter, PrecioLuzInputAdapter
+from pvpc.port import InputPort
+from pvpc.transport import HTTPTransport
+
+MODES = ("sync", "async")
+
+
+class LoadTestResult(NamedTuple):
+    mode: str
+    requests: int
+    errors: int
+    seconds: float
+    latencies: List[float]
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of the latencies."""
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[max(ceil(percentile / 100 * len(latencies)), 1) - 1]
+
+    def format(self) -> str:
+        p50, p99 = self.percentile(50), self.percentile(99)
+        return (
+            f"{self.mode:<6} {self.requests:>6} requests {self.errors:>5} errors "
+            f"{self.throughput:8.1f} req/s  "
+            f"p50 {(p50 or 0) * 1e3:8.1f}ms  p99 {(p99 or 0) * 1e3:8.1f}ms"
+        )
+
+
+class TimedInputAdapter(InputPort):
+    """Times the wrapped adapter's calls. Failures are counted, not raised, so
+    one failed day doesn't end the run."""
+
+    def __init__(self, input_repo: InputPort, latencies: List[float]) -> None:
+        self.input_repo = input_repo
+        self.latencies = latencies
+        self.errors = 0
+
+    def get_raw_data(self) -> Optional[Mapping]:
+        start = time.perf_counter()
+        try:
+            return self.input_repo.get_raw_data()
+        except Exception:
+            self.errors += 1
+            return None
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+class TimedAsyncAdapter(AsyncPrecioLuzInputAdapter):
+    latencies: List[float]
+    timed_adapters: List[TimedInputAdapter]
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+        self.timed_adapters = []
+
+    def get_adapter(self, zone: str, day: Optional[date]) -> InputPort:
+        adapter = TimedInputAdapter(super().get_adapter(zone, day), self.latencies)
+        self.timed_adapters.append(adapter)
+        return adapter
+
+
+def get_days(count: int, first: date = date(2022, 1, 1)) -> List[date]:
+    return [first + timedelta(days=offset) for offset in range(count)]
+
+
+def run_sync(
+    base_endpoint: str, days: Sequence[date], concurrency: int, transport: HTTPTransport
+) -> LoadTestResult:
+    latencies: List[float] = []
+    adapters = [
+        TimedInputAdapter(
+            PrecioLuzInputAdapter(
+                day=day, transport=transport, base_endpoint=base_endpoint
+            ),
+            latencies,
+        )
+        for day in days
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(lambda adapter: adapter.get_raw_data(), adapters))
+    seconds = time.perf_counter() - start
+
+    errors = sum(adapter.errors for adapter in adapters)
+    return LoadTestResult("sync", len(days), errors, seconds, latencies)
+
+
+def run_async(
+    base_endpoint: str, days: Sequence[date], concurrency: int, transport: HTTPTransport
+) -> LoadTestResult:
+    adapter = TimedAsyncAdapter(
+        zones=("PCB",),
+        days=days,
+        max_concurrency=concurrency,
+        transport=transport,
+        base_endpoint=base_endpoint,
+    )
+    start = time.perf_counter()
+    asyncio.run(adapter.get_raw_days())
+    seconds = time.perf_counter() - start
+
+    errors = sum(timed.errors for timed in adapter.timed_adapters)
+    return LoadTestResult("async", len(days), errors, seconds, adapter.latencies)
+
+
+RUNNERS: Dict[str, Callable[..., LoadTestResult]] = {
+    "sync": run_sync,
+    "async": run_async,
+}
+
+
+def merge(results: Sequence[LoadTestResult]) -> LoadTestResult:
+    return LoadTestResult(
+        results[0].mode,
+        sum(result.requests for result in results),
+        sum(result.errors for result in results),
+        sum(result.seconds for result in results),
+        [latency for result in results for latency in result.latencies],
+    )
+
+
+def run_load_test(
+    server: FakeAPIServer,
+    modes: Sequence[str] = MODES,
+    days: int = 100,
+    concurrency: int = 8,
+    duration: float = 0.0,
+    get_transport: Callable[[int], HTTPTransport] = lambda pool_size: HTTPTransport(
+        pool_size=pool_size
+    ),
+) -> List[LoadTestResult]:
+    results = []
+    for mode in modes:
+        runs = []
+        deadline = time.perf_counter() + duration
+        while not runs or time.perf_counter() < deadline:
+            runs.append(
+                RUNNERS[mode](
+                    server.base_endpoint,
+                    get_days(days),
+                    concurrency,
+                    get_transport(concurrency),
+                )
+            )
+        results.append(merge(runs))
+    return results
+
+
+def main(args: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="PVPC adapter load test.")
+    parser.add_argument("--days", type=int, default=100, help="Days per run.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--duration", type=float, default=0.0, help="Repeat runs for this long."
+    )
+    parser.add_argument("--mode", choices=MODES, action="append")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.05)
+    add_arguments(parser)
+    parsed = parser.parse_args(args)
+
+    def get_transport(pool_size: int) -> HTTPTransport:
+        return HTTPTransport(
+            retries=parsed.retries, backoff=parsed.backoff, pool_size=pool_size
+        )
+
+    payloads = load_recorded(parsed.recorded) if parsed.recorded else None
+    with FakeAPIServer(get_config(parsed), payloads) as server:
+        results = run_load_test(
+            server,
+            parsed.mode or MODES,
+            parsed.days,
+            parsed.concurrency,
+            parsed.duration,
+            get_transport,
+        )
+        for result in results:
+            print(result.format())
+        print(f"server {server.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
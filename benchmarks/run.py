@@ -0,0 +1,119 @@
+"""Benchmarks for the daily computation, message rendering and ingestion.
+
+    python -m benchmarks.run          # compare against benchmarks/baseline.json
+    python -m benchmarks.run --save   # record a new baseline
+
+Each case is timed for a single day and for a thousand synthetic days, keeping
+the best of several repeats. A case fails when it is slower than its baseline
+by more than the tolerance.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.synthetic import generate_days
+from pvpc.adapter import TelegramOutputAdapter
+from pvpc.domain import PVPCDay
+from pvpc.record import DayRecord
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_domain(days: List[dict]) -> Callable[[], object]:
+    domain = PVPCDay(input_repo=None, output_repo=None)
+    return lambda: [domain.process(day) for day in days]
+
+
+def bench_message(days: List[dict]) -> Callable[[], object]:
+    domain = PVPCDay(input_repo=None, output_repo=None)
+    processed_days = [dict(domain.process(day)) for day in days]
+    # Rendering doesn't touch the bot, so skip building one.
+    adapter = TelegramOutputAdapter.__new__(TelegramOutputAdapter)
+    return lambda: [adapter.generate_message(day) for day in processed_days]
+
+
+def bench_ingestion(days: List[dict]) -> Callable[[], object]:
+    payloads = [json.dumps(day).encode() for day in days]
+    domain = PVPCDay(input_repo=None, output_repo=None)
+
+    def ingest():
+        for payload in payloads:
+            domain.raw_data = DayRecord.from_json(payload)
+
+    return ingest
+
+
+CASES = {
+    "domain": bench_domain,
+    "message": bench_message,
+    "ingestion": bench_ingestion,
+}
+SIZES = {"per_day": 1, "per_1000_days": 1000}
+
+
+def run_benchmarks(repeat: int) -> Dict[str, float]:
+    days = list(generate_days(max(SIZES.values()), seed=42))
+    results = {}
+    for case, bench in CASES.items():
+        for size_name, size in SIZES.items():
+            # Single day timings are too short to measure alone, so average
+            # them over a run of the same day.
+            runs = 1000 if size == 1 else 1
+            function = bench(days[:size] * runs)
+            results[f"{case}.{size_name}"] = best_time(function, repeat) / runs
+    return results
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    return [
+        f"{name}: {results[name] * 1e6:.1f}us vs baseline {baseline[name] * 1e6:.1f}us"
+        for name in sorted(results)
+        if name in baseline and results[name] > baseline[name] * (1 + tolerance)
+    ]
+
+
+def main(args: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="PVPC benchmarks.")
+    parser.add_argument("--save", action="store_true", help="Store a new baseline.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed slowdown over the baseline, as a fraction (default: 0.5).",
+    )
+    parsed = parser.parse_args(args)
+
+    results = run_benchmarks(parsed.repeat)
+    for name, seconds in sorted(results.items()):
+        print(f"{name:<28} {seconds * 1e6:12.1f}us")
+
+    if parsed.save:
+        BASELINE_PATH.write_text(json.dumps(results, indent=4, sort_keys=True) + "\n")
+        return 0
+
+    regressions = compare(
+        results, json.loads(BASELINE_PATH.read_text()), parsed.tolerance
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
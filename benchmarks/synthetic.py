@@ -0,0 +1,75 @@
+import random
+from datetime import date, timedelta
+from typing import Iterator, List, Optional
+
+from pvpc.record import DATE_FORMAT
+from pvpc.slots import MINUTES_PER_HOUR, SlotLayout, get_day_minutes
+
+CHEAP_PATTERNS = ("cheapest_6", "random", "block", "none", "all")
+
+
+def generate_prices(rng: random.Random, hours: int = 24) -> List[float]:
+    base = rng.uniform(50, 300)
+    # Night valley, morning and evening peaks plus noise, like real PVPC days.
+    shape = [0.8, 0.75, 0.7, 0.7, 0.72, 0.8, 0.95, 1.1, 1.2, 1.15, 1.05, 1.0]
+    shape += [0.95, 0.9, 0.85, 0.85, 0.9, 1.0, 1.15, 1.3, 1.35, 1.25, 1.05, 0.9]
+    # DST days skip or repeat the 02-03 hour.
+    if hours == 23:
+        del shape[2]
+    elif hours == 25:
+        shape.insert(2, shape[2])
+    return [
+        round(max(0.0, base * factor + rng.gauss(0, base * 0.05)), 2)
+        for factor in shape
+    ]
+
+
+def generate_cheap_flags(
+    prices: List[float], pattern: str, rng: random.Random
+) -> List[bool]:
+    hours = len(prices)
+    if pattern == "cheapest_6":
+        cheapest = set(sorted(range(hours), key=prices.__getitem__)[:6])
+        return [hour in cheapest for hour in range(hours)]
+    if pattern == "random":
+        return [rng.random() < 0.25 for _ in range(hours)]
+    if pattern == "block":
+        start = rng.randrange(hours - 6)
+        return [start <= hour < start + 6 for hour in range(hours)]
+    if pattern == "none":
+        return [False] * hours
+    if pattern == "all":
+        return [True] * hours
+    raise ValueError(f"Unknown is-cheap pattern {pattern}.")
+
+
+def generate_day(day: date, rng: random.Random, pattern: Optional[str] = None) -> dict:
+    layout = SlotLayout.for_day(day, get_day_minutes(day) // MINUTES_PER_HOUR)
+    prices = generate_prices(rng, layout.count)
+    flags = generate_cheap_flags(prices, pattern or rng.choice(CHEAP_PATTERNS), rng)
+    average = sum(prices) / layout.count
+    raw_date = day.strftime(DATE_FORMAT)
+
+    return {
+        hour_key: {
+            "date": raw_date,
+            "hour": hour_key,
+            "is-cheap": flags[hour],
+            "is-under-avg": prices[hour] < average,
+            "market": "PVPC",
+            "price": prices[hour],
+            "units": "€/Mwh",
+        }
+        for hour, hour_key in enumerate(layout.keys)
+    }
+
+
+def generate_days(
+    count: int,
+    start: date = date(2015, 1, 1),
+    seed: int = 0,
+    pattern: Optional[str] = None,
+) -> Iterator[dict]:
+    rng = random.Random(seed)
+    for offset in range(count):
+        yield generate_day(start + timedelta(offset), rng, pattern)
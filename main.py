@@ -1,19 +1,556 @@
+import argparse
+import os
 import sys
+import tempfile
+from contextlib import ExitStack
+from datetime import date, timedelta
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 
-from pvpc.adapter import PrecioLuzInputAdapter, TelegramOutputAdapter
+from pvpc.adapter import (
+    DirectoryInputAdapter,
+    FileInputAdapter,
+    MessageOutputAdapter,
+    NDJSONInputAdapter,
+    NDJSONOutputAdapter,
+)
+from pvpc.batch import PVPCBatch
 from pvpc.domain import PVPCDay
+from pvpc.export import EXPORT_FORMATS, TABLES, ExportOutputAdapter
+from pvpc.instrumentation import (
+    Instrumentation,
+    JSONLogExporter,
+    PrometheusTextfileExporter,
+)
+from pvpc.port import (
+    AsyncInputPort,
+    BatchInputPort,
+    BatchOutputPort,
+    InputPort,
+    OutputPort,
+)
+from pvpc.record import ZONES
+from pvpc.slots import get_spanish_today
+from pvpc.stats import StatisticsStore
 
-def main(token: str, channel: str):
-    input_repo = PrecioLuzInputAdapter()
-    output_repo = TelegramOutputAdapter(token=token, channel=channel)
+WATCH_CACHE = "pvpc-watch-cache"
+WATCH_DAYS = {"today": 0, "tomorrow": 1}
 
-    domain = PVPCDay(input_repo=input_repo, output_repo=output_repo)
+
+# The HTTP and Telegram clients take longer to import than the whole report
+# takes to compute, so they are only imported by the runs that use them.
+def get_input_repo(
+    input_path: Optional[str],
+    instrumentation: Optional[Instrumentation] = None,
+    watch_day: Optional[date] = None,
+) -> InputPort:
+    if input_path is not None:
+        return FileInputAdapter(input_path)
+
+    from pvpc.http_adapter import PrecioLuzInputAdapter
+    from pvpc.transport import HTTPTransport
+
+    transport = HTTPTransport(instrumentation=instrumentation)
+    if watch_day is None:
+        return PrecioLuzInputAdapter(transport=transport)
+
+    from pvpc.cache import ResponseCache
+    from pvpc.watcher import PublicationWatcher
+
+    # Every poll revalidates the cached response, so unchanged ones are 304s.
+    cache = ResponseCache(os.path.join(tempfile.gettempdir(), WATCH_CACHE), ttl=0)
+    return PublicationWatcher(
+        watch_day,
+        lambda day: PrecioLuzInputAdapter(cache=cache, day=day, transport=transport),
+    )
+
+
+def get_zones_input_repo(
+    zones: Sequence[str], instrumentation: Optional[Instrumentation] = None
+) -> AsyncInputPort:
+    from pvpc.http_adapter import AsyncPrecioLuzInputAdapter
+    from pvpc.transport import HTTPTransport
+
+    return AsyncPrecioLuzInputAdapter(
+        zones, transport=HTTPTransport(instrumentation=instrumentation)
+    )
+
+
+def main(
+    token: str,
+    channel: str,
+    instrumentation: Optional[Instrumentation] = None,
+    input_path: Optional[str] = None,
+    stats_path: Optional[str] = None,
+    outbox_path: Optional[str] = None,
+    drain_only: bool = False,
+    watch_day: Optional[date] = None,
+    zones: Optional[Sequence[str]] = None,
+):
+    from pvpc.telegram_adapter import TelegramFanOutOutputAdapter, TelegramOutputAdapter
+
+    channels = channel.split(",")
+    if outbox_path is not None:
+        from pvpc.outbox import Outbox, OutboxOutputAdapter
+
+        with Outbox(outbox_path) as outbox:
+            if not drain_only and zones is not None:
+                output_repos = {
+                    zone: OutboxOutputAdapter(outbox, channels, zone, watch_day)
+                    for zone in zones
+                }
+                run_zones(output_repos, instrumentation)
+            elif not drain_only:
+                output_repo = OutboxOutputAdapter(outbox, channels, day=watch_day)
+                run_day(output_repo, instrumentation, input_path, stats_path, watch_day)
+            sender = TelegramFanOutOutputAdapter(token=token, channels=channels)
+            report = outbox.drain(sender.send)
+        print(f"Sent {report.sent} messages, {report.pending} pending.")
+        if report.failed:
+            sys.exit(f"{report.failed} messages failed to send.")
+        return
+
+    def get_output_repo() -> OutputPort:
+        if len(channels) > 1:
+            return TelegramFanOutOutputAdapter(
+                token=token, channels=channels, day=watch_day
+            )
+        return TelegramOutputAdapter(token=token, channel=channel, day=watch_day)
+
+    if zones is not None:
+        run_zones({zone: get_output_repo() for zone in zones}, instrumentation)
+    else:
+        output_repo = get_output_repo()
+        run_day(output_repo, instrumentation, input_path, stats_path, watch_day)
+
+
+def run_zones(
+    output_repos: Dict[str, OutputPort],
+    instrumentation: Optional[Instrumentation] = None,
+):
+    from pvpc.zones import PVPCZones
+
+    input_repo = get_zones_input_repo(list(output_repos), instrumentation)
+    PVPCZones(input_repo=input_repo, output_repos=output_repos).run()
+
+
+def run_day(
+    output_repo: OutputPort,
+    instrumentation: Optional[Instrumentation] = None,
+    input_path: Optional[str] = None,
+    stats_path: Optional[str] = None,
+    watch_day: Optional[date] = None,
+):
+    store = StatisticsStore(stats_path) if stats_path else None
+    domain = PVPCDay(
+        input_repo=get_input_repo(input_path, instrumentation, watch_day),
+        output_repo=output_repo,
+        instrumentation=instrumentation,
+        statistics=store and store.load(),
+    )
     domain.run()
+    if store is not None:
+        store.save(domain.statistics)
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        raise Exception(
-            f"Less arguments ({len(sys.argv) - 1}) than expected. "
+
+def export_day(
+    output: str,
+    export_table: str,
+    export_format: Optional[str] = None,
+    append: bool = False,
+    instrumentation: Optional[Instrumentation] = None,
+    input_path: Optional[str] = None,
+    stats_path: Optional[str] = None,
+    watch_day: Optional[date] = None,
+):
+    output_repo = ExportOutputAdapter(
+        output, export_table, export_format, append=append
+    )
+    run_day(output_repo, instrumentation, input_path, stats_path, watch_day)
+
+
+def dry_run(
+    input_path: Optional[str],
+    instrumentation: Optional[Instrumentation] = None,
+    stats_path: Optional[str] = None,
+    watch_day: Optional[date] = None,
+    zones: Optional[Sequence[str]] = None,
+):
+    if zones is not None:
+        run_zones(
+            {zone: MessageOutputAdapter(sys.stdout, day=watch_day) for zone in zones},
+            instrumentation,
+        )
+        return
+
+    # Compares with the saved statistics but leaves them as they were.
+    PVPCDay(
+        input_repo=get_input_repo(input_path, instrumentation, watch_day),
+        output_repo=MessageOutputAdapter(sys.stdout, day=watch_day),
+        instrumentation=instrumentation,
+        statistics=StatisticsStore(stats_path).load() if stats_path else None,
+    ).run()
+
+
+def serve(address: str, instrumentation: Optional[Instrumentation] = None):
+    import asyncio
+
+    import requests
+
+    from pvpc.http_adapter import PrecioLuzInputAdapter
+    from pvpc.service import DayCache, ReportService
+    from pvpc.transport import HTTPTransport
+
+    transport = HTTPTransport(instrumentation=instrumentation)
+
+    def load_day(day: date) -> Mapping:
+        try:
+            return PrecioLuzInputAdapter(day=day, transport=transport).get_raw_data()
+        except requests.HTTPError as error:
+            if error.response is not None and error.response.status_code == 404:
+                raise LookupError(day.isoformat()) from error
+            raise
+
+    host, _, port = address.rpartition(":")
+    service = ReportService(DayCache(load_day))
+    try:
+        asyncio.run(service.serve(host or "127.0.0.1", int(port)))
+    except KeyboardInterrupt:
+        pass
+
+
+def is_batch_source(source: str) -> bool:
+    if source == "-" or os.path.isdir(source):
+        return True
+    return os.path.isfile(source) and source.endswith((".ndjson", ".jsonl"))
+
+
+def get_batch_input_repo(source: str, stack: ExitStack) -> BatchInputPort:
+    if source == "-":
+        return NDJSONInputAdapter(sys.stdin)
+    if source.endswith((".ndjson", ".jsonl")):
+        return NDJSONInputAdapter(stack.enter_context(open(source, "r")))
+    return DirectoryInputAdapter(source)
+
+
+def parse_batch_source(source: str) -> Tuple[Optional[str], str]:
+    """Zone and path of a `[ZONE=]SOURCE` batch source. Zones never contain
+    `=`, so it splits at the first one and the path may have more."""
+    if "=" not in source:
+        return None, source
+    zone, _, path = source.partition("=")
+    if not zone or not path:
+        raise ValueError(f"Expected ZONE=SOURCE, got {source!r}.")
+    return zone, path
+
+
+def batch(
+    sources: List[Tuple[Optional[str], str]],
+    output: str,
+    instrumentation: Optional[Instrumentation] = None,
+    processes: Optional[int] = None,
+    stats_path: Optional[str] = None,
+    export_table: Optional[str] = None,
+    export_format: Optional[str] = None,
+    append: bool = False,
+):
+    with ExitStack() as stack:
+        input_repos = {}
+        for zone, path in sources:
+            input_repos[zone] = get_batch_input_repo(path, stack)
+
+        output_repo: BatchOutputPort
+        if export_table is not None:
+            output_repo = ExportOutputAdapter(
+                output, export_table, export_format, append=append
+            )
+        elif output == "-":
+            output_repo = NDJSONOutputAdapter(sys.stdout)
+        else:
+            output_repo = NDJSONOutputAdapter(stack.enter_context(open(output, "w")))
+
+        if processes is None and list(input_repos) == [None]:
+            store = StatisticsStore(stats_path) if stats_path else None
+            serial_batch = PVPCBatch(
+                input_repo=input_repos[None],
+                output_repo=output_repo,
+                instrumentation=instrumentation,
+                statistics=store and store.load(),
+            )
+            serial_batch.run()
+            if store is not None:
+                store.save(serial_batch.statistics)
+            return
+
+        # Only backfills on several processes pay for importing multiprocessing.
+        from pvpc.parallel import PVPCParallelBatch
+
+        report = PVPCParallelBatch(
+            input_repos=input_repos,
+            output_repo=output_repo,
+            processes=processes,
+            instrumentation=instrumentation,
+        ).run()
+        print(
+            f"Processed {report.days} days in {report.shards} shards on "
+            f"{report.processes} processes, {report.days_per_second:.0f} days/s.",
+            file=sys.stderr,
+        )
+
+
+def get_watch_day(watch: Optional[str]) -> Optional[date]:
+    if watch is None:
+        return None
+    # The day in Spain, as runners are on UTC.
+    return get_spanish_today() + timedelta(days=WATCH_DAYS[watch])
+
+
+def parse_args(args: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PVPC daily report.")
+    parser.add_argument("token", nargs="?", help="Telegram bot token.")
+    parser.add_argument(
+        "channel", nargs="?", help="Telegram channel, or comma-separated channels."
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="[ZONE=]SOURCE",
+        action="append",
+        help="Process a directory of daily JSON payloads or an NDJSON file "
+        "(`-` for stdin) instead of posting today's report. Repeat it with "
+        "ZONE= prefixes to process several zones.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="Process batches on this many processes (default: serially, or one "
+        "per core when several zones are given).",
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="NDJSON file where batch results, or exported tables, are written "
+        "(default: stdout).",
+    )
+    parser.add_argument(
+        "--export-table",
+        choices=tuple(TABLES),
+        help="Write a table of batch results to --output instead: hourly "
+        "`prices`, 3h `windows` or a daily `summary`. Without --batch, the "
+        "day's table is written instead of posting its report.",
+    )
+    parser.add_argument(
+        "--export-format",
+        choices=EXPORT_FORMATS,
+        help="Format of the exported table (default: from the --output "
+        "extension, or CSV). Parquet needs pyarrow.",
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Add the exported rows to an existing --output. Parquet exports "
+        "are a directory, with a file added per run.",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="[HOST:]PORT",
+        help="Serve reports over HTTP instead of posting today's report.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the message on stdout instead of posting it.",
+    )
+    parser.add_argument(
+        "--input",
+        metavar="FILE",
+        help="Read the day's JSON payload from FILE instead of the API.",
+    )
+    parser.add_argument(
+        "--watch",
+        nargs="?",
+        const="today",
+        choices=tuple(WATCH_DAYS),
+        help="Wait for the day's prices (default: today) to be published, "
+        "polling the API, and report them as soon as they are complete.",
+    )
+    parser.add_argument(
+        "--zones",
+        metavar="ZONE,...",
+        type=lambda zones: zones.split(","),
+        help=f"Report these comma-separated zones, fetched concurrently, instead "
+        f"of the PCB one. Zones: {', '.join(ZONES)}.",
+    )
+    parser.add_argument(
+        "--outbox",
+        metavar="PATH",
+        help="Store the messages in the SQLite outbox at PATH and send them from "
+        "there. Days already in the outbox are not fetched again.",
+    )
+    parser.add_argument(
+        "--drain",
+        action="store_true",
+        help="Only send the messages pending in the outbox.",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="PATH",
+        help="Compare days with the price statistics saved in PATH, and add "
+        "them to it (except on dry runs).",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Profile the run with cProfile and write the report to PATH.",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        action="store_true",
+        help="Log per-stage timings as a JSON line on stderr.",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="PATH",
+        help="Write per-stage timings to PATH in Prometheus text format.",
+    )
+    parser.add_argument(
+        "--trace-allocations",
+        action="store_true",
+        help="Also measure memory allocated per stage (slower).",
+    )
+    parsed = parser.parse_args(args)
+
+    needs_bot = (
+        parsed.batch is None
+        and parsed.serve is None
+        and parsed.export_table is None
+        and not parsed.dry_run
+    )
+    if needs_bot and (parsed.token is None or parsed.channel is None):
+        parser.error(
+            f"Less arguments ({len(args)}) than expected. "
             "Expected `token` and `channel` strings."
         )
-    main(token=sys.argv[1], channel=sys.argv[2])
\ No newline at end of file
+    if parsed.batch is not None:
+        try:
+            parsed.batch = [parse_batch_source(source) for source in parsed.batch]
+        except ValueError as error:
+            parser.error(str(error))
+        zones = [zone for zone, _ in parsed.batch]
+        if len(zones) > 1 and None in zones:
+            parser.error("Several --batch sources need a ZONE= prefix each.")
+        if len(set(zones)) < len(zones):
+            parser.error("--batch zones must be different.")
+        for _, path in parsed.batch:
+            if not is_batch_source(path):
+                parser.error(
+                    f"--batch {path} isn't a directory of daily JSON payloads, "
+                    "an NDJSON file or `-`."
+                )
+    parallel = parsed.batch is not None and (
+        parsed.processes is not None or len(parsed.batch) > 1
+    )
+    if parsed.watch and parsed.input:
+        parser.error("--watch polls the API, it can't read an --input file.")
+    if parsed.zones is not None:
+        unknown = [zone for zone in parsed.zones if zone not in ZONES]
+        if unknown:
+            parser.error(f"Unknown zones {', '.join(unknown)}.")
+        if len(set(parsed.zones)) < len(parsed.zones):
+            parser.error("--zones must be different.")
+        for option in ("input", "watch", "stats"):
+            if getattr(parsed, option):
+                parser.error(
+                    f"--{option} reports a single zone, it can't take --zones."
+                )
+    if parsed.drain and parsed.outbox is None:
+        parser.error("--drain needs an --outbox.")
+    if parsed.append and parsed.export_table is None:
+        parser.error("--append needs an --export-table.")
+    if parsed.export_format and parsed.export_table is None:
+        parser.error("--export-format needs an --export-table.")
+    if parsed.export_table and parsed.batch is None:
+        for option in ("serve", "dry_run", "outbox", "zones"):
+            if getattr(parsed, option):
+                parser.error(
+                    f"--{option.replace('_', '-')} can't export a table, "
+                    "only --batch and the daily job can."
+                )
+    if parsed.stats and parallel:
+        parser.error("--stats needs days in order, it can't run on several processes.")
+    return parsed
+
+
+def run(args: argparse.Namespace):
+    exporters = []
+    if args.metrics_json:
+        exporters.append(JSONLogExporter(sys.stderr))
+    if args.metrics_textfile:
+        exporters.append(PrometheusTextfileExporter(args.metrics_textfile))
+    instrumentation = None
+    if exporters or args.trace_allocations:
+        instrumentation = Instrumentation(trace_allocations=args.trace_allocations)
+
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        if args.batch is not None:
+            batch(
+                args.batch,
+                args.output,
+                instrumentation,
+                args.processes,
+                args.stats,
+                args.export_table,
+                args.export_format,
+                args.append,
+            )
+        elif args.serve is not None:
+            serve(args.serve, instrumentation)
+        elif args.export_table is not None:
+            export_day(
+                args.output,
+                args.export_table,
+                args.export_format,
+                args.append,
+                instrumentation,
+                args.input,
+                args.stats,
+                get_watch_day(args.watch),
+            )
+        elif args.dry_run:
+            dry_run(
+                args.input,
+                instrumentation,
+                args.stats,
+                get_watch_day(args.watch),
+                args.zones,
+            )
+        else:
+            main(
+                args.token,
+                args.channel,
+                instrumentation,
+                args.input,
+                args.stats,
+                args.outbox,
+                args.drain,
+                get_watch_day(args.watch),
+                args.zones,
+            )
+    finally:
+        if profiler is not None:
+            import pstats
+
+            profiler.disable()
+            with open(args.profile, "w") as report:
+                stats = pstats.Stats(profiler, stream=report)
+                stats.sort_stats("cumulative").print_stats()
+        for exporter in exporters:
+            exporter.export(instrumentation)
+
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))
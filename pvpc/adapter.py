@@ -1,68 +1,172 @@
-from typing import List, Tuple
-from pvpc.port import InputPort, OutputPort
-
+import importlib
 import json
+from datetime import date
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Set
 
-import telegram
-import requests
+from pvpc.archive import PriceArchive
+from pvpc.port import BatchInputPort, BatchOutputPort, InputPort, OutputPort
+from pvpc.record import DayRecord
+from pvpc.render import MARKDOWN, MessageRenderer
 
+# Adapters that need `requests` or `telegram` live in their own modules and are
+# only imported the first time one of them is used, so runs that don't talk to
+# the API or the bot don't pay for importing those clients.
+LAZY_ADAPTERS = {
+    "ZONES": "pvpc.http_adapter",
+    "PrecioLuzInputAdapter": "pvpc.http_adapter",
+    "AsyncPrecioLuzInputAdapter": "pvpc.http_adapter",
+    "TelegramOutputAdapter": "pvpc.telegram_adapter",
+    "TelegramFanOutOutputAdapter": "pvpc.telegram_adapter",
+}
 
-class PrecioLuzInputAdapter(InputPort):
 
-    endpoint: str = "https://api.preciodelaluz.org/v1/prices/all?zone=PCB"
+def __getattr__(name: str):
+    module = LAZY_ADAPTERS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
 
-    def get_raw_data(self) -> dict:
-        response = requests.get(self.endpoint)
-        response.raise_for_status()
 
-        return json.loads(response.text)
+class FileInputAdapter(InputPort):
 
+    path: Path
 
-class TelegramOutputAdapter(OutputPort):
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
 
-    bot: telegram.Bot
-    channel: str
+    def get_raw_data(self) -> DayRecord:
+        with open(self.path, "rb") as day_file:
+            return DayRecord.from_json(day_file.read())
 
-    def __init__(self, token: str, channel: str) -> None:
-        self.channel = channel
-        self.bot = telegram.Bot(token=token)
 
-    def tuple_to_str(self, tuple: Tuple[str, float]) -> str:
-        return self.key_value_pair_to_str(tuple[0], tuple[1])
+class DirectoryInputAdapter(BatchInputPort):
 
-    def key_value_pair_to_str(self, k: str, v: float) -> str:
-        return f"{k}: {str(v)} €/mWh\n"
+    path: Path
+    pattern: str
 
-    def list_of_tuples_to_str(self, data: List[Tuple[str, float]]) -> str:
-        return "".join([self.key_value_pair_to_str(k, v) for k, v in data])
+    def __init__(self, path: str, pattern: str = "*.json") -> None:
+        self.path = Path(path)
+        self.pattern = pattern
 
-    def dict_to_str(self, data: dict) -> str:
-        return "".join([self.key_value_pair_to_str(k, v) for k, v in data.items()])
+    def get_raw_days(self) -> Iterator[DayRecord]:
+        return map(DayRecord.from_json, self.get_encoded_days())
 
-    def generate_message(self, data: dict) -> str:
-        message = "Precios de la luz para hoy:\n"
+    def get_encoded_days(self) -> Iterator[bytes]:
+        if not self.path.is_dir():
+            raise FileNotFoundError(f"No directory of days at {self.path}.")
+        for day_path in sorted(self.path.glob(self.pattern)):
+            with open(day_path, "rb") as day_file:
+                yield day_file.read()
 
-        message += "\n*Las horas más baratas:*\n"
-        message += self.dict_to_str(data["cheapest_6h"])
+    decode_day = staticmethod(DayRecord.from_json)
 
-        message += "\n\n*Periodos AM/PM más baratos:*\n"
 
-        message += "\n*AM* -> Periodo (3h) más barato:\n"
-        message += self.tuple_to_str(data["am_cheapest_3h_period"])
-        message += "\nDetalle por hora:\n"
-        message += self.list_of_tuples_to_str(data["am_cheapest_3h_period_unfolded"])
+class NDJSONInputAdapter(BatchInputPort):
 
-        message += "\n*PM* -> Periodo (3h) más barato:\n"
-        message += self.tuple_to_str(data["pm_cheapest_3h_period"])
-        message += "\nDetalle por hora:\n"
-        message += self.list_of_tuples_to_str(data["pm_cheapest_3h_period_unfolded"])
+    stream: IO
 
-        return message
+    def __init__(self, stream: IO) -> None:
+        self.stream = stream
 
-    def post_processed_data(self, data: dict):
-        message = self.generate_message(data)
+    def get_raw_days(self) -> Iterator[DayRecord]:
+        return map(DayRecord.from_json, self.get_encoded_days())
+
+    def get_encoded_days(self) -> Iterator[str]:
+        for line in self.stream:
+            if line.strip():
+                yield line
+
+    decode_day = staticmethod(DayRecord.from_json)
+
+
+class NDJSONOutputAdapter(BatchOutputPort):
+
+    stream: IO
+
+    def __init__(self, stream: IO) -> None:
+        self.stream = stream
+
+    def post_processed_days(self, days: Iterable[dict]):
+        self.post_encoded_days(map(self.encode_day, days))
+
+    @staticmethod
+    def encode_day(day: dict) -> str:
+        return json.dumps(day, ensure_ascii=False)
+
+    def post_encoded_days(self, lines: Iterable[str]):
+        for line in lines:
+            self.stream.write(line)
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+class ArchiveInputAdapter(InputPort):
 
-        status = self.bot.send_message(
-            chat_id=self.channel, text=message, parse_mode=telegram.ParseMode.MARKDOWN
+    archive: PriceArchive
+    day: date
+
+    def __init__(self, archive: PriceArchive, day: date) -> None:
+        self.archive = archive
+        self.day = day
+
+    def get_raw_data(self) -> DayRecord:
+        prices, flags = self.archive.get_day(self.day)
+        return self.archive.to_record(self.day, prices, flags)
+
+
+class ArchiveBatchInputAdapter(BatchInputPort):
+
+    archive: PriceArchive
+    start: date
+    end: date
+    weekdays: Optional[Set[int]]
+
+    def __init__(
+        self,
+        archive: PriceArchive,
+        start: date,
+        end: date,
+        weekdays: Optional[Set[int]] = None,
+    ) -> None:
+        self.archive = archive
+        self.start = start
+        self.end = end
+        self.weekdays = weekdays
+
+    def get_raw_days(self) -> Iterator[DayRecord]:
+        for day, prices, flags in self.archive.iter_days(
+            self.start, self.end, self.weekdays
+        ):
+            yield self.archive.to_record(day, prices, flags)
+
+
+class MessageOutputAdapter(OutputPort):
+    """Writes the rendered message to a stream instead of posting it."""
+
+    stream: IO
+    renderer: MessageRenderer
+    fmt: str
+    language: str
+    day: Optional[date]
+
+    def __init__(
+        self,
+        stream: IO,
+        fmt: str = MARKDOWN,
+        language: str = "es",
+        renderer: Optional[MessageRenderer] = None,
+        day: Optional[date] = None,
+    ) -> None:
+        self.stream = stream
+        self.fmt = fmt
+        self.language = language
+        self.day = day
+        self.renderer = renderer or MessageRenderer(
+            formats=(fmt,), languages=(language,)
         )
-        print(status)
+
+    def post_processed_data(self, data: dict):
+        self.stream.write(self.renderer.render(data, self.fmt, self.language, self.day))
+        self.stream.write("\n")
+        self.stream.flush()
@@ -0,0 +1,225 @@
+import mmap
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional, Set, Tuple
+
+from pvpc.record import DATE_FORMAT, HOURS_PER_DAY, DayRecord
+from pvpc.slots import HOURLY, SlotLayout
+
+CHEAP_FLAG = 0b01
+UNDER_AVG_FLAG = 0b10
+
+DATES_FILE = "dates.i32"
+ENDS_FILE = "ends.i32"
+PRICES_FILE = "prices.f64"
+FLAGS_FILE = "flags.u8"
+
+
+class PriceArchive:
+    """Columnar on-disk store of daily hourly prices.
+
+    Every day takes one row: its date ordinal, the end of its slots in the
+    price and flag columns, and a price and a flag byte per hour, 24 of them
+    or 23 and 25 on clock change days. Rows are kept in date order, so the
+    dates column doubles as the date -> row index and is binary searched in
+    place. Only hourly days can be archived.
+
+    Appends write the dates column last, so a row only exists once all its
+    columns are written. What an interrupted append left in the other
+    columns is ignored, and truncated by the next append.
+    """
+
+    path: Path
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        ends_path = self.path / ENDS_FILE
+        if not ends_path.exists() and (self.path / DATES_FILE).exists():
+            # Archives from before the ends column have 24 hours a row.
+            rows = (self.path / DATES_FILE).stat().st_size // 4
+            with open(ends_path, "wb") as ends_file:
+                ends = range(HOURS_PER_DAY, (rows + 1) * HOURS_PER_DAY, HOURS_PER_DAY)
+                array("i", ends).tofile(ends_file)
+        for name in (DATES_FILE, ENDS_FILE, PRICES_FILE, FLAGS_FILE):
+            (self.path / name).touch()
+        self._maps = None
+
+    def __enter__(self) -> "PriceArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._columns()[0])
+
+    def close(self) -> None:
+        if self._maps is not None:
+            _, views, maps = self._maps
+            for view in reversed(views):
+                view.release()
+            for column_map in maps:
+                try:
+                    column_map.close()
+                except BufferError:
+                    # Rows handed out by read_row still point into the map, it is
+                    # unmapped once the last of them is garbage collected.
+                    pass
+            self._maps = None
+
+    def append_day(self, raw_data: Mapping) -> None:
+        self.append_days([raw_data])
+
+    def append_days(self, days: Iterable[Mapping]) -> None:
+        columns = self._columns()
+        rows = len(columns[0])
+        last_ordinal = columns[0][-1] if rows else 0
+        last_end = self.get_row_start(rows)
+
+        dates, ends, prices, flags = array("i"), array("i"), array("d"), array("B")
+        for raw_data in days:
+            record = DayRecord.from_payload(raw_data)
+            if record.layout.minutes != HOURLY.minutes:
+                raise ValueError(
+                    f"Day {record.date} has {record.layout.count} slots of "
+                    f"{record.layout.minutes} minutes, only hourly slots fit "
+                    "an archive row."
+                )
+            ordinal = record.get_date().toordinal()
+            if ordinal <= last_ordinal:
+                raise ValueError(
+                    f"Day {record.date} is not after the last archived day. "
+                    "Days must be appended in date order."
+                )
+            last_ordinal = ordinal
+            last_end += len(record.prices)
+
+            dates.append(ordinal)
+            ends.append(last_end)
+            prices.extend(record.prices)
+            flags.extend(
+                (CHEAP_FLAG if cheap else 0) | (UNDER_AVG_FLAG if under_avg else 0)
+                for cheap, under_avg in zip(record.cheap_flags, record.under_avg_flags)
+            )
+
+        items = self.get_row_start(rows)
+        self.close()
+        for name, column, length in (
+            (PRICES_FILE, prices, items),
+            (FLAGS_FILE, flags, items),
+            (ENDS_FILE, ends, rows),
+            (DATES_FILE, dates, rows),
+        ):
+            with open(self.path / name, "r+b") as column_file:
+                column_file.truncate(length * column.itemsize)
+                column_file.seek(0, 2)
+                column.tofile(column_file)
+
+    def get_row(self, day: date) -> Optional[int]:
+        dates = self._columns()[0]
+        ordinal = day.toordinal()
+        row = bisect_left(dates, ordinal)
+        if row < len(dates) and dates[row] == ordinal:
+            return row
+        return None
+
+    def get_rows(self, start: date, end: date) -> range:
+        dates = self._columns()[0]
+        return range(
+            bisect_left(dates, start.toordinal()), bisect_right(dates, end.toordinal())
+        )
+
+    def get_day(self, day: date) -> Tuple[memoryview, memoryview]:
+        row = self.get_row(day)
+        if row is None:
+            raise KeyError(f"Day {day.strftime(DATE_FORMAT)} is not archived.")
+        return self.read_row(row)
+
+    def read_row(self, row: int) -> Tuple[memoryview, memoryview]:
+        return self.read_rows(range(row, row + 1))
+
+    def read_rows(self, rows: range) -> Tuple[memoryview, memoryview]:
+        """Prices and flags of a contiguous run of rows, hour after hour."""
+        _, _, prices, flags = self._columns()
+        start, stop = self.get_row_start(rows.start), self.get_row_start(rows.stop)
+        return prices[start:stop], flags[start:stop]
+
+    def get_row_start(self, row: int) -> int:
+        """Where the row's hours start in the price and flag columns."""
+        return self._columns()[1][row - 1] if row else 0
+
+    def get_key(self, rows: range, index: int) -> Tuple[date, str]:
+        """Day and hour key of the `index`th hour read by `read_rows(rows)`."""
+        dates, ends, _, _ = self._columns()
+        hour = self.get_row_start(rows.start) + index
+        row = bisect_right(ends, hour, rows.start, rows.stop)
+        day = date.fromordinal(dates[row])
+        start = self.get_row_start(row)
+        return day, get_hourly_layout(day, ends[row] - start).keys[hour - start]
+
+    def iter_days(
+        self, start: date, end: date, weekdays: Optional[Set[int]] = None
+    ) -> Iterator[Tuple[date, memoryview, memoryview]]:
+        dates = self._columns()[0]
+        for row in self.get_rows(start, end):
+            ordinal = dates[row]
+            # Ordinal 1 (0001-01-01) is a Monday, matching date.weekday() == 0.
+            if weekdays is None or (ordinal - 1) % 7 in weekdays:
+                yield (date.fromordinal(ordinal), *self.read_row(row))
+
+    def to_record(self, day: date, prices: memoryview, flags: memoryview) -> DayRecord:
+        return DayRecord(
+            day.strftime(DATE_FORMAT),
+            array("d", prices),
+            array("b", [flag & CHEAP_FLAG for flag in flags]),
+            array("b", [flag & UNDER_AVG_FLAG and 1 for flag in flags]),
+            get_hourly_layout(day, len(prices)),
+        )
+
+    def _columns(self) -> Tuple[memoryview, memoryview, memoryview, memoryview]:
+        if self._maps is None:
+            maps, views, columns = [], [], []
+            for name, typecode in (
+                (DATES_FILE, "i"),
+                (ENDS_FILE, "i"),
+                (PRICES_FILE, "d"),
+                (FLAGS_FILE, "B"),
+            ):
+                with open(self.path / name, "rb") as column_file:
+                    size = column_file.seek(0, 2)
+                    if size == 0:
+                        columns.append(memoryview(array(typecode)))
+                        continue
+                    column_map = mmap.mmap(
+                        column_file.fileno(), 0, access=mmap.ACCESS_READ
+                    )
+                maps.append(column_map)
+                # An interrupted append can leave part of an item at the end.
+                whole = size - size % array(typecode).itemsize
+                views.append(memoryview(column_map)[:whole])
+                columns.append(views[-1].cast(typecode))
+            views.extend(columns)
+
+            # Rows only exist once their date is written, the dates column
+            # last, so items after them are ignored.
+            dates, ends, prices, flags = columns
+            rows = len(dates)
+            items = ends[rows - 1] if 0 < rows <= len(ends) else 0
+            columns = [dates, ends[:rows], prices[:items], flags[:items]]
+            views.extend(columns)
+            self._maps = (columns, views, maps)
+            if len(ends) < rows or len(prices) < items or len(flags) < items:
+                message = (
+                    f"Archive at {self.path} is corrupt: {rows} days, "
+                    f"{len(ends)} ends, {len(prices)} prices and {len(flags)} flags."
+                )
+                self.close()
+                raise ValueError(message)
+        return self._maps[0]
+
+
+def get_hourly_layout(day: date, count: int) -> SlotLayout:
+    return HOURLY if count == HOURS_PER_DAY else SlotLayout.for_day(day, count)
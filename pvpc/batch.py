@@ -0,0 +1,35 @@
+from typing import Iterator, Optional
+from pvpc.domain import PVPCDay
+from pvpc.instrumentation import Instrumentation
+from pvpc.port import BatchInputPort, BatchOutputPort
+from pvpc.stats import PriceStatistics
+
+
+class PVPCBatch:
+    def __init__(
+        self,
+        input_repo: BatchInputPort,
+        output_repo: BatchOutputPort,
+        instrumentation: Optional[Instrumentation] = None,
+        statistics: Optional[PriceStatistics] = None,
+    ) -> None:
+        self.input_repo = input_repo
+        self.output_repo = output_repo
+        self.instrumentation = instrumentation
+        self.statistics = statistics
+
+    def run(self):
+        self.output_repo.post_processed_days(self.process_days())
+
+    def process_days(self) -> Iterator[dict]:
+        domain = PVPCDay(
+            input_repo=None,
+            output_repo=None,
+            instrumentation=self.instrumentation,
+            statistics=self.statistics,
+        )
+        metrics = self.output_repo.required_metrics
+
+        for raw_data in self.input_repo.get_raw_days():
+            processed_data = domain.process(raw_data, metrics)
+            yield {"date": domain.get_date(), **processed_data}
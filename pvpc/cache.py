@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+
+class CachedResponse:
+
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def __init__(
+        self,
+        body: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        fetched_at: float,
+    ) -> None:
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """On-disk cache of API responses keyed by endpoint and date.
+
+    Fresh entries (younger than `ttl` seconds) are served without any request.
+    Stale ones keep their validators, so the adapter can revalidate them with a
+    conditional request and only download the body again if it changed.
+    """
+
+    path: Path
+    ttl: float
+
+    def __init__(
+        self, path: str, ttl: float = 3600, clock: Callable[[], float] = time.time
+    ) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.clock = clock
+
+    def key(self, endpoint: str, day: date) -> str:
+        return hashlib.sha1(f"{endpoint}|{day.isoformat()}".encode()).hexdigest()
+
+    def is_fresh(self, cached: CachedResponse) -> bool:
+        return self.clock() - cached.fetched_at < self.ttl
+
+    def load(self, endpoint: str, day: date) -> Optional[CachedResponse]:
+        key = self.key(endpoint, day)
+        try:
+            with open(self.path / f"{key}.meta", "rb") as meta_file:
+                meta = json.load(meta_file)
+            with open(self.path / f"{key}.body", "rb") as body_file:
+                body = body_file.read()
+        except (OSError, ValueError):
+            return None
+
+        return CachedResponse(
+            body, meta["etag"], meta["last_modified"], meta["fetched_at"]
+        )
+
+    def store(
+        self,
+        endpoint: str,
+        day: date,
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CachedResponse:
+        cached = CachedResponse(body, etag, last_modified, self.clock())
+        key = self.key(endpoint, day)
+        self._write(f"{key}.body", body)
+        self._write_meta(key, cached)
+        return cached
+
+    def touch(self, endpoint: str, day: date, cached: CachedResponse) -> None:
+        cached.fetched_at = self.clock()
+        self._write_meta(self.key(endpoint, day), cached)
+
+    def _write_meta(self, key: str, cached: CachedResponse) -> None:
+        meta = {
+            "etag": cached.etag,
+            "last_modified": cached.last_modified,
+            "fetched_at": cached.fetched_at,
+        }
+        self._write(f"{key}.meta", json.dumps(meta).encode())
+
+    def _write(self, name: str, content: bytes) -> None:
+        tmp_path = self.path / f"{name}.tmp"
+        with open(tmp_path, "wb") as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_path, self.path / name)
@@ -1,67 +1,208 @@
-from typing import List, Tuple
+from array import array
+from functools import cached_property, wraps
+from itertools import accumulate
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from pvpc.instrumentation import Instrumentation, NullInstrumentation
 from pvpc.port import InputPort, OutputPort
+from pvpc.ranking import PriceSelection
+from pvpc.scheduler import Load, LoadScheduler, Schedule
+from pvpc.slots import SlotLayout
+from pvpc.record import DayRecord
+from pvpc.stats import PriceStatistics
+
+MIN_WINDOW_HOURS = 1
+MAX_WINDOW_HOURS = 12
+AM_START_HOURS = range(10)
+PM_START_HOURS = range(12, 22)
+
+
+PROCESSED_METRICS = (
+    "cheapest_6h",
+    "am_cheapest_3h_period",
+    "pm_cheapest_3h_period",
+    "am_cheapest_3h_period_unfolded",
+    "pm_cheapest_3h_period_unfolded",
+)
+# Only output when the domain has past statistics to compare the day with.
+STATISTICS_METRICS = ("price_comparison",)
+# Only output for ports that ask for them, e.g. exports.
+DETAIL_METRICS = (
+    "date",
+    "hourly_prices",
+    "sorted_am_3h_periods",
+    "sorted_pm_3h_periods",
+)
+CACHED_METRICS = (
+    "cheapest_6h",
+    "am_3h_periods",
+    "pm_3h_periods",
+    "sorted_am_3h_periods",
+    "sorted_pm_3h_periods",
+    "am_cheapest_3h_period",
+    "pm_cheapest_3h_period",
+    "am_cheapest_3h_period_unfolded",
+    "pm_cheapest_3h_period_unfolded",
+    "price_comparison",
+    "hourly_prices",
+)
+
+
+def metric(method):
+    """Memoized metric, timed as its own stage."""
+    name = method.__name__
+
+    @wraps(method)
+    def timed_method(self):
+        with self.instrumentation.stage(name):
+            return method(self)
+
+    return cached_property(timed_method)
 
 
 class PVPCDay:
+    """Daily PVPC metrics.
+
+    Metrics are computed on first access and memoized until `raw_data` is set
+    again, so a day only pays for the metrics its output actually reads.
+    With `statistics`, every processed day is compared with the days before
+    it and then added to them.
+    """
 
-    raw_data: dict
-    cheapest_6h: dict
-    am_3h_periods: dict
-    pm_3h_periods: dict
-    sorted_am_3h_periods: List[Tuple[str, float]]
-    sorted_pm_3h_periods: List[Tuple[str, float]]
-    am_cheapest_3h_period: Tuple[str, float]
-    pm_cheapest_3h_period: Tuple[str, float]
-    am_cheapest_3h_period_unfolded: List[Tuple[str, float]]
-    pm_cheapest_3h_period_unfolded: List[Tuple[str, float]]
+    day: DayRecord
+    layout: SlotLayout
+    prices: array
+    cheap_flags: array
+    prefix_sums: array
     processed_data: dict
 
     def __init__(
         self,
         input_repo: InputPort,
         output_repo: OutputPort,
+        instrumentation: Optional[Instrumentation] = None,
+        statistics: Optional[PriceStatistics] = None,
     ) -> None:
         self.input_repo = input_repo
         self.output_repo = output_repo
+        self.instrumentation = instrumentation or NullInstrumentation()
+        self.statistics = statistics
+
+    @property
+    def raw_data(self) -> Mapping:
+        return self._raw_data
+
+    @raw_data.setter
+    def raw_data(self, raw_data: Mapping) -> None:
+        for metric in CACHED_METRICS:
+            self.__dict__.pop(metric, None)
+
+        self._raw_data = raw_data
+        self.day = DayRecord.from_payload(raw_data)
+        self.layout = self.day.layout
+        self.prices = self.day.prices
+        self.cheap_flags = self.day.cheap_flags
+        self.prefix_sums = array("d", accumulate(self.prices, initial=0.0))
+
+    @metric
+    def cheapest_6h(self) -> dict:
+        return self.get_6_cheapest_hours()
+
+    @metric
+    def am_3h_periods(self) -> dict:
+        return self.get_prices_for_3h_periods(is_am=True)
+
+    @metric
+    def pm_3h_periods(self) -> dict:
+        return self.get_prices_for_3h_periods(is_am=False)
+
+    @metric
+    def sorted_am_3h_periods(self) -> List[Tuple[str, float]]:
+        return self.sort_prices(is_am=True)
+
+    @metric
+    def sorted_pm_3h_periods(self) -> List[Tuple[str, float]]:
+        return self.sort_prices(is_am=False)
+
+    @metric
+    def am_cheapest_3h_period(self) -> Tuple[str, float]:
+        return self.get_best_period(is_am=True)
+
+    @metric
+    def pm_cheapest_3h_period(self) -> Tuple[str, float]:
+        return self.get_best_period(is_am=False)
+
+    @metric
+    def am_cheapest_3h_period_unfolded(self) -> List[Tuple[str, float]]:
+        return self.get_best_period_unfolded(is_am=True)
+
+    @metric
+    def pm_cheapest_3h_period_unfolded(self) -> List[Tuple[str, float]]:
+        return self.get_best_period_unfolded(is_am=False)
+
+    @property
+    def date(self) -> str:
+        return self.day.date
+
+    @metric
+    def hourly_prices(self) -> List[Tuple[str, float, int]]:
+        """Every slot's key and price with its price rank, 1 for the cheapest."""
+        order = sorted(range(len(self.prices)), key=self.prices.__getitem__)
+        ranks = [0] * len(order)
+        for rank, slot in enumerate(order, 1):
+            ranks[slot] = rank
+        return list(zip(self.layout.keys, self.prices, ranks))
+
+    @metric
+    def price_comparison(self) -> dict:
+        return self.statistics.compare(self.day)
 
     def run(self):
-        self.raw_data = self.input_repo.get_raw_data()
+        if self.output_repo.has_posted():
+            return
+        with self.instrumentation.stage("fetch"):
+            raw_data = self.input_repo.get_raw_data()
+        with self.instrumentation.stage("process"):
+            processed_data = self.process(raw_data, self.output_repo.required_metrics)
+        with self.instrumentation.stage("post"):
+            self.output_repo.post_processed_data(processed_data)
 
-        self.cheapest_6h = self.get_6_cheapest_hours()
+    def process(
+        self, raw_data: Mapping, metrics: Optional[Iterable[str]] = None
+    ) -> dict:
+        self.raw_data = raw_data
+        self.processed_data = self.collect_processed_data(metrics)
+        if self.statistics is not None:
+            self.statistics.add_day(self.day)
 
-        self.am_3h_periods = self.get_prices_for_3h_periods(is_am=True)
-        self.pm_3h_periods = self.get_prices_for_3h_periods(is_am=False)
-        self.sorted_am_3h_periods = self.sort_prices(is_am=True)
-        self.sorted_pm_3h_periods = self.sort_prices(is_am=False)
-        self.am_cheapest_3h_period = self.get_best_period(is_am=True)
-        self.pm_cheapest_3h_period = self.get_best_period(is_am=False)
-        self.am_cheapest_3h_period_unfolded = self.get_best_period_unfolded(is_am=True)
-        self.pm_cheapest_3h_period_unfolded = self.get_best_period_unfolded(is_am=False)
+        return self.processed_data
 
-        self.processed_data = self.collect_processed_data()
+    def get_date(self) -> str:
+        return self.day.date
 
-        self.output_repo.post_processed_data(self.processed_data)
+    def collect_processed_data(self, metrics: Optional[Iterable[str]] = None) -> dict:
+        available = PROCESSED_METRICS
+        if self.statistics is not None:
+            available += STATISTICS_METRICS
+        if metrics is None:
+            metrics = available
+        else:
+            available += DETAIL_METRICS
+            unknown = set(metrics).difference(available)
+            if unknown:
+                raise ValueError(f"Unknown metrics requested: {sorted(unknown)}.")
+            metrics = [metric for metric in available if metric in metrics]
 
-    def collect_processed_data(self) -> dict:
-        return {
-            "cheapest_6h": self.cheapest_6h,
-            "am_cheapest_3h_period": self.am_cheapest_3h_period,
-            "pm_cheapest_3h_period": self.pm_cheapest_3h_period,
-            "am_cheapest_3h_period_unfolded": self.am_cheapest_3h_period_unfolded,
-            "pm_cheapest_3h_period_unfolded": self.pm_cheapest_3h_period_unfolded,
-        }
+        return {metric: getattr(self, metric) for metric in metrics}
 
     def get_best_period_unfolded(self, is_am: bool) -> List[Tuple[str, float]]:
-        prices = []
-        sorted_period_am_or_pm = self.get_best_period(is_am=is_am)
-        start_hour, stop_hour = self.decompose_key_from_2h(sorted_period_am_or_pm[0])
-
-        for hour in range(int(start_hour), int(stop_hour)):
-            formatted_hour = self.get_hour_key_string_from_number(hour)
-            price = self.raw_data[formatted_hour]["price"]
-            prices.append((formatted_hour, price))
+        best_key = self.get_best_period(is_am=is_am)[0]
+        window, _ = self.get_3h_period_slots(is_am)
+        start = self.layout.get_window_keys(window).index(best_key)
 
-        return prices
+        return [
+            (self.layout.keys[slot], self.prices[slot])
+            for slot in range(start, start + window)
+        ]
 
     def get_best_period(self, is_am: bool) -> Tuple[str, float]:
         sorted_period_am_or_pm = (
@@ -70,24 +211,62 @@ class PVPCDay:
         return sorted_period_am_or_pm[0]
 
     def get_prices_for_3h_periods(self, is_am: bool) -> dict:
-        prices = {}
-        hour_range = range(10) if is_am else range(12, 22)
-
-        for hour in hour_range:
-            first_hour = self.get_hour_key_string_from_number(hour)
-            second_hour = self.get_hour_key_string_from_number(hour + 1)
-            third_hour = self.get_hour_key_string_from_number(hour + 2)
-            first_hour_price = self.raw_data[first_hour]["price"]
-            second_hour_price = self.raw_data[second_hour]["price"]
-            third_hour_price = self.raw_data[third_hour]["price"]
-
-            price_key = self.compose_key_from_2h(first_hour, third_hour)
-            price_value = round(
-                (first_hour_price + second_hour_price + third_hour_price) / 3, 2
+        return self.get_window_prices(*self.get_3h_period_slots(is_am))
+
+    def get_3h_period_slots(self, is_am: bool) -> Tuple[int, range]:
+        window = self.layout.get_slots(3)
+        hour_range = AM_START_HOURS if is_am else PM_START_HOURS
+        return window, self.layout.get_start_slots(hour_range, window)
+
+    def get_window_prices(self, window: int, start_slots: Sequence[int]) -> dict:
+        """Average price of the `window` slots from every start slot. Slots are
+        hours on hourly days, so windows and starts are in hours there."""
+        self.validate_window(window, start_slots)
+        sums = self.prefix_sums
+        window_keys = self.layout.get_window_keys(window)
+
+        # Prefix sum differences carry float drift that can flip the 2 decimals
+        # rounding of even-length windows, so snap the window sum back first.
+        return {
+            window_keys[start]: round(
+                round(sums[start + window] - sums[start], 6) / window, 2
             )
-            prices[price_key] = price_value
+            for start in start_slots
+        }
 
-        return prices
+    def get_best_window(
+        self, window: int, start_hours: Sequence[int]
+    ) -> Tuple[str, float]:
+        prices = self.get_window_prices(window, start_hours)
+        return min(prices.items(), key=lambda price: price[1])
+
+    def get_best_windows(
+        self, windows: Sequence[int], start_ranges: Dict[str, Sequence[int]]
+    ) -> Dict[str, Dict[int, Tuple[str, float]]]:
+        return {
+            name: {
+                window: self.get_best_window(window, start_hours) for window in windows
+            }
+            for name, start_hours in start_ranges.items()
+        }
+
+    def validate_window(self, window: int, start_slots: Sequence[int]) -> None:
+        min_window = MIN_WINDOW_HOURS
+        max_window = self.layout.get_slots(MAX_WINDOW_HOURS)
+        if not min_window <= window <= max_window:
+            raise ValueError(
+                f"Window of {window} slots out of bounds. "
+                f"Expected between {min_window} and {max_window} slots."
+            )
+        if not start_slots:
+            raise ValueError(f"No start slots for a {window} slot window.")
+        if not (
+            0 <= min(start_slots) and max(start_slots) <= self.layout.count - window
+        ):
+            raise ValueError(
+                f"Start slots {start_slots} don't fit a {window} slot window "
+                "in the day."
+            )
 
     def dict_to_list_of_tuples(self, data: dict) -> List[Tuple[str, float]]:
         return [(k, v) for k, v in data.items()]
@@ -101,16 +280,34 @@ class PVPCDay:
         return prices
 
     def get_6_cheapest_hours(self) -> dict:
-        prices = {}
-        for hour in range(24):
-            formatted_hour = self.get_hour_key_string_from_number(hour)
-            if self.raw_data[formatted_hour]["is-cheap"]:
-                prices[formatted_hour] = self.raw_data[formatted_hour]["price"]
-        return prices
+        # Ranked by price rather than read off the API's `is-cheap` flags, and
+        # listed in chronological order, as the message shows them.
+        cheapest = self.get_cheapest_hours(self.layout.get_slots(6))
+        return dict(sorted(cheapest, key=lambda slot: self.layout.index[slot[0]]))
+
+    def get_cheapest_hours(self, k: int) -> List[Tuple[str, float]]:
+        return PriceSelection.from_day(self.day).cheapest(k)
+
+    def get_most_expensive_hours(self, k: int) -> List[Tuple[str, float]]:
+        return PriceSelection.from_day(self.day).most_expensive(k)
+
+    def get_hours_under(self, threshold: float) -> List[Tuple[str, float]]:
+        return PriceSelection.from_day(self.day).under(threshold)
+
+    def get_hours_under_percentile(self, percentile: float) -> List[Tuple[str, float]]:
+        return PriceSelection.from_day(self.day).under_percentile(percentile)
+
+    def schedule_loads(self, loads: Sequence[Load], **kwargs) -> Schedule:
+        # Loads run for whole hours, so they're placed on hourly prices.
+        prices = self.layout.to_hourly(self.prices)
+        return LoadScheduler(prices, **kwargs).schedule(loads)
 
     def compose_key_from_2h(self, first_hour: str, second_hour: str) -> str:
         return f"{first_hour[0:3]}{second_hour[3:5]}"
 
+    def compose_key_from_hours(self, start_hour: int, stop_hour: int) -> str:
+        return f"{str(start_hour).zfill(2)}-{str(stop_hour).zfill(2)}"
+
     def decompose_key_from_2h(self, composed_key: str) -> str:
         return composed_key[0:2], composed_key[3:5]
 
@@ -0,0 +1,298 @@
+import csv
+import json
+import sys
+from abc import ABC, abstractmethod
+from functools import partial
+from pathlib import Path
+from typing import (
+    IO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from pvpc.port import BatchOutputPort, OutputPort
+
+CSV = "csv"
+NDJSON = "ndjson"
+PARQUET = "parquet"
+EXPORT_FORMATS = (CSV, NDJSON, PARQUET)
+
+Row = Tuple[object, ...]
+
+
+class Table(NamedTuple):
+    """Rows exported out of every processed day."""
+
+    columns: Tuple[Tuple[str, str], ...]
+    metrics: frozenset
+    get_rows: Callable[[dict], Iterator[Row]]
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.columns]
+
+
+# Days of a single unnamed zone have no "zone", and export it empty.
+def get_price_rows(day: dict) -> Iterator[Row]:
+    zone, date = day.get("zone"), day["date"]
+    for hour, price, rank in day["hourly_prices"]:
+        yield zone, date, hour, price, rank
+
+
+def get_window_rows(day: dict) -> Iterator[Row]:
+    zone, date = day.get("zone"), day["date"]
+    for period in ("am", "pm"):
+        for rank, (window, price) in enumerate(day[f"sorted_{period}_3h_periods"], 1):
+            yield zone, date, period, window, price, rank
+
+
+def get_summary_rows(day: dict) -> Iterator[Row]:
+    am_window, am_price = day["am_cheapest_3h_period"]
+    pm_window, pm_price = day["pm_cheapest_3h_period"]
+    row = (
+        day.get("zone"),
+        day["date"],
+        am_window,
+        am_price,
+        pm_window,
+        pm_price,
+        " ".join(day["cheapest_6h"]),
+    )
+    yield row
+
+
+TABLES: Dict[str, Table] = {
+    "prices": Table(
+        (
+            ("zone", "string"),
+            ("date", "string"),
+            ("hour", "string"),
+            ("price", "float"),
+            ("rank", "int"),
+        ),
+        frozenset({"date", "hourly_prices"}),
+        get_price_rows,
+    ),
+    "windows": Table(
+        (
+            ("zone", "string"),
+            ("date", "string"),
+            ("period", "string"),
+            ("window", "string"),
+            ("price", "float"),
+            ("rank", "int"),
+        ),
+        frozenset({"date", "sorted_am_3h_periods", "sorted_pm_3h_periods"}),
+        get_window_rows,
+    ),
+    "summary": Table(
+        (
+            ("zone", "string"),
+            ("date", "string"),
+            ("am_cheapest_window", "string"),
+            ("am_cheapest_price", "float"),
+            ("pm_cheapest_window", "string"),
+            ("pm_cheapest_price", "float"),
+            ("cheapest_hours", "string"),
+        ),
+        frozenset(
+            {"date", "am_cheapest_3h_period", "pm_cheapest_3h_period", "cheapest_6h"}
+        ),
+        get_summary_rows,
+    ),
+}
+
+
+class RowWriter(ABC):
+    @abstractmethod
+    def write(self, rows: List[Row]) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+
+class StreamRowWriter(RowWriter):
+    """Text rows to a file, or to stdout for `-`."""
+
+    stream: IO
+
+    def __init__(self, path: str, append: bool) -> None:
+        if path == "-":
+            self.stream = sys.stdout
+            self.is_new = True
+        else:
+            self.is_new = not append or not Path(path).exists()
+            self.stream = open(path, "a" if append else "w", newline="")
+
+    def close(self) -> None:
+        self.stream.flush()
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+class CSVRowWriter(StreamRowWriter):
+    def __init__(self, path: str, table: Table, append: bool) -> None:
+        super().__init__(path, append)
+        self.writer = csv.writer(self.stream)
+        # Appending to an existing export keeps its header.
+        if self.is_new or self.stream.tell() == 0:
+            self.writer.writerow(table.names)
+
+    def write(self, rows: List[Row]) -> None:
+        self.writer.writerows(rows)
+        self.stream.flush()
+
+
+class NDJSONRowWriter(StreamRowWriter):
+    def __init__(self, path: str, table: Table, append: bool) -> None:
+        super().__init__(path, append)
+        self.names = table.names
+
+    def write(self, rows: List[Row]) -> None:
+        self.stream.writelines(
+            json.dumps(dict(zip(self.names, row)), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+        self.stream.flush()
+
+
+class ParquetRowWriter(RowWriter):
+    """Rows to Parquet, a row group per flush. Needs `pyarrow`.
+
+    Parquet files can't be appended to, so in append mode `path` is a
+    directory, read as one dataset by pyarrow, pandas or DuckDB, and every
+    export adds a part file to it.
+    """
+
+    def __init__(self, path: str, table: Table, append: bool) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as error:
+            raise ImportError(
+                "Parquet exports need pyarrow, install it with `pip install pyarrow`."
+            ) from error
+
+        self.pyarrow = pyarrow
+        types = {
+            "string": pyarrow.string(),
+            "float": pyarrow.float64(),
+            "int": pyarrow.int32(),
+        }
+        self.schema = pyarrow.schema(
+            [(name, types[kind]) for name, kind in table.columns]
+        )
+        if append:
+            directory = Path(path)
+            directory.mkdir(parents=True, exist_ok=True)
+            part = len(list(directory.glob("part-*.parquet")))
+            path = str(directory / f"part-{part:05d}.parquet")
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows: List[Row]) -> None:
+        columns = [list(column) for column in zip(*rows)]
+        self.writer.write_table(
+            self.pyarrow.Table.from_arrays(
+                [
+                    self.pyarrow.array(column, type=field.type)
+                    for column, field in zip(columns, self.schema)
+                ],
+                schema=self.schema,
+            )
+        )
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def get_day_rows(table: str, day: dict) -> List[Row]:
+    """A day's rows of the table, picklable to make them on worker processes."""
+    return list(TABLES[table].get_rows(day))
+
+
+WRITERS: Dict[str, Callable[[str, Table, bool], RowWriter]] = {
+    CSV: CSVRowWriter,
+    NDJSON: NDJSONRowWriter,
+    PARQUET: ParquetRowWriter,
+}
+
+
+def get_format(path: str) -> str:
+    """Export format from the file extension, CSV by default."""
+    suffix = Path(path).suffix.lstrip(".").lower()
+    if suffix == "jsonl":
+        return NDJSON
+    return suffix if suffix in EXPORT_FORMATS else CSV
+
+
+class ExportOutputAdapter(BatchOutputPort, OutputPort):
+    """Streams a table of rows per processed day to CSV, NDJSON or Parquet.
+
+    Days are consumed one at a time and their rows written every
+    `flush_rows` rows, so memory stays bounded however many days are
+    exported. With `append`, a daily job adds its day to an existing export.
+    """
+
+    path: str
+    table: Table
+    fmt: str
+    flush_rows: int
+    append: bool
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "prices",
+        fmt: Optional[str] = None,
+        flush_rows: int = 10000,
+        append: bool = False,
+    ) -> None:
+        if table not in TABLES:
+            raise ValueError(f"Unknown table {table}. Expected one of {list(TABLES)}.")
+        fmt = fmt or get_format(path)
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown format {fmt}. Expected one of {EXPORT_FORMATS}.")
+        if fmt == PARQUET and path == "-":
+            raise ValueError("Parquet exports can't be written to stdout.")
+        if flush_rows < 1:
+            raise ValueError(f"Can't flush every {flush_rows} rows.")
+        self.path = path
+        self.table = TABLES[table]
+        self.fmt = fmt
+        self.flush_rows = flush_rows
+        self.append = append
+        self.required_metrics = self.table.metrics
+        self.encode_day = partial(get_day_rows, table)
+
+    def post_processed_data(self, data: dict) -> int:
+        return self.post_processed_days([data])
+
+    def post_processed_days(self, days: Iterable[dict]) -> int:
+        """Writes the days' rows and returns how many."""
+        return self.post_encoded_days(map(self.encode_day, days))
+
+    def post_encoded_days(self, encoded: Iterable[List[Row]]) -> int:
+        writer = WRITERS[self.fmt](self.path, self.table, self.append)
+        rows: List[Row] = []
+        written = 0
+        try:
+            for day_rows in encoded:
+                rows.extend(day_rows)
+                if len(rows) >= self.flush_rows:
+                    writer.write(rows)
+                    written += len(rows)
+                    rows = []
+            if rows:
+                writer.write(rows)
+                written += len(rows)
+        finally:
+            writer.close()
+        return written
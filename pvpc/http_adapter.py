@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, Optional, Sequence, Tuple
+
+import requests
+
+from pvpc.cache import ResponseCache
+from pvpc.port import AsyncInputPort, InputPort
+from pvpc.record import DATE_FORMAT, ZONES, DayRecord
+from pvpc.slots import get_spanish_today
+from pvpc.transport import HTTPTransport
+
+
+class PrecioLuzInputAdapter(InputPort):
+
+    base_endpoint: str = "https://api.preciodelaluz.org/v1/prices/all"
+    endpoint: str = f"{base_endpoint}?zone=PCB"
+    zone: str
+    cache: Optional[ResponseCache]
+    day: Optional[date]
+    transport: HTTPTransport
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        day: Optional[date] = None,
+        transport: Optional[HTTPTransport] = None,
+        zone: str = "PCB",
+        base_endpoint: Optional[str] = None,
+    ) -> None:
+        self.cache = cache
+        self.day = day
+        self.transport = transport or HTTPTransport()
+        self.zone = zone
+        if base_endpoint is not None:
+            self.base_endpoint = base_endpoint
+        self.endpoint = f"{self.base_endpoint}?zone={zone}"
+        if day is not None:
+            self.endpoint += f"&date={day.strftime(DATE_FORMAT)}"
+
+    def get_raw_data(self) -> DayRecord:
+        if self.cache is None:
+            return DayRecord.from_json(self.fetch().content)
+
+        day = self.day or get_spanish_today()
+        cached = self.cache.load(self.endpoint, day)
+        if cached is not None and self.cache.is_fresh(cached):
+            return DayRecord.from_json(cached.body)
+
+        response = self.fetch(cached.conditional_headers() if cached else {})
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(self.endpoint, day, cached)
+            return DayRecord.from_json(cached.body)
+
+        self.cache.store(
+            self.endpoint,
+            day,
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return DayRecord.from_json(response.content)
+
+    def fetch(self, headers: Optional[dict] = None) -> requests.Response:
+        response = self.transport.get(self.endpoint, headers=headers)
+        response.raise_for_status()
+
+        return response
+
+
+class AsyncPrecioLuzInputAdapter(AsyncInputPort):
+
+    zones: Sequence[str]
+    days: Sequence[Optional[date]]
+    max_concurrency: int
+    cache: Optional[ResponseCache]
+    transport: HTTPTransport
+    base_endpoint: Optional[str]
+
+    def __init__(
+        self,
+        zones: Sequence[str] = tuple(ZONES),
+        days: Sequence[Optional[date]] = (None,),
+        max_concurrency: int = 4,
+        cache: Optional[ResponseCache] = None,
+        transport: Optional[HTTPTransport] = None,
+        base_endpoint: Optional[str] = None,
+    ) -> None:
+        self.zones = zones
+        self.days = days
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.transport = transport or HTTPTransport(pool_size=max_concurrency)
+        self.base_endpoint = base_endpoint
+
+    def get_adapter(self, zone: str, day: Optional[date]) -> InputPort:
+        return PrecioLuzInputAdapter(
+            cache=self.cache,
+            day=day,
+            transport=self.transport,
+            zone=zone,
+            base_endpoint=self.base_endpoint,
+        )
+
+    async def get_raw_days(self) -> Dict[Tuple[str, Optional[date]], DayRecord]:
+        loop = asyncio.get_running_loop()
+        keys = [(zone, day) for zone in self.zones for day in self.days]
+        # A pool of its own, as the default one is sized by the CPU count.
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            raw_days = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        executor, self.get_adapter(zone, day).get_raw_data
+                    )
+                    for zone, day in keys
+                )
+            )
+
+        return dict(zip(keys, raw_days))
@@ -0,0 +1,118 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import IO, ContextManager, Dict, Iterator
+
+
+class StageStats:
+
+    calls: int
+    wall_time: float
+    allocated_bytes: int
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall_time = 0.0
+        self.allocated_bytes = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "wall_time": self.wall_time,
+            "allocated_bytes": self.allocated_bytes,
+        }
+
+
+class Instrumentation:
+    """Per-stage call counts, wall time and net allocated memory.
+
+    Allocations are only measured while `tracemalloc` is tracing, either
+    because `trace_allocations` started it or because the caller did.
+    """
+
+    stages: Dict[str, StageStats]
+
+    def __init__(self, trace_allocations: bool = False) -> None:
+        self.stages = {}
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tracing = tracemalloc.is_tracing()
+        allocated = tracemalloc.get_traced_memory()[0] if tracing else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self.observe(name, time.perf_counter() - start)
+            if tracing:
+                stats.allocated_bytes += tracemalloc.get_traced_memory()[0] - allocated
+
+    def observe(self, name: str, seconds: float) -> StageStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        stats.calls += 1
+        stats.wall_time += seconds
+        return stats
+
+    def as_dict(self) -> dict:
+        return {name: stats.as_dict() for name, stats in self.stages.items()}
+
+
+class NullInstrumentation(Instrumentation):
+    _stage = nullcontext()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        return self._stage
+
+    def observe(self, name: str, seconds: float) -> StageStats:
+        return StageStats()
+
+
+class JSONLogExporter:
+
+    stream: IO
+
+    def __init__(self, stream: IO) -> None:
+        self.stream = stream
+
+    def export(self, instrumentation: Instrumentation) -> None:
+        line = {"event": "pvpc_stages", "stages": instrumentation.as_dict()}
+        self.stream.write(json.dumps(line) + "\n")
+        self.stream.flush()
+
+
+class PrometheusTextfileExporter:
+    """Writes the stages in Prometheus text format, for node_exporter's
+    textfile collector. The file is replaced atomically."""
+
+    path: Path
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def export(self, instrumentation: Instrumentation) -> None:
+        lines = []
+        for metric, field, kind, help_text in (
+            ("pvpc_stage_calls_total", "calls", "counter", "Stage calls."),
+            ("pvpc_stage_seconds_total", "wall_time", "counter", "Stage wall time."),
+            (
+                "pvpc_stage_allocated_bytes",
+                "allocated_bytes",
+                "gauge",
+                "Net memory allocated by the stage.",
+            ),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in sorted(instrumentation.stages.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {getattr(stats, field)}')
+
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,232 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pvpc.port import OutputPort
+from pvpc.render import MARKDOWN, MessageRenderer
+from pvpc.slots import get_spanish_today, get_utc_now
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    day TEXT NOT NULL,
+    zone TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    fmt TEXT NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (day, zone, channel)
+);
+CREATE INDEX IF NOT EXISTS messages_status ON messages (status, day);
+"""
+
+
+class OutboxItem(NamedTuple):
+    day: str
+    zone: str
+    channel: str
+    fmt: str
+    message: str
+    status: str
+    attempts: int
+    error: Optional[str]
+
+
+class DrainReport(NamedTuple):
+    sent: int
+    failed: int
+    pending: int
+
+
+class Outbox:
+    """Rendered messages waiting to be sent, in a SQLite database.
+
+    Messages are keyed by day, zone and channel, so storing a day again keeps
+    what is already there and a message is sent at most once. Messages that
+    fail to send stay pending until they fail `max_attempts` times.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = 5,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.clock = clock
+        # Sends run on worker threads, but only this thread touches SQLite.
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "Outbox":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def add(self, day: date, zone: str, messages: Dict[str, Tuple[str, str]]) -> int:
+        """Stores the day's message (format and text) for every channel, unless
+        there is one already. Returns how many were stored."""
+        now = self.clock()
+        with self.connection:
+            cursor = self.connection.executemany(
+                "INSERT OR IGNORE INTO messages "
+                "(day, zone, channel, fmt, message, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (day.isoformat(), zone, channel, fmt, message, PENDING, now)
+                    for channel, (fmt, message) in messages.items()
+                ],
+            )
+        return cursor.rowcount
+
+    def has_day(self, day: date, zone: str, channels: Sequence[str]) -> bool:
+        """Whether every channel has a message for the day, whatever its state."""
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM messages WHERE day = ? AND zone = ? "
+            f"AND channel IN ({', '.join('?' * len(channels))})",
+            (day.isoformat(), zone, *channels),
+        ).fetchone()
+        return count == len(set(channels))
+
+    def get_items(
+        self,
+        status: str = PENDING,
+        limit: int = -1,
+        after: Optional[OutboxItem] = None,
+    ) -> List[OutboxItem]:
+        """Items in key order, from the one after `after` on."""
+        key = ("", "", "") if after is None else after[:3]
+        rows = self.connection.execute(
+            "SELECT day, zone, channel, fmt, message, status, attempts, error "
+            "FROM messages WHERE status = ? AND (day, zone, channel) > (?, ?, ?) "
+            "ORDER BY day, zone, channel LIMIT ?",
+            (status, *key, limit),
+        )
+        return [OutboxItem(*row) for row in rows]
+
+    def mark(self, results: Sequence[Tuple[OutboxItem, Optional[str]]]) -> None:
+        """Records the outcome of sending the items: an error, or None if sent."""
+        now = self.clock()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE messages SET status = ?, attempts = ?, error = ?, "
+                "updated_at = ? WHERE day = ? AND zone = ? AND channel = ?",
+                [
+                    (
+                        self.get_status(item, error),
+                        item.attempts + 1,
+                        error,
+                        now,
+                        item.day,
+                        item.zone,
+                        item.channel,
+                    )
+                    for item, error in results
+                ],
+            )
+
+    def get_status(self, item: OutboxItem, error: Optional[str]) -> str:
+        if error is None:
+            return SENT
+        return FAILED if item.attempts + 1 >= self.max_attempts else PENDING
+
+    def drain(
+        self,
+        send: Callable[[str, str, str], object],
+        batch_size: int = 100,
+        max_workers: int = 16,
+    ) -> DrainReport:
+        """Sends the pending messages with `send(channel, message, fmt)`, which
+        returns an exception instead of raising on failure. Messages are taken
+        `batch_size` at a time and each batch's outcome stored in one
+        transaction, so an interrupted drain only resends its last batch."""
+
+        def send_item(item: OutboxItem) -> Optional[str]:
+            try:
+                status = send(item.channel, item.message, item.fmt)
+            except Exception as error:
+                status = error
+            return repr(status) if isinstance(status, Exception) else None
+
+        sent = failed = 0
+        # Walk the keys once, so items that fail and stay pending wait for the
+        # next drain instead of being retried right away.
+        items = self.get_items(PENDING, batch_size)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while items:
+                errors = list(executor.map(send_item, items))
+                self.mark(list(zip(items, errors)))
+                batch_failed = sum(error is not None for error in errors)
+                failed += batch_failed
+                sent += len(items) - batch_failed
+                items = self.get_items(PENDING, batch_size, after=items[-1])
+
+        return DrainReport(sent, failed, len(self.get_items(PENDING)))
+
+
+class OutboxOutputAdapter(OutputPort):
+    """Stores the day's messages in an outbox instead of posting them.
+
+    Every variant is rendered once and stored for each of its channels. The
+    run is skipped when the outbox has the day for every channel already.
+    """
+
+    outbox: Outbox
+    channels: Sequence[str]
+    zone: str
+    variants: Dict[str, Tuple[str, str]]
+    renderer: MessageRenderer
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        channels: Sequence[str],
+        zone: str = "PCB",
+        day: Optional[date] = None,
+        variants: Optional[Dict[str, Tuple[str, str]]] = None,
+        fmt: str = MARKDOWN,
+        language: str = "es",
+        renderer: Optional[MessageRenderer] = None,
+        now: Callable[[], datetime] = get_utc_now,
+    ) -> None:
+        self.outbox = outbox
+        self.channels = channels
+        self.zone = zone
+        self.day = day
+        self.variants = {
+            channel: (variants or {}).get(channel, (fmt, language))
+            for channel in channels
+        }
+        self.renderer = renderer or MessageRenderer()
+        self.now = now
+
+    def get_day(self) -> date:
+        # The day in Spain, as the API's, so runs after midnight UTC, still
+        # the same day there, find it stored.
+        return self.day or get_spanish_today(self.now)
+
+    def has_posted(self) -> bool:
+        return self.outbox.has_day(self.get_day(), self.zone, self.channels)
+
+    def post_processed_data(self, data: dict) -> int:
+        messages = self.renderer.render_all(data, set(self.variants.values()), self.day)
+        return self.outbox.add(
+            self.get_day(),
+            self.zone,
+            {
+                channel: (variant[0], messages[variant])
+                for channel, variant in self.variants.items()
+            },
+        )
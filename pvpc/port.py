@@ -1,13 +1,62 @@
 from abc import ABC, abstractmethod
+from datetime import date
+from typing import Dict, FrozenSet, Iterable, Iterator, Mapping, Optional, Tuple
 
 
 class InputPort(ABC):
     @abstractmethod
-    def get_raw_data() -> dict:
+    def get_raw_data() -> Mapping:
         pass
 
 
 class OutputPort(ABC):
+    # Keys of `processed_data` the port reads, or None for all of them.
+    required_metrics: Optional[FrozenSet[str]] = None
+
     @abstractmethod
     def post_processed_data(data: dict):
         pass
+
+    def has_posted(self) -> bool:
+        """Whether the port has this run's results already, so it can be
+        skipped."""
+        return False
+
+
+class BatchInputPort(ABC):
+    @abstractmethod
+    def get_raw_days(self) -> Iterator[Mapping]:
+        pass
+
+    def get_encoded_days(self) -> Iterator[object]:
+        """The days as read, for `decode_day` to parse where they are
+        processed, e.g. on worker processes. The parsed days by default."""
+        return self.get_raw_days()
+
+    @staticmethod
+    def decode_day(encoded: object) -> Mapping:
+        return encoded
+
+
+class BatchOutputPort(ABC):
+    required_metrics: Optional[FrozenSet[str]] = None
+
+    @abstractmethod
+    def post_processed_days(self, days: Iterable[dict]):
+        pass
+
+    # A processed day in what the port writes, made where the day is
+    # processed, e.g. on worker processes, and posted with post_encoded_days.
+    # It must pickle, so it is a function, not a bound method.
+    @staticmethod
+    def encode_day(day: dict) -> object:
+        return day
+
+    def post_encoded_days(self, encoded: Iterable[object]):
+        return self.post_processed_days(encoded)
+
+
+class AsyncInputPort(ABC):
+    @abstractmethod
+    async def get_raw_days(self) -> Dict[Tuple[str, Optional[date]], Mapping]:
+        pass
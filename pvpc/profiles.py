@@ -0,0 +1,186 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from pvpc.domain import MAX_WINDOW_HOURS, MIN_WINDOW_HOURS
+from pvpc.record import DayRecord
+from pvpc.slots import MINUTES_PER_HOUR
+
+HOURS_PER_DAY = 24
+
+
+class Profile(NamedTuple):
+    """What a subscriber wants out of the day's prices.
+
+    Subscribers see every price as `price * factor + surcharge`, e.g. with VAT
+    and their tariff's tolls. Windows are in hours and, like the cheapest
+    hours, are looked for between the wall-clock hours of `hours`.
+    """
+
+    name: str
+    windows: Tuple[int, ...] = (3,)
+    hours: Tuple[int, int] = (0, HOURS_PER_DAY)
+    cheapest: int = 6
+    threshold: Optional[float] = None
+    factor: float = 1.0
+    surcharge: float = 0.0
+
+    def validate(self) -> None:
+        start, stop = self.hours
+        if not 0 <= start < stop <= HOURS_PER_DAY:
+            raise ValueError(f"Profile {self.name} has invalid hours {self.hours}.")
+        for window in self.windows:
+            if not MIN_WINDOW_HOURS <= window <= min(MAX_WINDOW_HOURS, stop - start):
+                raise ValueError(
+                    f"Profile {self.name} window of {window}h doesn't fit "
+                    f"between {start}h and {stop}h."
+                )
+        if self.cheapest < 0:
+            raise ValueError(f"Profile {self.name} asks for {self.cheapest} hours.")
+        if self.factor <= 0:
+            raise ValueError(f"Profile {self.name} needs a positive price factor.")
+
+    def get_price(self, price: float) -> float:
+        return price * self.factor + self.surcharge
+
+
+class DayIndex:
+    """A day's prices indexed once for every profile.
+
+    Prefix sums give any window's sum in constant time and the slots sorted by
+    price give the cheapest slots or the slots under a price without sorting
+    again. A profile's prices are an increasing function of the day's, so
+    they rank the same and the index answers every profile. Answers are
+    memoized by query, so profiles asking the same things share them.
+    """
+
+    day: DayRecord
+    prefix_sums: array
+    order: List[int]
+    sorted_prices: List[float]
+
+    def __init__(self, day: DayRecord) -> None:
+        self.day = day
+        self.prefix_sums = array("d", accumulate(day.prices, initial=0.0))
+        self.order = sorted(range(len(day.prices)), key=day.prices.__getitem__)
+        self.sorted_prices = [day.prices[slot] for slot in self.order]
+        self.slot_ranges: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self.best_windows: Dict[Tuple[int, int, int], Tuple[int, float]] = {}
+        self.cheapest_slots: Dict[Tuple[int, int, int], List[int]] = {}
+        self.slots_under: Dict[float, List[int]] = {}
+
+    def get_slot_range(self, hours: Tuple[int, int]) -> Tuple[int, int]:
+        """First and stop slots of the wall-clock hours."""
+        slot_range = self.slot_ranges.get(hours)
+        if slot_range is None:
+            starts = self.day.layout.starts
+            slot_range = self.slot_ranges[hours] = (
+                bisect_left(starts, hours[0] * MINUTES_PER_HOUR),
+                bisect_left(starts, hours[1] * MINUTES_PER_HOUR),
+            )
+        return slot_range
+
+    def get_best_window(self, window: int, first: int, stop: int) -> Tuple[int, float]:
+        """Start and price sum, to 6 decimals, of the cheapest `window` slots
+        between `first` and `stop`. Ties go to the earliest start."""
+        key = (window, first, stop)
+        best = self.best_windows.get(key)
+        if best is None:
+            sums = self.prefix_sums
+            # Snap the sums like PVPCDay.get_window_prices, so float drift
+            # doesn't pick another window or round its price differently.
+            best = self.best_windows[key] = min(
+                (
+                    (start, round(sums[start + window] - sums[start], 6))
+                    for start in range(first, stop - window + 1)
+                ),
+                key=lambda window_sum: window_sum[1],
+            )
+        return best
+
+    def get_cheapest_slots(self, k: int, first: int, stop: int) -> List[int]:
+        """The k cheapest slots between `first` and `stop`, in chronological
+        order."""
+        key = (k, first, stop)
+        slots = self.cheapest_slots.get(key)
+        if slots is None:
+            slots = []
+            for slot in self.order:
+                if len(slots) == k:
+                    break
+                if first <= slot < stop:
+                    slots.append(slot)
+            slots.sort()
+            self.cheapest_slots[key] = slots
+        return slots
+
+    def get_slots_under(self, price: float) -> List[int]:
+        """Slots priced at or under `price`, in chronological order."""
+        slots = self.slots_under.get(price)
+        if slots is None:
+            slots = sorted(self.order[: bisect_right(self.sorted_prices, price)])
+            self.slots_under[price] = slots
+        return slots
+
+
+class ProfileReports:
+    """Personalized reports of a day for many subscribers, from one DayIndex
+    built per day."""
+
+    profiles: List[Profile]
+
+    def __init__(self, profiles: Iterable[Profile]) -> None:
+        self.profiles = list(profiles)
+        for profile in self.profiles:
+            profile.validate()
+
+    def run(self, raw_data: Mapping) -> Iterator[Tuple[Profile, dict]]:
+        index = DayIndex(DayRecord.from_payload(raw_data))
+        # Subscribers with the same settings only differ in their name.
+        reports: Dict[tuple, dict] = {}
+        for profile in self.profiles:
+            settings = profile[1:]
+            report = reports.get(settings)
+            if report is None:
+                report = reports[settings] = self.report(index, profile)
+            yield profile, {**report, "name": profile.name}
+
+    def report(self, index: DayIndex, profile: Profile) -> dict:
+        layout, prices = index.day.layout, index.day.prices
+        first, stop = index.get_slot_range(profile.hours)
+
+        def price_of(slots: Iterable[int]) -> Dict[str, float]:
+            return {
+                layout.keys[slot]: round(profile.get_price(prices[slot]), 2)
+                for slot in slots
+            }
+
+        windows = {}
+        for hours in profile.windows:
+            window = layout.get_slots(hours)
+            if stop - first < window:
+                # The hours are shorter than the window on the 23h day.
+                windows[f"{hours}h"] = None
+                continue
+            start, window_sum = index.get_best_window(window, first, stop)
+            windows[f"{hours}h"] = (
+                layout.get_window_key(start, start + window),
+                round(profile.get_price(window_sum / window), 2),
+            )
+
+        report = {
+            "date": index.day.date,
+            "name": profile.name,
+            "cheapest_hours": price_of(
+                index.get_cheapest_slots(
+                    layout.get_slots(profile.cheapest), first, stop
+                )
+            ),
+            "cheapest_windows": windows,
+        }
+        if profile.threshold is not None:
+            # Compare in the day's prices, where the index is sorted.
+            threshold = (profile.threshold - profile.surcharge) / profile.factor
+            report["hours_under_threshold"] = price_of(index.get_slots_under(threshold))
+        return report
@@ -0,0 +1,145 @@
+import heapq
+from bisect import bisect_right
+from array import array
+from datetime import date
+from functools import partial
+from math import ceil
+from typing import (
+    Callable,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from pvpc.archive import PriceArchive
+from pvpc.record import DayRecord
+
+Key = TypeVar("Key")
+
+
+def select(values: List[float], k: int) -> float:
+    """The k-th smallest value (0-based), by quickselect: expected linear time
+    and no full sort. Partitions are rebuilt, so `values` is left untouched."""
+    if not 0 <= k < len(values):
+        raise ValueError(f"Can't select the value of rank {k} out of {len(values)}.")
+
+    while True:
+        # Median of three pivot, so sorted and reversed inputs stay linear.
+        pivot = sorted((values[0], values[len(values) // 2], values[-1]))[1]
+        lows = [value for value in values if value < pivot]
+        if k < len(lows):
+            values = lows
+            continue
+        highs = [value for value in values if value > pivot]
+        pivots = len(values) - len(lows) - len(highs)
+        if k < len(lows) + pivots:
+            return pivot
+        k -= len(lows) + pivots
+        values = highs
+
+
+class PriceSelection(Generic[Key]):
+    """Picks hours by price out of a flat sequence of hourly prices.
+
+    The k cheapest or most expensive hours come from a bounded heap and
+    percentiles from quickselect, so neither sorts the whole sequence: asking
+    for the cheapest 100 hours of a quarter keeps 100 candidates around, not a
+    sorted copy of every hour. Hours are only turned into keys once selected.
+    """
+
+    prices: Sequence[float]
+    get_key: Callable[[int], Key]
+
+    def __init__(self, prices: Sequence[float], get_key: Callable[[int], Key]) -> None:
+        self.prices = prices
+        self.get_key = get_key
+
+    @classmethod
+    def from_day(cls, day: DayRecord) -> "PriceSelection[str]":
+        return cls(day.prices, day.layout.keys.__getitem__)
+
+    @classmethod
+    def from_days(cls, days: Iterable[DayRecord]) -> "PriceSelection[Tuple[date, str]]":
+        prices = array("d")
+        records = []
+        offsets = []
+        for day in days:
+            offsets.append(len(prices))
+            prices.extend(day.prices)
+            records.append(day)
+
+        # Days may have 23, 24 or 25 hours, or quarter hours, so look their
+        # first slot up instead of dividing.
+        def get_key(index: int) -> Tuple[date, str]:
+            day = bisect_right(offsets, index) - 1
+            record = records[day]
+            return record.get_date(), record.layout.keys[index - offsets[day]]
+
+        return cls(prices, get_key)
+
+    @classmethod
+    def from_archive(
+        cls,
+        archive: PriceArchive,
+        start: date,
+        end: date,
+        weekdays: Optional[Set[int]] = None,
+    ) -> "PriceSelection[Tuple[date, str]]":
+        if weekdays is not None:
+            return cls.from_days(
+                archive.to_record(day, prices, flags)
+                for day, prices, flags in archive.iter_days(start, end, weekdays)
+            )
+
+        # A date range is a contiguous run of rows, select straight off the map.
+        rows = archive.get_rows(start, end)
+        prices, _ = archive.read_rows(rows)
+        return cls(prices, partial(archive.get_key, rows))
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def cheapest(self, k: int) -> List[Tuple[Key, float]]:
+        """The k cheapest hours, cheapest first. Ties go to the earliest hour."""
+        self.validate_count(k)
+        return self.to_hours(
+            heapq.nsmallest(k, range(len(self.prices)), key=self.prices.__getitem__)
+        )
+
+    def most_expensive(self, k: int) -> List[Tuple[Key, float]]:
+        """The k most expensive hours, most expensive first."""
+        self.validate_count(k)
+        return self.to_hours(
+            heapq.nlargest(k, range(len(self.prices)), key=self.prices.__getitem__)
+        )
+
+    def under(self, threshold: float) -> List[Tuple[Key, float]]:
+        """Hours priced at or under `threshold`, in chronological order."""
+        return self.to_hours(
+            [index for index, price in enumerate(self.prices) if price <= threshold]
+        )
+
+    def under_percentile(self, percentile: float) -> List[Tuple[Key, float]]:
+        return self.under(self.percentile(percentile))
+
+    def percentile(self, percentile: float) -> float:
+        """Nearest-rank percentile: the lowest price with at least `percentile`
+        percent of the hours priced at or under it."""
+        if not 0 <= percentile <= 100:
+            raise ValueError(f"Percentile {percentile} out of bounds [0, 100].")
+        if not len(self.prices):
+            raise ValueError("Can't take a percentile of no prices.")
+        rank = max(ceil(percentile / 100 * len(self.prices)), 1)
+        return select(list(self.prices), rank - 1)
+
+    def validate_count(self, k: int) -> None:
+        if k < 0:
+            raise ValueError(f"Can't select {k} hours.")
+
+    def to_hours(self, indexes: Iterable[int]) -> List[Tuple[Key, float]]:
+        return [(self.get_key(index), self.prices[index]) for index in indexes]
@@ -0,0 +1,51 @@
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second.
+
+    Up to `capacity` tokens can be spent in a burst. `acquire` blocks the
+    calling thread until a token is available; the sleep happens outside the
+    lock so other threads keep drawing from the bucket meanwhile.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = capacity
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            wait = self.take()
+            if not wait:
+                return
+            self.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Takes a token if one is available, without blocking."""
+        return not self.take()
+
+    def take(self) -> float:
+        """Takes a token and returns 0, or returns how long until there is one."""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
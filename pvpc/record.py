@@ -0,0 +1,140 @@
+import json
+from array import array
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Iterator, Optional, Union
+
+from pvpc.slots import HOURLY, SlotLayout
+
+HOURS_PER_DAY = HOURLY.count
+HOUR_KEYS = HOURLY.keys
+
+DATE_FORMAT = "%d-%m-%Y"
+MARKET = "PVPC"
+UNITS = "€/Mwh"
+# Zones the API publishes prices for, by the code it takes.
+ZONES = {
+    "PCB": "Península, Canarias y Baleares",
+    "CYM": "Ceuta y Melilla",
+}
+
+
+def parse_date(raw_date: str) -> date:
+    return datetime.strptime(raw_date, DATE_FORMAT).date()
+
+
+class InvalidPayloadError(ValueError):
+    pass
+
+
+class DayRecord(Mapping):
+    """Compact, validated day of prices.
+
+    Keeps only the date, the prices and the two flags of every slot, in
+    arrays indexed by slot. Slots are hours, or quarter hours, of a day that
+    may be 23 or 25 hours long, as described by its `layout`. It is still a
+    read-only mapping of slot keys to payload-shaped dicts, built on access,
+    for code that wants the API shape.
+    """
+
+    __slots__ = ("date", "prices", "cheap_flags", "under_avg_flags", "layout")
+
+    date: str
+    prices: array
+    cheap_flags: array
+    under_avg_flags: array
+    layout: SlotLayout
+
+    def __init__(
+        self,
+        date: str,
+        prices: array,
+        cheap_flags: array,
+        under_avg_flags: array,
+        layout: Optional[SlotLayout] = None,
+    ) -> None:
+        self.date = date
+        self.prices = prices
+        self.cheap_flags = cheap_flags
+        self.under_avg_flags = under_avg_flags
+        self.layout = layout or SlotLayout.for_day(parse_date(date), len(prices))
+
+    @classmethod
+    def from_json(cls, payload: Union[bytes, str]) -> "DayRecord":
+        # The C decoder plus one validation pass over its output is about
+        # twice as fast as validating hour by hour from a json object_hook.
+        try:
+            day = json.loads(payload)
+        except ValueError as error:
+            raise InvalidPayloadError(f"Malformed payload: {error}") from error
+        return cls.from_payload(day)
+
+    @classmethod
+    def from_payload(cls, payload: Mapping) -> "DayRecord":
+        if isinstance(payload, DayRecord):
+            return payload
+        if not isinstance(payload, Mapping) or not payload:
+            raise InvalidPayloadError("Expected a mapping of slots.")
+
+        try:
+            layout = cls.get_layout(next(iter(payload.values()))["date"], len(payload))
+            hours = [payload[hour_key] for hour_key in layout.keys]
+            hour_keys = tuple([hour["hour"] for hour in hours])
+            dates = {hour["date"] for hour in hours}
+            units = {hour.get("units", UNITS) for hour in hours}
+            price_types = {type(hour["price"]) for hour in hours}
+            record = cls(
+                next(iter(dates)),
+                array("d", [hour["price"] for hour in hours]),
+                array("b", [hour["is-cheap"] for hour in hours]),
+                array("b", [hour["is-under-avg"] for hour in hours]),
+                layout,
+            )
+        except (KeyError, TypeError) as error:
+            raise InvalidPayloadError(f"Missing or malformed field {error}.") from error
+
+        if hour_keys != layout.keys:
+            raise InvalidPayloadError(
+                "Hours don't match the keys they're stored under."
+            )
+        if len(dates) != 1:
+            raise InvalidPayloadError(f"Hours dated on different days: {dates}.")
+        if not price_types <= {int, float}:
+            raise InvalidPayloadError("Prices must be numbers.")
+        if any(
+            not isinstance(unit, str) or unit.lower() != UNITS.lower() for unit in units
+        ):
+            raise InvalidPayloadError(f"Prices must be in {UNITS}, got {units}.")
+
+        return record
+
+    @staticmethod
+    def get_layout(raw_date: str, count: int) -> SlotLayout:
+        # Most days are 24 hourly slots, only 23 or 25 hour days need checking.
+        if count == HOURS_PER_DAY and raw_date[3:5] not in ("03", "10"):
+            return HOURLY
+        try:
+            return SlotLayout.for_day(parse_date(raw_date), count)
+        except ValueError as error:
+            raise InvalidPayloadError(f"Unexpected slots: {error}") from error
+
+    def get_date(self) -> date:
+        return parse_date(self.date)
+
+    def __getitem__(self, hour_key: str) -> dict:
+        hour = self.layout.index[hour_key]
+        return {
+            "date": self.date,
+            "hour": hour_key,
+            "is-cheap": bool(self.cheap_flags[hour]),
+            "is-under-avg": bool(self.under_avg_flags[hour]),
+            "market": MARKET,
+            "price": self.prices[hour],
+            "units": UNITS,
+        }
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.layout.keys)
+
+    def __len__(self) -> int:
+        return self.layout.count
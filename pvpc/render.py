@@ -0,0 +1,249 @@
+import html
+import re
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from pvpc.record import DATE_FORMAT, ZONES
+from pvpc.slots import get_spanish_today
+
+MARKDOWN = "Markdown"
+MARKDOWN_V2 = "MarkdownV2"
+HTML = "HTML"
+PLAIN = "plain"
+FORMATS = (MARKDOWN, MARKDOWN_V2, HTML, PLAIN)
+
+STRINGS = {
+    "es": {
+        "title": "Precios de la luz para hoy:",
+        "title_tomorrow": "Precios de la luz para mañana:",
+        "title_day": "Precios de la luz para el {day}:",
+        "cheapest_hours": "Las horas más baratas:",
+        "cheapest_periods": "Periodos AM/PM más baratos:",
+        "cheapest_period": "Periodo (3h) más barato:",
+        "hourly_detail": "Detalle por hora:",
+    },
+    "en": {
+        "title": "Electricity prices for today:",
+        "title_tomorrow": "Electricity prices for tomorrow:",
+        "title_day": "Electricity prices for {day}:",
+        "cheapest_hours": "The cheapest hours:",
+        "cheapest_periods": "Cheapest AM/PM periods:",
+        "cheapest_period": "Cheapest (3h) period:",
+        "hourly_detail": "Hourly detail:",
+    },
+}
+LANGUAGES = tuple(STRINGS)
+
+MARKDOWN_SPECIAL = re.compile(r"([_*`\[])")
+MARKDOWN_V2_SPECIAL = re.compile(r"([_*\[\]()~`>#+\-=|{}.!\\])")
+
+ESCAPES: Dict[str, Callable[[str], str]] = {
+    MARKDOWN: lambda text: MARKDOWN_SPECIAL.sub(r"\\\1", text),
+    MARKDOWN_V2: lambda text: MARKDOWN_V2_SPECIAL.sub(r"\\\1", text),
+    HTML: lambda text: html.escape(text, quote=False),
+    PLAIN: lambda text: text,
+}
+# Field values are hour keys and prices, so the only special characters they
+# can hold are MarkdownV2's "-" and ".". Every other format renders them as is.
+VALUE_ESCAPES: Dict[str, Callable[[str], str]] = {
+    MARKDOWN_V2: lambda text: text.replace("-", "\\-").replace(".", "\\."),
+}
+BOLD = {
+    MARKDOWN: "*{}*",
+    MARKDOWN_V2: "*{}*",
+    HTML: "<b>{}</b>",
+    PLAIN: "{}",
+}
+
+
+class Text(NamedTuple):
+    key: str
+
+
+class Bold(NamedTuple):
+    text: Union[str, Text]
+
+
+class Field(NamedTuple):
+    name: str
+    kind: str
+
+
+PRICES = "prices"
+PERIOD = "period"
+TITLE = "title"
+
+MESSAGE = (
+    Field("title", TITLE),
+    "\n\n",
+    Bold(Text("cheapest_hours")),
+    "\n",
+    Field("cheapest_6h", PRICES),
+    "\n\n",
+    Bold(Text("cheapest_periods")),
+    "\n\n",
+    Bold("AM"),
+    " -> ",
+    Text("cheapest_period"),
+    "\n",
+    Field("am_cheapest_3h_period", PERIOD),
+    "\n",
+    Text("hourly_detail"),
+    "\n",
+    Field("am_cheapest_3h_period_unfolded", PRICES),
+    "\n",
+    Bold("PM"),
+    " -> ",
+    Text("cheapest_period"),
+    "\n",
+    Field("pm_cheapest_3h_period", PERIOD),
+    "\n",
+    Text("hourly_detail"),
+    "\n",
+    Field("pm_cheapest_3h_period_unfolded", PRICES),
+)
+
+
+class CompiledTemplate(NamedTuple):
+    parts: Tuple[str, ...]
+    slots: Tuple[Tuple[int, Field], ...]
+    fmt: str
+    language: str
+
+
+def compile_template(template: Iterable, fmt: str, language: str) -> CompiledTemplate:
+    """Resolves texts, markup and escaping of a template up front, merging
+    consecutive literals, so rendering only fills the field slots."""
+    escape = ESCAPES[fmt]
+    strings = STRINGS[language]
+
+    def literal(segment) -> str:
+        if isinstance(segment, Bold):
+            return BOLD[fmt].format(literal(segment.text))
+        if isinstance(segment, Text):
+            return escape(strings[segment.key])
+        return escape(segment)
+
+    parts: List[str] = []
+    slots: List[Tuple[int, Field]] = []
+    for segment in template:
+        if isinstance(segment, Field):
+            slots.append((len(parts), segment))
+            parts.append("")
+        elif parts and not (slots and slots[-1][0] == len(parts) - 1):
+            parts[-1] += literal(segment)
+        else:
+            parts.append(literal(segment))
+
+    return CompiledTemplate(tuple(parts), tuple(slots), fmt, language)
+
+
+def price_line(hour: str, price: float) -> str:
+    return f"{hour}: {str(price)} €/mWh\n"
+
+
+class MessageRenderer:
+    """Renders the daily message in several formats and languages.
+
+    Templates are compiled once per format and language. The price lines
+    don't depend on the language and only MarkdownV2 needs them escaped, so
+    `render_all` formats them at most twice per day whatever the variants.
+    The title says which day the prices are for, when it isn't today in Spain,
+    and is headed by the zone's name for days of a named zone.
+    """
+
+    templates: Dict[Tuple[str, str], CompiledTemplate]
+    today: Callable[[], date]
+
+    def __init__(
+        self,
+        formats: Iterable[str] = FORMATS,
+        languages: Iterable[str] = LANGUAGES,
+        template: Iterable = MESSAGE,
+        today: Callable[[], date] = get_spanish_today,
+    ) -> None:
+        self.templates = {
+            (fmt, language): compile_template(template, fmt, language)
+            for fmt in formats
+            for language in languages
+        }
+        self.today = today
+
+    def render(
+        self,
+        data: dict,
+        fmt: str = MARKDOWN,
+        language: str = "es",
+        day: Optional[date] = None,
+    ) -> str:
+        template = self.templates[(fmt, language)]
+        fields = self.render_fields(data, template)
+        return self.fill(template, fields, day, data.get("zone"))
+
+    def render_all(
+        self,
+        data: dict,
+        variants: Optional[Iterable[Tuple[str, str]]] = None,
+        day: Optional[date] = None,
+    ) -> Dict[Tuple[str, str], str]:
+        fields_by_escape = {}
+        messages = {}
+        for variant in self.templates if variants is None else variants:
+            template = self.templates[variant]
+            escape = VALUE_ESCAPES.get(template.fmt)
+            fields = fields_by_escape.get(escape)
+            if fields is None:
+                fields = fields_by_escape[escape] = self.render_fields(data, template)
+            messages[variant] = self.fill(template, fields, day, data.get("zone"))
+        return messages
+
+    def render_fields(self, data: dict, template: CompiledTemplate) -> Dict[str, str]:
+        escape = VALUE_ESCAPES.get(template.fmt)
+        fields = {}
+        for _, field in template.slots:
+            if field.kind == TITLE:
+                continue
+            value = data[field.name]
+            if field.kind == PERIOD:
+                value = (value,)
+            elif isinstance(value, dict):
+                value = value.items()
+            if escape is None:
+                lines = [price_line(k, v) for k, v in value]
+            else:
+                lines = [price_line(escape(k), escape(str(v))) for k, v in value]
+            fields[field.name] = "".join(lines)
+        return fields
+
+    def render_title(
+        self,
+        template: CompiledTemplate,
+        day: Optional[date],
+        zone: Optional[str] = None,
+    ) -> str:
+        strings = STRINGS[template.language]
+        today = self.today() if day is not None else None
+        if day is None or day == today:
+            title = strings["title"]
+        elif day == today + timedelta(days=1):
+            title = strings["title_tomorrow"]
+        else:
+            title = strings["title_day"].format(day=day.strftime(DATE_FORMAT))
+        if zone is not None:
+            title = f"{ZONES.get(zone, zone)}\n{title}"
+        return ESCAPES[template.fmt](title)
+
+    def fill(
+        self,
+        template: CompiledTemplate,
+        fields: Dict[str, str],
+        day: Optional[date] = None,
+        zone: Optional[str] = None,
+    ) -> str:
+        parts = list(template.parts)
+        for index, field in template.slots:
+            if field.kind == TITLE:
+                parts[index] = self.render_title(template, day, zone)
+            else:
+                parts[index] = fields[field.name]
+        return "".join(parts)
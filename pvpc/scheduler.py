@@ -0,0 +1,279 @@
+import operator
+import time
+from array import array
+from itertools import accumulate
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from pvpc.record import DayRecord
+
+# Loads are placed in hour slots of a horizon, hour 0 being the first hour of
+# its first day. Prices are in €/MWh and power in kW, so costs are in €.
+KW_PER_MW = 1000
+
+
+class Load(NamedTuple):
+    name: str
+    hours: int
+    power: float
+    earliest: int = 0
+    latest: Optional[int] = None
+    # Loads sharing a group, e.g. appliances on the same plug, can't overlap.
+    group: Optional[str] = None
+
+
+class Placement(NamedTuple):
+    load: Load
+    start: int
+    cost: float
+
+    @property
+    def end(self) -> int:
+        return self.start + self.load.hours
+
+
+class Schedule(NamedTuple):
+    placements: List[Placement]
+    cost: float
+    optimal: bool
+
+
+class LoadScheduler:
+    """Minimum cost placement of appliance loads over a horizon of hourly prices.
+
+    Every load costs `power * sum(prices over its hours)`, read off prefix sums,
+    so the cheapest start of a load on its own is a linear scan. Loads that
+    don't interact are placed independently. Loads tied together by a group
+    or by `max_power` are placed by depth-first branch and bound: loads go
+    from the largest, each trying its starts from the cheapest, and a branch
+    is cut as soon as it can't beat the best schedule found so far even if
+    every remaining load got its cheapest start. Identical loads are only
+    tried in order of start, so their permutations aren't searched again.
+
+    With a `gap`, branches that can't improve the best schedule by more than
+    that fraction of its cost are cut too, trading a bounded loss for time.
+    If `time_budget` runs out, the best schedule found so far is returned with
+    `optimal` unset. The budget is shared out between independent components.
+    """
+
+    prices: Sequence[float]
+    prefix_sums: array
+    max_power: Optional[float]
+    time_budget: float
+    gap: float
+
+    def __init__(
+        self,
+        prices: Sequence[float],
+        max_power: Optional[float] = None,
+        time_budget: float = 1.0,
+        gap: float = 0.0,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.prices = prices
+        self.prefix_sums = array("d", accumulate(prices, initial=0.0))
+        self.max_power = max_power
+        self.time_budget = time_budget
+        self.gap = gap
+        self.clock = clock
+
+    @classmethod
+    def from_days(cls, days: Iterable[DayRecord], **kwargs) -> "LoadScheduler":
+        prices = array("d")
+        for day in days:
+            # Loads are placed in hours, whatever the resolution of the day.
+            prices.extend(day.layout.to_hourly(day.prices))
+        return cls(prices, **kwargs)
+
+    def schedule(self, loads: Sequence[Load]) -> Schedule:
+        deadline = self.clock() + self.time_budget
+        placements: Dict[int, Placement] = {}
+        optimal = True
+        components = self.get_components(loads)
+        for solved, component in enumerate(components):
+            remaining = (deadline - self.clock()) / (len(components) - solved)
+            component_placements, component_optimal = self.solve(
+                [loads[index] for index in component], self.clock() + remaining
+            )
+            placements.update(zip(component, component_placements))
+            optimal = optimal and component_optimal
+
+        ordered = [placements[index] for index in range(len(loads))]
+        return Schedule(ordered, sum(p.cost for p in ordered), optimal)
+
+    def get_components(self, loads: Sequence[Load]) -> List[List[int]]:
+        """Indexes of the loads that have to be placed together."""
+        if self.max_power is not None:
+            return [list(range(len(loads)))] if loads else []
+        groups: Dict[object, List[int]] = {}
+        for index, load in enumerate(loads):
+            key = (index,) if load.group is None else load.group
+            groups.setdefault(key, []).append(index)
+        return list(groups.values())
+
+    def get_candidates(self, load: Load) -> List[Tuple[float, int]]:
+        """Every start of the load with its cost, cheapest first."""
+        self.validate_load(load)
+        latest = len(self.prices) if load.latest is None else load.latest
+        prefix_sums = self.prefix_sums
+        scale = load.power / KW_PER_MW
+        candidates = [
+            (scale * (prefix_sums[start + load.hours] - prefix_sums[start]), start)
+            for start in range(load.earliest, latest - load.hours + 1)
+        ]
+        candidates.sort()
+        return candidates
+
+    def validate_load(self, load: Load) -> None:
+        latest = len(self.prices) if load.latest is None else load.latest
+        if load.hours < 1 or load.power < 0:
+            raise ValueError(f"Load {load.name} needs a positive duration and power.")
+        if not 0 <= load.earliest <= latest - load.hours or latest > len(self.prices):
+            raise ValueError(
+                f"Load {load.name} doesn't fit between hours {load.earliest} and "
+                f"{latest} of a {len(self.prices)}h horizon."
+            )
+        if self.max_power is not None and load.power > self.max_power:
+            raise ValueError(
+                f"Load {load.name} draws {load.power}kW, over the "
+                f"{self.max_power}kW limit."
+            )
+
+    def get_packed_cost(self, loads: Sequence[Load]) -> float:
+        """Cost of the loads' energy in the cheapest hours, drawing at most
+        `max_power`, or one load at a time if they share a group. Windows and
+        contiguity are ignored, so no schedule of the loads costs less."""
+        prices = sorted(self.prices)
+        if self.max_power is not None:
+            energy = sum(load.hours * load.power for load in loads)
+            cost = 0.0
+            for price in prices:
+                if energy <= 0:
+                    break
+                cost += min(energy, self.max_power) * price
+                energy -= self.max_power
+            return cost / KW_PER_MW
+        if len({load.group for load in loads}) == 1 and loads[0].group is not None:
+            powers = sorted(
+                (load.power for load in loads for _ in range(load.hours)), reverse=True
+            )
+            return sum(map(operator.mul, powers, prices)) / KW_PER_MW
+        return 0.0
+
+    def solve(self, loads: List[Load], deadline: float) -> Tuple[List[Placement], bool]:
+        if len(loads) == 1:
+            cost, start = self.get_candidates(loads[0])[0]
+            return [Placement(loads[0], start, cost)], True
+
+        # Largest first, identical loads next to each other.
+        kinds: Dict[tuple, int] = {}
+        order = sorted(
+            range(len(loads)),
+            key=lambda index: (
+                -loads[index].hours * loads[index].power,
+                kinds.setdefault(loads[index][1:], len(kinds)),
+            ),
+        )
+        ordered = [loads[index] for index in order]
+        same_as_previous = [False] + [
+            ordered[depth][1:] == ordered[depth - 1][1:]
+            for depth in range(1, len(ordered))
+        ]
+        candidates = [self.get_candidates(load) for load in ordered]
+        # Lower bound of the cost of the loads from each depth on: their
+        # cheapest starts ignoring each other, or their energy packed into the
+        # cheapest hours of the horizon, whichever is higher.
+        bounds = list(accumulate((c[0][0] for c in reversed(candidates)), initial=0.0))
+        bounds.reverse()
+        for depth in range(len(ordered)):
+            bounds[depth] = max(bounds[depth], self.get_packed_cost(ordered[depth:]))
+
+        power = [0.0] * len(self.prices)
+        busy: Dict[str, List[bool]] = {
+            load.group: [False] * len(self.prices)
+            for load in ordered
+            if load.group is not None
+        }
+        max_power = self.max_power
+        keep = 1 - self.gap
+
+        def fits(load: Load, start: int) -> bool:
+            hours = range(start, start + load.hours)
+            if max_power is not None and any(
+                power[hour] + load.power > max_power for hour in hours
+            ):
+                return False
+            return load.group is None or not any(
+                busy[load.group][hour] for hour in hours
+            )
+
+        def place(load: Load, start: int, sign: int) -> None:
+            for hour in range(start, start + load.hours):
+                power[hour] += sign * load.power
+            if load.group is not None:
+                busy[load.group][start : start + load.hours] = [sign > 0] * load.hours
+
+        best_cost = float("inf")
+        best_starts: Optional[List[Tuple[float, int]]] = None
+        positions = [0] * len(ordered)
+        starts: List[Tuple[float, int]] = [(0.0, 0)] * len(ordered)
+        cost = 0.0
+        depth = 0
+        nodes = 0
+        optimal = True
+        while depth >= 0:
+            nodes += 1
+            if nodes % 256 == 0 and self.clock() > deadline:
+                optimal = False
+                break
+
+            load, load_candidates = ordered[depth], candidates[depth]
+            min_start = 0
+            if same_as_previous[depth]:
+                min_start = starts[depth - 1][1] + (load.group is not None)
+            placed = False
+            while positions[depth] < len(load_candidates):
+                candidate_cost, start = load_candidates[positions[depth]]
+                positions[depth] += 1
+                if cost + candidate_cost + bounds[depth + 1] >= best_cost * keep:
+                    # Later starts only cost more, none of them can do better.
+                    positions[depth] = len(load_candidates)
+                    break
+                if start >= min_start and fits(load, start):
+                    place(load, start, 1)
+                    cost += candidate_cost
+                    starts[depth] = (candidate_cost, start)
+                    placed = True
+                    break
+
+            if placed and depth < len(ordered) - 1:
+                depth += 1
+                positions[depth] = 0
+                continue
+            if placed:
+                best_cost, best_starts = cost, list(starts)
+            else:
+                depth -= 1
+                if depth < 0:
+                    break
+            candidate_cost, start = starts[depth]
+            place(ordered[depth], start, -1)
+            cost -= candidate_cost
+
+        if best_starts is None:
+            raise ValueError(
+                "No schedule fits the loads' windows and constraints"
+                + ("." if optimal else " within the time budget.")
+            )
+        placements = [None] * len(loads)
+        for index, load, (candidate_cost, start) in zip(order, ordered, best_starts):
+            placements[index] = Placement(load, start, candidate_cost)
+        return placements, optimal
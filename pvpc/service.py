@@ -0,0 +1,332 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from pvpc.domain import MAX_WINDOW_HOURS, MIN_WINDOW_HOURS, PVPCDay
+from pvpc.profiles import HOURS_PER_DAY, DayIndex
+from pvpc.record import DayRecord, InvalidPayloadError
+from pvpc.slots import get_spanish_today
+
+MAX_HEADER_LINES = 100
+# Responses kept per cached day, for the queries asked most.
+MAX_RESPONSES = 256
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class UnavailableDayError(Exception):
+    """The day's published payload can't be processed, e.g. it is still
+    incomplete. Not a ValueError, as it isn't the request that is wrong."""
+
+
+class CachedDay:
+    """A processed day, its index and the responses already encoded for it."""
+
+    __slots__ = ("record", "index", "report", "responses")
+
+    def __init__(self, raw_data: Mapping) -> None:
+        self.record = DayRecord.from_payload(raw_data)
+        self.index = DayIndex(self.record)
+        processed_data = PVPCDay(input_repo=None, output_repo=None).process(self.record)
+        self.report = {"date": self.record.date, **processed_data}
+        self.responses: Dict[str, bytes] = {}
+
+
+class DayCache:
+    """The last `capacity` days used, loaded and processed with `load_day` on
+    a worker thread.
+
+    Concurrent requests for a day that isn't cached share a single load. Days
+    that aren't published yet, whose load raises LookupError, or whose payload
+    is invalid, raising UnavailableDayError, are remembered for `missing_ttl`
+    seconds, so requests for them don't all go upstream.
+    """
+
+    capacity: int
+    missing_ttl: float
+    days: "OrderedDict[date, CachedDay]"
+    missing: Dict[date, Tuple[float, Exception]]
+
+    def __init__(
+        self,
+        load_day: Callable[[date], Mapping],
+        capacity: int = 64,
+        missing_ttl: float = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.load_day = load_day
+        self.capacity = capacity
+        self.missing_ttl = missing_ttl
+        self.clock = clock
+        self.days = OrderedDict()
+        self.missing = {}
+        self.loading: Dict[date, "asyncio.Future[CachedDay]"] = {}
+
+    def __contains__(self, day: date) -> bool:
+        return day in self.days
+
+    async def get(self, day: date) -> CachedDay:
+        cached = self.days.get(day)
+        if cached is not None:
+            self.days.move_to_end(day)
+            return cached
+        missing = self.missing.get(day)
+        if missing is not None and missing[0] > self.clock():
+            raise type(missing[1])(*missing[1].args)
+        return await self.load(day)
+
+    async def load(self, day: date) -> CachedDay:
+        """Loads the day again, even if it is cached or missing."""
+        loading = self.loading.get(day)
+        if loading is None:
+            loading = asyncio.ensure_future(self.build(day))
+            self.loading[day] = loading
+            loading.add_done_callback(lambda _: self.loading.pop(day, None))
+        return await asyncio.shield(loading)
+
+    async def build(self, day: date) -> CachedDay:
+        loop = asyncio.get_running_loop()
+        try:
+            cached = await loop.run_in_executor(
+                None, self.build_day, day, self.days.get(day)
+            )
+        except (LookupError, UnavailableDayError) as error:
+            now = self.clock()
+            self.missing = {
+                missing_day: missing
+                for missing_day, missing in self.missing.items()
+                if missing[0] > now
+            }
+            self.missing[day] = (now + self.missing_ttl, error)
+            raise
+        self.missing.pop(day, None)
+        self.days[day] = cached
+        self.days.move_to_end(day)
+        while len(self.days) > self.capacity:
+            self.days.popitem(last=False)
+        return cached
+
+    def build_day(self, day: date, cached: Optional[CachedDay]) -> CachedDay:
+        """Runs on a worker thread, so processing doesn't block the event
+        loop. Keeps the cached day, and its responses, if prices didn't
+        change."""
+        try:
+            record = DayRecord.from_payload(self.load_day(day))
+        except InvalidPayloadError as error:
+            raise UnavailableDayError(str(error)) from error
+        if cached is not None and cached.record == record:
+            return cached
+        return CachedDay(record)
+
+
+class ReportService:
+    """Processed reports over HTTP, served from a DayCache.
+
+    GET endpoints, where DAY is `today`, `tomorrow` or YYYY-MM-DD:
+
+        /report/DAY                             the daily report
+        /windows/DAY?hours=3&start=0&stop=24    the cheapest window
+        /cheapest/DAY?k=6&start=0&stop=24       the k cheapest hours
+        /most-expensive/DAY?k=6&start=0&stop=24 the k most expensive hours
+
+    `start` and `stop` are wall-clock hours to look in. Responses are JSON,
+    encoded once per day and query. Every `refresh_interval` seconds today's
+    and tomorrow's prices are loaded in the background if they aren't cached
+    yet, so they are ready once published.
+    """
+
+    cache: DayCache
+    refresh_interval: float
+
+    def __init__(
+        self,
+        cache: DayCache,
+        today: Callable[[], date] = get_spanish_today,
+        refresh_interval: float = 600,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ) -> None:
+        self.cache = cache
+        self.today = today
+        self.refresh_interval = refresh_interval
+        self.sleep = sleep
+        self.routes = {
+            "report": self.get_report,
+            "windows": self.get_window,
+            "cheapest": self.get_cheapest,
+            "most-expensive": self.get_most_expensive,
+        }
+
+    async def handle(self, target: str) -> Tuple[int, bytes]:
+        try:
+            return 200, await self.route(target)
+        except HTTPError as error:
+            status, message = error.status, str(error)
+        except ValueError as error:
+            status, message = 400, str(error)
+        except LookupError as error:
+            status, message = 404, f"No prices for the day: {error}"
+        except Exception as error:
+            status, message = 503, f"Can't load the day: {error!r}"
+        return status, json.dumps({"error": message}).encode()
+
+    async def route(self, target: str) -> bytes:
+        url = urlparse(target)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] not in self.routes:
+            raise HTTPError(404, f"Unknown path {url.path}.")
+
+        cached = await self.cache.get(self.parse_day(parts[1]))
+        response = cached.responses.get(target)
+        if response is None:
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            body = self.routes[parts[0]](cached, query)
+            response = json.dumps(body, ensure_ascii=False).encode()
+            if len(cached.responses) < MAX_RESPONSES:
+                cached.responses[target] = response
+        return response
+
+    def parse_day(self, raw_day: str) -> date:
+        if raw_day == "today":
+            return self.today()
+        if raw_day == "tomorrow":
+            return self.today() + timedelta(days=1)
+        return date.fromisoformat(raw_day)
+
+    def get_report(self, cached: CachedDay, query: Dict[str, str]) -> dict:
+        return cached.report
+
+    def get_window(self, cached: CachedDay, query: Dict[str, str]) -> dict:
+        hours = int(query.get("hours", 3))
+        first, stop = self.get_slot_range(cached, query)
+        layout = cached.record.layout
+        window = layout.get_slots(hours)
+        if not MIN_WINDOW_HOURS <= hours <= MAX_WINDOW_HOURS or window > stop - first:
+            raise ValueError(f"A {hours}h window doesn't fit the hours asked.")
+        start, window_sum = cached.index.get_best_window(window, first, stop)
+        return {
+            "date": cached.record.date,
+            "hours": hours,
+            "window": layout.get_window_key(start, start + window),
+            "price": round(window_sum / window, 2),
+        }
+
+    def get_cheapest(self, cached: CachedDay, query: Dict[str, str]) -> dict:
+        return self.get_ranked(cached, query, cached.index.order)
+
+    def get_most_expensive(self, cached: CachedDay, query: Dict[str, str]) -> dict:
+        return self.get_ranked(cached, query, reversed(cached.index.order))
+
+    def get_ranked(
+        self, cached: CachedDay, query: Dict[str, str], order
+    ) -> Dict[str, object]:
+        k = int(query.get("k", 6))
+        if k < 0:
+            raise ValueError(f"Can't select {k} hours.")
+        first, stop = self.get_slot_range(cached, query)
+        slots: List[int] = []
+        for slot in order:
+            if len(slots) == k:
+                break
+            if first <= slot < stop:
+                slots.append(slot)
+        keys, prices = cached.record.layout.keys, cached.record.prices
+        return {
+            "date": cached.record.date,
+            "prices": [(keys[slot], prices[slot]) for slot in slots],
+        }
+
+    def get_slot_range(
+        self, cached: CachedDay, query: Dict[str, str]
+    ) -> Tuple[int, int]:
+        hours = (int(query.get("start", 0)), int(query.get("stop", HOURS_PER_DAY)))
+        if not 0 <= hours[0] < hours[1] <= HOURS_PER_DAY:
+            raise ValueError(f"Invalid hours {hours}.")
+        return cached.index.get_slot_range(hours)
+
+    async def refresh(self) -> List[date]:
+        """Loads today's and tomorrow's prices again. Returns the days that
+        were new or changed; tomorrow's fails until it is published."""
+        loaded = []
+        today = self.today()
+        for day in (today, today + timedelta(days=1)):
+            previous = self.cache.days.get(day)
+            try:
+                cached = await self.cache.load(day)
+            except Exception:
+                continue
+            if cached is not previous:
+                loaded.append(day)
+        return loaded
+
+    async def refresh_forever(self) -> None:
+        while True:
+            await self.refresh()
+            await self.sleep(self.refresh_interval)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = await self.read_headers(reader)
+                method, target, version = request_line.decode("latin-1").split()
+                if method != "GET":
+                    status, body = 405, b'{"error": "Only GET is supported."}'
+                else:
+                    status, body = await self.handle(target)
+
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    "\r\n".encode() + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_headers(self, reader: asyncio.StreamReader) -> Dict[str, str]:
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        raise ValueError("Too many headers.")
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        refresh = asyncio.ensure_future(self.refresh_forever())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refresh.cancel()
@@ -0,0 +1,178 @@
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple
+
+MINUTES_PER_HOUR = 60
+MINUTES_PER_DAY = 24 * MINUTES_PER_HOUR
+RESOLUTIONS = (60, 15)
+
+# Spain follows the EU rule: clocks go forward from 02:00 to 03:00 on the last
+# Sunday of March and back from 03:00 to 02:00 on the last Sunday of October.
+FORWARD_MINUTE = 2 * MINUTES_PER_HOUR
+BACKWARD_MINUTE = 3 * MINUTES_PER_HOUR
+# Slots in the repeated hour of the October change get their key suffixed.
+REPEATED_SUFFIX = "b"
+# Peninsular offsets from UTC. Both changes happen at 01:00 UTC.
+STANDARD_OFFSET = timedelta(hours=1)
+SUMMER_OFFSET = timedelta(hours=2)
+CHANGE_TIME = time(1)
+
+
+@lru_cache(maxsize=None)
+def get_last_sunday(year: int, month: int) -> date:
+    last_day = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last_day - timedelta(days=(last_day.weekday() + 1) % 7)
+
+
+def get_day_minutes(day: date) -> int:
+    """Length of the day in Spanish local time."""
+    if day.month == 3 and day == get_last_sunday(day.year, 3):
+        return MINUTES_PER_DAY - MINUTES_PER_HOUR
+    if day.month == 10 and day == get_last_sunday(day.year, 10):
+        return MINUTES_PER_DAY + MINUTES_PER_HOUR
+    return MINUTES_PER_DAY
+
+
+def is_summer_time(utc: datetime) -> bool:
+    """Whether Spain is on summer time at a naive UTC time."""
+    start = datetime.combine(get_last_sunday(utc.year, 3), CHANGE_TIME)
+    end = datetime.combine(get_last_sunday(utc.year, 10), CHANGE_TIME)
+    return start <= utc < end
+
+
+def to_spanish_time(moment: datetime) -> datetime:
+    """Spanish wall-clock time, naive, of an aware datetime."""
+    utc = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return utc + (SUMMER_OFFSET if is_summer_time(utc) else STANDARD_OFFSET)
+
+
+def from_spanish_time(wall_time: datetime) -> datetime:
+    """Aware UTC datetime of a naive Spanish wall-clock time. Times in the
+    repeated hour are its first pass, and skipped ones after the change."""
+    summer_utc = wall_time - SUMMER_OFFSET
+    utc = summer_utc if is_summer_time(summer_utc) else wall_time - STANDARD_OFFSET
+    return utc.replace(tzinfo=timezone.utc)
+
+
+def get_utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def get_spanish_today(now: Callable[[], datetime] = get_utc_now) -> date:
+    """Today in Spain, whatever the time zone of the host."""
+    return to_spanish_time(now()).date()
+
+
+def format_minute(minute: int, minutes: int) -> str:
+    if minutes % MINUTES_PER_HOUR == 0:
+        return str(minute // MINUTES_PER_HOUR).zfill(2)
+    return f"{str(minute // MINUTES_PER_HOUR).zfill(2)}:{str(minute % 60).zfill(2)}"
+
+
+class SlotLayout:
+    """Slots of a day at a given resolution, in local wall-clock time.
+
+    Slot `i` covers minutes `i * minutes` to `(i + 1) * minutes` elapsed since
+    midnight, and is keyed by the wall-clock time it covers: "HH-HH" for
+    hourly slots, as the API does, or "HH:MM-HH:MM" for shorter ones. On the
+    23h day the keys skip 02:00-03:00, and on the 25h day the second pass
+    through 02:00-03:00 gets keys like "02-03b".
+    """
+
+    minutes: int
+    day_minutes: int
+    count: int
+    slots_per_hour: int
+    starts: List[int]
+    keys: Tuple[str, ...]
+    index: Dict[str, int]
+    window_keys: Dict[int, Tuple[str, ...]]
+
+    def __init__(self, minutes: int = 60, day_minutes: int = MINUTES_PER_DAY) -> None:
+        if minutes not in RESOLUTIONS or day_minutes % minutes:
+            raise ValueError(
+                f"Can't split a {day_minutes} minute day in {minutes} minute slots."
+            )
+        self.minutes = minutes
+        self.day_minutes = day_minutes
+        self.count = day_minutes // minutes
+        self.slots_per_hour = MINUTES_PER_HOUR // minutes
+
+        self.starts = []
+        keys = []
+        for elapsed in range(0, day_minutes, minutes):
+            start, suffix = self.get_wall_minute(elapsed)
+            self.starts.append(start)
+            keys.append(
+                f"{format_minute(start, minutes)}-"
+                f"{format_minute(start + minutes, minutes)}{suffix}"
+            )
+        self.keys = tuple(keys)
+        self.index = {key: slot for slot, key in enumerate(self.keys)}
+        self.window_keys = {}
+
+    @classmethod
+    def for_day(cls, day: date, count: int) -> "SlotLayout":
+        """Layout of `count` slots on `day`. Sources that don't follow the
+        clock changes give 23 and 25 hour days the slots of any other day,
+        e.g. 24 hourly ones, so those get the regular day's layout."""
+        for day_minutes in dict.fromkeys((get_day_minutes(day), MINUTES_PER_DAY)):
+            if count > 0 and day_minutes % count == 0:
+                if day_minutes // count in RESOLUTIONS:
+                    return get_layout(day_minutes // count, day_minutes)
+        raise ValueError(f"{count} slots don't split the {day} day evenly.")
+
+    def get_wall_minute(self, elapsed: int) -> Tuple[int, str]:
+        if self.day_minutes < MINUTES_PER_DAY and elapsed >= FORWARD_MINUTE:
+            return elapsed + MINUTES_PER_HOUR, ""
+        if self.day_minutes > MINUTES_PER_DAY and elapsed >= BACKWARD_MINUTE:
+            repeated = elapsed < BACKWARD_MINUTE + MINUTES_PER_HOUR
+            return elapsed - MINUTES_PER_HOUR, REPEATED_SUFFIX if repeated else ""
+        return elapsed, ""
+
+    def get_slots(self, hours: int) -> int:
+        return hours * self.slots_per_hour
+
+    def get_start_slots(self, start_hours: range, window: int) -> range:
+        """Slots starting at a wall-clock hour of `start_hours` that leave room
+        for `window` slots before the end of the day."""
+        # Wall-clock starts never decrease, the repeated hour just stalls them.
+        first = bisect_left(self.starts, start_hours.start * MINUTES_PER_HOUR)
+        stop = bisect_left(self.starts, start_hours.stop * MINUTES_PER_HOUR)
+        return range(first, min(stop, self.count - window + 1))
+
+    def get_window_key(self, start: int, stop: int) -> str:
+        """Key of the slots from `start` to `stop`, e.g. "00-03" for hourly
+        slots or "00:00-03:00" for quarter hours. Windows starting in the
+        repeated hour keep its suffix, e.g. "02b-05"."""
+        first, last = self.keys[start], self.keys[stop - 1]
+        suffix = REPEATED_SUFFIX if first.endswith(REPEATED_SUFFIX) else ""
+        return f"{first[: first.index('-')]}{suffix}-{last[last.index('-') + 1 :]}"
+
+    def get_window_keys(self, window: int) -> Tuple[str, ...]:
+        """Keys of the windows of `window` slots by start slot, built once per
+        window length, as layouts are shared by every day of the same shape."""
+        keys = self.window_keys.get(window)
+        if keys is None:
+            keys = self.window_keys[window] = tuple(
+                self.get_window_key(start, start + window)
+                for start in range(self.count - window + 1)
+            )
+        return keys
+
+    def to_hourly(self, prices: Sequence[float]) -> List[float]:
+        """Hourly average of slot prices."""
+        per_hour = self.slots_per_hour
+        return [
+            sum(prices[start : start + per_hour]) / per_hour
+            for start in range(0, len(prices), per_hour)
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_layout(minutes: int = 60, day_minutes: int = MINUTES_PER_DAY) -> SlotLayout:
+    return SlotLayout(minutes, day_minutes)
+
+
+HOURLY = get_layout(60, MINUTES_PER_DAY)
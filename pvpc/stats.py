@@ -0,0 +1,313 @@
+import json
+import os
+import statistics
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pvpc.record import DayRecord
+from pvpc.slots import MINUTES_PER_HOUR
+
+WINDOW_DAYS = 30
+STATE_VERSION = 1
+
+
+class RunningMoments:
+    """Count, mean and variance of a stream, by Welford's update."""
+
+    count: int
+    mean: float
+    m2: float
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0) -> None:
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def to_list(self) -> list:
+        return [self.count, self.mean, self.m2]
+
+
+class P2Quantile:
+    """Streaming estimate of a quantile in constant space, by the P² algorithm
+    (Jain and Chlamtac, 1985): five markers track the minimum, the maximum, the
+    quantile and the quantiles halfway to each end, and are nudged along a
+    parabola fitted to their neighbours as values come in."""
+
+    quantile: float
+    count: int
+    heights: List[float]
+    positions: List[int]
+
+    def __init__(
+        self,
+        quantile: float = 0.5,
+        count: int = 0,
+        heights: Optional[List[float]] = None,
+        positions: Optional[List[int]] = None,
+    ) -> None:
+        if not 0 < quantile < 1:
+            raise ValueError(f"Quantile {quantile} out of bounds (0, 1).")
+        self.quantile = quantile
+        self.count = count
+        self.heights = heights or []
+        self.positions = positions or [1, 2, 3, 4, 5]
+
+    def add(self, value: float) -> None:
+        heights, positions = self.heights, self.positions
+        self.count += 1
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+        for marker in range(cell + 1, 5):
+            positions[marker] += 1
+
+        for marker, desired in zip((1, 2, 3), self.get_desired_positions()[1:4]):
+            offset = desired - positions[marker]
+            if (offset >= 1 and positions[marker + 1] - positions[marker] > 1) or (
+                offset <= -1 and positions[marker - 1] - positions[marker] < -1
+            ):
+                step = 1 if offset > 0 else -1
+                height = self.get_parabolic(marker, step)
+                if not heights[marker - 1] < height < heights[marker + 1]:
+                    height = self.get_linear(marker, step)
+                heights[marker] = height
+                positions[marker] += step
+
+    def get_desired_positions(self) -> List[float]:
+        p, last = self.quantile, self.count - 1
+        return [1, 1 + last * p / 2, 1 + last * p, 1 + last * (1 + p) / 2, self.count]
+
+    def get_parabolic(self, marker: int, step: int) -> float:
+        q, n = self.heights, self.positions
+        return q[marker] + step / (n[marker + 1] - n[marker - 1]) * (
+            (n[marker] - n[marker - 1] + step)
+            * (q[marker + 1] - q[marker])
+            / (n[marker + 1] - n[marker])
+            + (n[marker + 1] - n[marker] - step)
+            * (q[marker] - q[marker - 1])
+            / (n[marker] - n[marker - 1])
+        )
+
+    def get_linear(self, marker: int, step: int) -> float:
+        q, n = self.heights, self.positions
+        return q[marker] + step * (q[marker + step] - q[marker]) / (
+            n[marker + step] - n[marker]
+        )
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self.heights:
+            return None
+        if self.count <= 5:
+            # Too few values for the markers, take the nearest rank.
+            rank = max(int(self.quantile * len(self.heights) + 0.5), 1)
+            return self.heights[rank - 1]
+        return self.heights[2]
+
+    def to_list(self) -> list:
+        return [self.count, self.heights, self.positions]
+
+
+class Distribution:
+    """Mean, variance and median of a stream of prices."""
+
+    moments: RunningMoments
+    median: P2Quantile
+
+    def __init__(
+        self,
+        moments: Optional[RunningMoments] = None,
+        median: Optional[P2Quantile] = None,
+    ) -> None:
+        self.moments = moments or RunningMoments()
+        self.median = median or P2Quantile(0.5)
+
+    def add(self, value: float) -> None:
+        self.moments.add(value)
+        self.median.add(value)
+
+    def to_list(self) -> list:
+        return [self.moments.to_list(), self.median.to_list()]
+
+    @classmethod
+    def from_list(cls, data: list) -> "Distribution":
+        moments, (count, heights, positions) = data
+        return cls(RunningMoments(*moments), P2Quantile(0.5, count, heights, positions))
+
+
+class PriceStatistics:
+    """Aggregates of past days, updated in constant time per day.
+
+    Keeps the daily average prices of the last `WINDOW_DAYS` days, for exact
+    rolling means and medians, and running distributions of the daily average
+    price, overall and by weekday, and of the hourly prices by hour of day.
+    Days are added in date order; days up to the last one added are skipped,
+    so replaying a day doesn't count it twice.
+    """
+
+    last_date: Optional[date]
+    window: List[Tuple[int, float]]
+    daily: Distribution
+    weekdays: List[Distribution]
+    hours: List[Distribution]
+
+    def __init__(
+        self,
+        last_date: Optional[date] = None,
+        window: Optional[List[Tuple[int, float]]] = None,
+        daily: Optional[Distribution] = None,
+        weekdays: Optional[List[Distribution]] = None,
+        hours: Optional[List[Distribution]] = None,
+    ) -> None:
+        self.last_date = last_date
+        self.window = window or []
+        self.daily = daily or Distribution()
+        self.weekdays = weekdays or [Distribution() for _ in range(7)]
+        self.hours = hours or [Distribution() for _ in range(24)]
+
+    def add_day(self, day: DayRecord) -> bool:
+        day_date = day.get_date()
+        if self.last_date is not None and day_date <= self.last_date:
+            return False
+
+        average = get_average(day.prices)
+        self.daily.add(average)
+        self.weekdays[day_date.weekday()].add(average)
+        for hour, price in get_hourly_prices(day):
+            self.hours[hour].add(price)
+
+        ordinal = day_date.toordinal()
+        self.window.append((ordinal, average))
+        self.window = self.get_window(ordinal + 1)
+        self.last_date = day_date
+        return True
+
+    def get_window(self, end_ordinal: int) -> List[Tuple[int, float]]:
+        """Daily averages of the `WINDOW_DAYS` days before `end_ordinal`."""
+        start = end_ordinal - WINDOW_DAYS
+        return [(o, average) for o, average in self.window if start <= o < end_ordinal]
+
+    def compare(self, day: DayRecord) -> dict:
+        """The day against the days before it."""
+        day_date = day.get_date()
+        average = get_average(day.prices)
+        window = self.get_window(day_date.toordinal())
+        averages = [past for _, past in window]
+        same_weekday = [
+            past
+            for ordinal, past in window
+            if date.fromordinal(ordinal).weekday() == day_date.weekday()
+        ]
+        median = statistics.median(averages) if averages else None
+        weekday = self.weekdays[day_date.weekday()]
+
+        return {
+            "average": round(average, 2),
+            f"mean_{WINDOW_DAYS}d": round_or_none(
+                statistics.fmean(averages) if averages else None
+            ),
+            f"median_{WINDOW_DAYS}d": round_or_none(median),
+            f"vs_median_{WINDOW_DAYS}d": round_or_none(
+                (average - median) / median * 100 if median else None
+            ),
+            "weekday_mean": round_or_none(
+                weekday.moments.mean if weekday.moments.count else None
+            ),
+            f"cheapest_day_{WINDOW_DAYS}d": bool(averages) and average < min(averages),
+            f"cheapest_weekday_{WINDOW_DAYS}d": bool(same_weekday)
+            and average < min(same_weekday),
+            "cheaper_than_usual": [
+                key
+                for key, price, hour in zip(
+                    day.layout.keys, day.prices, get_slot_hours(day)
+                )
+                if self.hours[hour].median.value is not None
+                and price < self.hours[hour].median.value
+            ],
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "version": STATE_VERSION,
+            "last_date": self.last_date and self.last_date.isoformat(),
+            "window": self.window,
+            "daily": self.daily.to_list(),
+            "weekdays": [distribution.to_list() for distribution in self.weekdays],
+            "hours": [distribution.to_list() for distribution in self.hours],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PriceStatistics":
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported statistics version {data.get('version')}.")
+        last_date = data["last_date"]
+        return cls(
+            date.fromisoformat(last_date) if last_date else None,
+            [tuple(entry) for entry in data["window"]],
+            Distribution.from_list(data["daily"]),
+            [Distribution.from_list(entry) for entry in data["weekdays"]],
+            [Distribution.from_list(entry) for entry in data["hours"]],
+        )
+
+
+class StatisticsStore:
+    """PriceStatistics saved as a small JSON file, replaced atomically."""
+
+    path: Path
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def load(self) -> PriceStatistics:
+        try:
+            with open(self.path, "r") as state_file:
+                return PriceStatistics.from_dict(json.load(state_file))
+        except FileNotFoundError:
+            return PriceStatistics()
+
+    def save(self, stats: PriceStatistics) -> None:
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp_path, "w") as tmp_file:
+            json.dump(stats.to_dict(), tmp_file, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+def get_average(prices: Sequence[float]) -> float:
+    return sum(prices) / len(prices)
+
+
+def get_slot_hours(day: DayRecord) -> List[int]:
+    """Wall-clock hour of every slot of the day."""
+    return [start // MINUTES_PER_HOUR for start in day.layout.starts]
+
+
+def get_hourly_prices(day: DayRecord) -> List[Tuple[int, float]]:
+    layout = day.layout
+    hourly = layout.to_hourly(day.prices)
+    starts = layout.starts[:: layout.slots_per_hour]
+    return [(start // MINUTES_PER_HOUR, price) for start, price in zip(starts, hourly)]
+
+
+def round_or_none(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 2)
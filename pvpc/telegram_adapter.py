@@ -0,0 +1,137 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import telegram
+
+from pvpc.port import OutputPort
+from pvpc.ratelimit import TokenBucket
+from pvpc.render import MARKDOWN, PLAIN, MessageRenderer, price_line
+
+
+class TelegramOutputAdapter(OutputPort):
+
+    bot: telegram.Bot
+    channel: str
+    renderer: MessageRenderer = MessageRenderer()
+    fmt: str = MARKDOWN
+    language: str = "es"
+    day: Optional[date] = None
+
+    def __init__(
+        self,
+        token: str,
+        channel: str,
+        fmt: str = MARKDOWN,
+        language: str = "es",
+        day: Optional[date] = None,
+    ) -> None:
+        self.channel = channel
+        self.bot = telegram.Bot(token=token)
+        self.fmt = fmt
+        self.language = language
+        self.day = day
+
+    def tuple_to_str(self, tuple: Tuple[str, float]) -> str:
+        return self.key_value_pair_to_str(tuple[0], tuple[1])
+
+    def key_value_pair_to_str(self, k: str, v: float) -> str:
+        return price_line(k, v)
+
+    def list_of_tuples_to_str(self, data: List[Tuple[str, float]]) -> str:
+        return "".join([self.key_value_pair_to_str(k, v) for k, v in data])
+
+    def dict_to_str(self, data: dict) -> str:
+        return "".join([self.key_value_pair_to_str(k, v) for k, v in data.items()])
+
+    def generate_message(self, data: dict) -> str:
+        return self.renderer.render(data, self.fmt, self.language, self.day)
+
+    def get_parse_mode(self, fmt: str) -> Optional[str]:
+        return None if fmt == PLAIN else fmt
+
+    def post_processed_data(self, data: dict):
+        message = self.generate_message(data)
+
+        status = self.bot.send_message(
+            chat_id=self.channel,
+            text=message,
+            parse_mode=self.get_parse_mode(self.fmt),
+        )
+        print(status)
+
+
+class TelegramFanOutOutputAdapter(TelegramOutputAdapter):
+
+    channels: Sequence[str]
+    variants: Dict[str, Tuple[str, str]]
+    global_bucket: TokenBucket
+    chat_buckets: Dict[str, TokenBucket]
+
+    def __init__(
+        self,
+        token: str,
+        channels: Sequence[str],
+        max_workers: int = 16,
+        global_rate: float = 30,
+        per_chat_rate: float = 1,
+        max_retries: int = 3,
+        sleep: Callable[[float], None] = time.sleep,
+        variants: Optional[Dict[str, Tuple[str, str]]] = None,
+        fmt: str = MARKDOWN,
+        language: str = "es",
+        day: Optional[date] = None,
+    ) -> None:
+        super().__init__(token=token, channel=None, fmt=fmt, language=language, day=day)
+        self.channels = channels
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.variants = {
+            channel: (variants or {}).get(channel, (fmt, language))
+            for channel in channels
+        }
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_buckets = {
+            channel: TokenBucket(per_chat_rate) for channel in channels
+        }
+
+    def post_processed_data(self, data: dict) -> Dict[str, object]:
+        messages = self.renderer.render_all(data, set(self.variants.values()), self.day)
+
+        def send_variant(channel: str) -> object:
+            variant = self.variants[channel]
+            return self.send(channel, messages[variant], variant[0])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            statuses = dict(
+                zip(self.channels, executor.map(send_variant, self.channels))
+            )
+
+        for channel, status in statuses.items():
+            print(channel, status)
+        errors = [
+            status for status in statuses.values() if isinstance(status, Exception)
+        ]
+        if errors:
+            raise errors[0]
+        return statuses
+
+    def send(self, channel: str, message: str, fmt: str = MARKDOWN) -> object:
+        for attempt in range(self.max_retries + 1):
+            self.chat_buckets[channel].acquire()
+            self.global_bucket.acquire()
+            try:
+                return self.bot.send_message(
+                    chat_id=channel,
+                    text=message,
+                    parse_mode=self.get_parse_mode(fmt),
+                )
+            except telegram.error.RetryAfter as error:
+                if attempt == self.max_retries:
+                    return error
+                # Only this chat's worker waits, the other sends keep going.
+                self.sleep(error.retry_after)
+            except telegram.error.TelegramError as error:
+                return error
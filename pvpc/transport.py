@@ -0,0 +1,100 @@
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pvpc.instrumentation import Instrumentation, NullInstrumentation
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class AttemptMetric(NamedTuple):
+    url: str
+    attempt: int
+    latency: float
+    status: Optional[int]
+    error: Optional[str]
+
+
+class HTTPTransport:
+    """Pooled HTTP session with timeouts and jittered exponential backoff.
+
+    Connection errors, timeouts and retryable statuses are retried up to
+    `retries` times, sleeping a random time between zero and
+    `backoff * 2 ** attempt` (capped at `max_backoff`) before each retry.
+    The last `max_metrics` attempts are kept in `metrics`, so a long-running
+    service doesn't grow it forever.
+    """
+
+    session: requests.Session
+    metrics: Deque[AttemptMetric]
+
+    def __init__(
+        self,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10,
+        pool_size: int = 10,
+        max_metrics: int = 1000,
+        session: Optional[requests.Session] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+        instrumentation: Optional[Instrumentation] = None,
+    ) -> None:
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.jitter = jitter
+        self.metrics = deque(maxlen=max_metrics)
+        self.instrumentation = instrumentation or NullInstrumentation()
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def get(self, url: str, headers: Optional[dict] = None) -> requests.Response:
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                self.record(url, attempt, start, error=type(error).__name__)
+                if attempt == self.retries:
+                    raise
+            else:
+                self.record(url, attempt, start, status=response.status_code)
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt == self.retries
+                ):
+                    return response
+
+            self.sleep(self.get_backoff(attempt))
+
+    def get_backoff(self, attempt: int) -> float:
+        return self.jitter() * min(self.max_backoff, self.backoff * 2**attempt)
+
+    def record(
+        self,
+        url: str,
+        attempt: int,
+        start: float,
+        status: Optional[int] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        latency = time.perf_counter() - start
+        self.metrics.append(AttemptMetric(url, attempt, latency, status, error))
+        self.instrumentation.observe("http_attempt", latency)
+
+    def close(self) -> None:
+        self.session.close()
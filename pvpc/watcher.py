@@ -0,0 +1,100 @@
+import time
+from datetime import date, datetime, time as day_time, timedelta
+from typing import Callable, Optional, Tuple, Type
+
+from pvpc.port import InputPort
+from pvpc.record import DayRecord, InvalidPayloadError
+from pvpc.slots import from_spanish_time, get_utc_now
+
+# REE publishes the next day's PVPC prices around 20:15 Spanish time.
+PUBLICATION_TIME = day_time(20, 15)
+# What a poll raises while the prices aren't there yet: a 404 or a network
+# error, both OSErrors from requests, or a partial payload.
+UNPUBLISHED_ERRORS = (OSError, LookupError, InvalidPayloadError)
+
+
+class PublicationWatcher(InputPort):
+    """Input port that waits for a day's prices to be published.
+
+    Sleeps until the expected publication time, the evening before `day` in
+    Spanish time, then polls the adapter from `get_adapter(day)` until it returns a complete
+    payload for `day`, one that parses with every slot of the day. Polls that
+    get the same outcome as the previous one, say the same 404 or the same
+    partial payload revalidated with a conditional request, wait `factor`
+    times longer, up to `max_interval`. A change resets the wait to
+    `min_interval`, as data that starts showing up is complete soon after.
+    Gives up with a TimeoutError `timeout` seconds after the publication time.
+    Polls raising other errors than `retry_on` fail right away. `now` returns
+    aware datetimes.
+    """
+
+    day: date
+    polls: int
+
+    def __init__(
+        self,
+        day: date,
+        get_adapter: Callable[[date], InputPort],
+        publication_time: day_time = PUBLICATION_TIME,
+        min_interval: float = 60,
+        max_interval: float = 900,
+        factor: float = 2,
+        timeout: float = 6 * 3600,
+        now: Callable[[], datetime] = get_utc_now,
+        sleep: Callable[[float], None] = time.sleep,
+        retry_on: Tuple[Type[Exception], ...] = UNPUBLISHED_ERRORS,
+    ) -> None:
+        self.day = day
+        self.get_adapter = get_adapter
+        self.publication_time = publication_time
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.timeout = timeout
+        self.now = now
+        self.sleep = sleep
+        self.retry_on = retry_on
+        self.polls = 0
+
+    def get_publication(self) -> datetime:
+        return from_spanish_time(
+            datetime.combine(self.day - timedelta(days=1), self.publication_time)
+        )
+
+    def get_raw_data(self) -> DayRecord:
+        publication = self.get_publication()
+        deadline = publication + timedelta(seconds=self.timeout)
+        self.wait_until(publication)
+
+        adapter = self.get_adapter(self.day)
+        interval = self.min_interval
+        last_outcome: Optional[object] = None
+        while True:
+            self.polls += 1
+            try:
+                record = DayRecord.from_payload(adapter.get_raw_data())
+            except self.retry_on as error:
+                outcome: object = repr(error)
+            else:
+                if record.get_date() == self.day:
+                    return record
+                outcome = record.date
+
+            if outcome == last_outcome:
+                interval = min(interval * self.factor, self.max_interval)
+            else:
+                interval = self.min_interval
+            last_outcome = outcome
+
+            remaining = (deadline - self.now()).total_seconds()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Prices for {self.day} not published after {self.polls} "
+                    f"polls, last got {outcome}."
+                )
+            self.sleep(min(interval, remaining))
+
+    def wait_until(self, moment: datetime) -> None:
+        remaining = (moment - self.now()).total_seconds()
+        if remaining > 0:
+            self.sleep(remaining)
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from pvpc.domain import PVPCDay
+from pvpc.port import AsyncInputPort, OutputPort
+
+
+class PVPCZones:
+    """Reports of several zones, fetched concurrently, each posted to its
+    zone's output port with the zone's code as "zone"."""
+
+    def __init__(
+        self,
+        input_repo: AsyncInputPort,
+        output_repos: Dict[str, OutputPort],
+    ) -> None:
+        self.input_repo = input_repo
+        self.output_repos = output_repos
+
+    def run(self) -> Dict[Tuple[str, Optional[date]], dict]:
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> Dict[Tuple[str, Optional[date]], dict]:
+        raw_days = await self.input_repo.get_raw_days()
+
+        processed_days = {}
+        for (zone, day), raw_data in raw_days.items():
+            output_repo = self.output_repos[zone]
+            domain = PVPCDay(input_repo=None, output_repo=output_repo)
+            processed_days[(zone, day)] = {
+                "zone": zone,
+                **domain.process(raw_data, output_repo.required_metrics),
+            }
+            output_repo.post_processed_data(processed_days[(zone, day)])
+
+        return processed_days
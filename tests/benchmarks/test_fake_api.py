@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+import requests
+
+from benchmarks.fake_api import FakeAPIConfig, FakeAPIServer, get_recorded_payloads
+from benchmarks.load_test import run_load_test
+from pvpc.cache import ResponseCache
+from pvpc.http_adapter import PrecioLuzInputAdapter
+from pvpc.transport import HTTPTransport
+
+
+def get_adapter(server: FakeAPIServer, **kwargs) -> PrecioLuzInputAdapter:
+    return PrecioLuzInputAdapter(
+        base_endpoint=server.base_endpoint,
+        transport=HTTPTransport(retries=0),
+        **kwargs,
+    )
+
+
+class TestFakeAPI:
+    def test_serves_synthetic_days(self):
+        with FakeAPIServer() as server:
+            first = get_adapter(server, day=date(2022, 10, 30)).get_raw_data()
+            second = get_adapter(server, day=date(2022, 10, 30)).get_raw_data()
+
+        assert first == second
+        assert len(first) == 25
+
+    def test_serves_recorded_days(self, raw_data: dict):
+        payloads = get_recorded_payloads([raw_data])
+
+        with FakeAPIServer(payloads=payloads) as server:
+            day = get_adapter(server, day=date(2022, 4, 29)).get_raw_data()
+
+        assert day["00-01"]["price"] == raw_data["00-01"]["price"]
+
+    def test_errors(self):
+        with FakeAPIServer(FakeAPIConfig(error_rate=1)) as server:
+            with pytest.raises(requests.HTTPError):
+                get_adapter(server).get_raw_data()
+            assert server.stats.errors == 1
+
+    def test_throttling(self):
+        with FakeAPIServer(FakeAPIConfig(rate=0.001, burst=1)) as server:
+            get_adapter(server).get_raw_data()
+            with pytest.raises(requests.HTTPError):
+                get_adapter(server).get_raw_data()
+            assert server.stats.throttled == 1
+
+    def test_conditional_requests(self, tmp_path):
+        cache = ResponseCache(str(tmp_path), ttl=0)
+
+        with FakeAPIServer() as server:
+            get_adapter(server, cache=cache, day=date(2022, 4, 29)).get_raw_data()
+            get_adapter(server, cache=cache, day=date(2022, 4, 29)).get_raw_data()
+            stats = server.stats
+
+        assert (stats.served, stats.not_modified) == (1, 1)
+
+    def test_load_test(self):
+        with FakeAPIServer(FakeAPIConfig(error_rate=0.2, seed=3)) as server:
+            results = run_load_test(
+                server,
+                days=20,
+                concurrency=4,
+                get_transport=lambda pool_size: HTTPTransport(
+                    retries=0, pool_size=pool_size
+                ),
+            )
+
+        assert [result.mode for result in results] == ["sync", "async"]
+        assert all(result.requests == 20 for result in results)
+        assert all(len(result.latencies) == 20 for result in results)
+        assert sum(result.errors for result in results) == server.stats.errors > 0
+        assert results[0].percentile(50) <= results[0].percentile(99)
@@ -0,0 +1,60 @@
+import random
+from datetime import date
+
+import pytest
+
+from benchmarks.run import compare
+from benchmarks.synthetic import (
+    CHEAP_PATTERNS,
+    generate_cheap_flags,
+    generate_day,
+    generate_days,
+)
+from pvpc.domain import PVPCDay
+
+
+class TestSynthetic:
+    def test_generate_days_is_deterministic(self):
+        first = list(generate_days(5, seed=1))
+        second = list(generate_days(5, seed=1))
+
+        assert first == second
+        assert first != list(generate_days(5, seed=2))
+
+    def test_generate_days_dates(self):
+        days = list(generate_days(3, start=date(2022, 12, 31)))
+
+        assert [day["00-01"]["date"] for day in days] == [
+            "31-12-2022",
+            "01-01-2023",
+            "02-01-2023",
+        ]
+
+    def test_generate_days_dst(self):
+        short_day = next(generate_days(1, start=date(2022, 3, 27)))
+        long_day = next(generate_days(1, start=date(2022, 10, 30)))
+
+        assert len(short_day) == 23
+        assert len(long_day) == 25
+        PVPCDay(input_repo=None, output_repo=None).process(long_day)
+
+    @pytest.mark.parametrize("pattern", CHEAP_PATTERNS)
+    def test_generated_day_is_processable(self, pattern: str, raw_data: dict):
+        day = generate_day(date(2022, 4, 29), random.Random(0), pattern)
+
+        assert day.keys() == raw_data.keys()
+        assert day["00-01"].keys() == raw_data["00-01"].keys()
+        PVPCDay(input_repo=None, output_repo=None).process(day)
+
+    def test_cheapest_6_pattern(self):
+        prices = list(range(24, 0, -1))
+
+        flags = generate_cheap_flags(prices, "cheapest_6", random.Random(0))
+
+        assert flags == [False] * 18 + [True] * 6
+
+    def test_compare(self):
+        baseline = {"a": 1.0, "b": 1.0}
+
+        assert compare({"a": 1.4, "b": 0.5, "c": 9.0}, baseline, 0.5) == []
+        assert len(compare({"a": 1.6, "b": 1.0}, baseline, 0.5)) == 1
@@ -1,5 +1,6 @@
 import json
 import sys, os
+from datetime import date
 
 import pytest
 
@@ -35,3 +36,27 @@ def pm_prices_3h_periods_data() -> dict:
     with open(PM_PRICES_3H_PERIODS, "r") as pm_prices_3h:
         data = json.load(pm_prices_3h)
     return data
+
+
+@pytest.fixture
+def quarter_hour_data(raw_data: dict) -> dict:
+    """The daily sample in quarter hours, each at the price of its hour."""
+    from pvpc.slots import get_layout
+
+    keys = get_layout(15, 24 * 60).keys
+    data = {}
+    for hour, hour_data in enumerate(raw_data.values()):
+        for slot in range(hour * 4, hour * 4 + 4):
+            data[keys[slot]] = {**hour_data, "hour": keys[slot]}
+    return data
+
+
+def day_payload(raw_data: dict, day: date, offset: float = 0) -> dict:
+    """The daily sample dated `day`, with `offset` added to every price."""
+    from pvpc.record import DATE_FORMAT
+
+    raw_date = day.strftime(DATE_FORMAT)
+    return {
+        hour_key: {**hour, "date": raw_date, "price": hour["price"] + offset}
+        for hour_key, hour in raw_data.items()
+    }
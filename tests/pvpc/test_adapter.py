@@ -1,8 +1,35 @@
+import asyncio
+import io
+import json
+import subprocess
+import sys
+import threading
+import time
+from datetime import date
+
 import pytest
+import telegram
 from requests import HTTPError
 import requests_mock
 
-from pvpc.adapter import PrecioLuzInputAdapter, TelegramOutputAdapter, telegram
+from pvpc.adapter import (
+    ArchiveBatchInputAdapter,
+    ArchiveInputAdapter,
+    AsyncPrecioLuzInputAdapter,
+    DirectoryInputAdapter,
+    FileInputAdapter,
+    MessageOutputAdapter,
+    NDJSONInputAdapter,
+    NDJSONOutputAdapter,
+    PrecioLuzInputAdapter,
+    TelegramFanOutOutputAdapter,
+    TelegramOutputAdapter,
+)
+from pvpc.archive import PriceArchive
+from pvpc.cache import ResponseCache
+from pvpc.domain import PVPCDay
+from pvpc.record import DayRecord, InvalidPayloadError
+from pvpc.render import PLAIN
 
 
 @pytest.fixture()
@@ -14,6 +41,36 @@ def bot_with_dummy(monkeypatch) -> TelegramOutputAdapter:
     return TelegramOutputAdapter(None, None)
 
 
+class FakeBot:
+    def __init__(self, retry_after: dict = None, fail: set = ()) -> None:
+        self.retry_after = dict(retry_after or {})
+        self.fail = fail
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id: str, text: str, parse_mode: str):
+        with self.lock:
+            if self.retry_after.get(chat_id):
+                raise telegram.error.RetryAfter(self.retry_after.pop(chat_id))
+            if chat_id in self.fail:
+                raise telegram.error.BadRequest("Chat not found")
+            self.sent.append((chat_id, text, parse_mode))
+        return f"sent to {chat_id}"
+
+
+class FakeRenderer:
+    def render_all(self, data: dict, variants, day=None) -> dict:
+        return {variant: "message" for variant in variants}
+
+
+@pytest.fixture()
+def fan_out(monkeypatch) -> TelegramFanOutOutputAdapter:
+    monkeypatch.setattr(telegram, "Bot", lambda token: FakeBot())
+    return TelegramFanOutOutputAdapter(
+        None, ["@a", "@b", "@c"], global_rate=1000, per_chat_rate=1000
+    )
+
+
 class TestAdapter:
     def test_get_raw_data_success(self, raw_data: dict):
         with requests_mock.Mocker() as mock:
@@ -24,6 +81,14 @@ class TestAdapter:
         assert len(data) == 24
         assert "price" in data["00-01"]
         assert data["00-01"]["price"] == 254.96
+        assert isinstance(data, DayRecord)
+
+    def test_get_raw_data_invalid(self, raw_data: dict):
+        del raw_data["12-13"]
+        with requests_mock.Mocker() as mock:
+            mock.get(PrecioLuzInputAdapter.endpoint, json=raw_data)
+            with pytest.raises(InvalidPayloadError):
+                PrecioLuzInputAdapter().get_raw_data()
 
     def test_get_raw_data_error(self):
         with requests_mock.Mocker() as mock:
@@ -34,6 +99,144 @@ class TestAdapter:
                 input_repo = PrecioLuzInputAdapter()
                 _ = input_repo.get_raw_data()
 
+    def test_get_raw_data_cached(self, tmp_path, raw_data: dict):
+        cache = ResponseCache(str(tmp_path), ttl=3600)
+        input_repo = PrecioLuzInputAdapter(cache=cache, day=date(2022, 4, 29))
+
+        with requests_mock.Mocker() as mock:
+            mock.get(PrecioLuzInputAdapter.endpoint, json=raw_data)
+            first = input_repo.get_raw_data()
+            second = input_repo.get_raw_data()
+
+        assert mock.call_count == 1
+        assert first == second == raw_data
+
+    def test_get_raw_data_cached_spanish_day(
+        self, tmp_path, raw_data: dict, monkeypatch
+    ):
+        monkeypatch.setattr(
+            "pvpc.http_adapter.get_spanish_today", lambda: date(2022, 4, 29)
+        )
+        cache = ResponseCache(str(tmp_path), ttl=3600)
+
+        with requests_mock.Mocker() as mock:
+            mock.get(PrecioLuzInputAdapter.endpoint, json=raw_data)
+            PrecioLuzInputAdapter(cache=cache).get_raw_data()
+
+        assert cache.load(PrecioLuzInputAdapter.endpoint, date(2022, 4, 29))
+
+    def test_get_raw_data_revalidated(self, tmp_path, raw_data: dict):
+        cache = ResponseCache(str(tmp_path), ttl=0)
+        input_repo = PrecioLuzInputAdapter(cache=cache, day=date(2022, 4, 29))
+
+        with requests_mock.Mocker() as mock:
+            mock.get(
+                PrecioLuzInputAdapter.endpoint,
+                [
+                    {"json": raw_data, "headers": {"ETag": '"v1"'}},
+                    {"status_code": 304},
+                ],
+            )
+            first = input_repo.get_raw_data()
+            second = input_repo.get_raw_data()
+
+        assert mock.call_count == 2
+        assert "If-None-Match" not in mock.request_history[0].headers
+        assert mock.request_history[1].headers["If-None-Match"] == '"v1"'
+        assert first == second == raw_data
+
+    def test_get_raw_data_revalidated_changed(self, tmp_path, raw_data: dict):
+        cache = ResponseCache(str(tmp_path), ttl=0)
+        input_repo = PrecioLuzInputAdapter(cache=cache, day=date(2022, 4, 29))
+        changed = {**raw_data, "00-01": {**raw_data["00-01"], "price": 1.0}}
+
+        with requests_mock.Mocker() as mock:
+            mock.get(
+                PrecioLuzInputAdapter.endpoint,
+                [
+                    {"json": raw_data, "headers": {"ETag": '"v1"'}},
+                    {"json": changed, "headers": {"ETag": '"v2"'}},
+                ],
+            )
+            input_repo.get_raw_data()
+            output = input_repo.get_raw_data()
+
+        assert output["00-01"]["price"] == 1.0
+        assert cache.load(input_repo.endpoint, date(2022, 4, 29)).etag == '"v2"'
+
+    def test_get_raw_data_zone_and_day(self, raw_data: dict):
+        input_repo = PrecioLuzInputAdapter(zone="CYM", day=date(2022, 4, 29))
+
+        with requests_mock.Mocker() as mock:
+            mock.get(PrecioLuzInputAdapter.base_endpoint, json=raw_data)
+            input_repo.get_raw_data()
+
+        assert mock.request_history[0].qs == {"zone": ["cym"], "date": ["29-04-2022"]}
+
+    def test_async_get_raw_days(self, raw_data: dict):
+        cheaper = {
+            hour_key: {**hour, "price": 1.0} for hour_key, hour in raw_data.items()
+        }
+        input_repo = AsyncPrecioLuzInputAdapter(
+            zones=["PCB", "CYM"], days=[date(2022, 4, 29), date(2022, 4, 30)]
+        )
+
+        with requests_mock.Mocker() as mock:
+            mock.get(f"{PrecioLuzInputAdapter.base_endpoint}?zone=PCB", json=raw_data)
+            mock.get(f"{PrecioLuzInputAdapter.base_endpoint}?zone=CYM", json=cheaper)
+            raw_days = asyncio.run(input_repo.get_raw_days())
+
+        assert list(raw_days) == [
+            ("PCB", date(2022, 4, 29)),
+            ("PCB", date(2022, 4, 30)),
+            ("CYM", date(2022, 4, 29)),
+            ("CYM", date(2022, 4, 30)),
+        ]
+        assert raw_days[("PCB", date(2022, 4, 30))] == raw_data
+        assert raw_days[("CYM", date(2022, 4, 29))] == cheaper
+
+    def test_async_get_raw_days_bounded_concurrency(self):
+        lock = threading.Lock()
+        running, peak = [0], [0]
+
+        class SlowAdapter:
+            def get_raw_data(self) -> dict:
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.02)
+                with lock:
+                    running[0] -= 1
+                return {}
+
+        input_repo = AsyncPrecioLuzInputAdapter(
+            zones=["PCB", "CYM"], days=list(range(5)), max_concurrency=3
+        )
+        input_repo.get_adapter = lambda zone, day: SlowAdapter()
+
+        raw_days = asyncio.run(input_repo.get_raw_days())
+
+        assert len(raw_days) == 10
+        assert 1 < peak[0] <= 3
+
+    def test_async_get_raw_days_reaches_max_concurrency(self):
+        # More fetches at once than the default executor runs on a small host.
+        barrier = threading.Barrier(40, timeout=5)
+
+        class BlockingAdapter:
+            def get_raw_data(self) -> dict:
+                barrier.wait()
+                return {}
+
+        input_repo = AsyncPrecioLuzInputAdapter(
+            zones=["PCB", "CYM"], days=list(range(20)), max_concurrency=40
+        )
+        input_repo.get_adapter = lambda zone, day: BlockingAdapter()
+
+        raw_days = asyncio.run(input_repo.get_raw_days())
+
+        assert len(raw_days) == 40
+
     def test_tuple_to_str(self, bot_with_dummy: TelegramOutputAdapter):
         input_data = ("00-01", 254.96)
 
@@ -90,3 +293,145 @@ class TestAdapter:
         output = bot_with_dummy.list_of_tuples_to_str(input)
 
         assert expected == output
+
+    def test_directory_input_adapter(self, tmp_path, raw_data: dict):
+        for name in ["2022-04-30.json", "2022-04-29.json", "notes.txt"]:
+            (tmp_path / name).write_text(json.dumps(raw_data))
+
+        days = list(DirectoryInputAdapter(str(tmp_path)).get_raw_days())
+
+        assert len(days) == 2
+        assert days[0]["00-01"]["price"] == 254.96
+
+    def test_directory_input_adapter_missing(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            list(DirectoryInputAdapter(str(tmp_path / "missing")).get_raw_days())
+
+    def test_ndjson_input_adapter(self, raw_data: dict):
+        stream = io.StringIO(json.dumps(raw_data) + "\n\n" + json.dumps(raw_data))
+
+        days = list(NDJSONInputAdapter(stream).get_raw_days())
+
+        assert len(days) == 2
+        assert days[1]["23-24"]["hour"] == "23-24"
+
+    def test_ndjson_output_adapter(self):
+        stream = io.StringIO()
+        days = [
+            {"date": "29-04-2022", "am_cheapest_3h_period": ("00-03", 255.67)},
+            {"date": "30-04-2022", "am_cheapest_3h_period": ("01-04", 250.1)},
+        ]
+
+        NDJSONOutputAdapter(stream).post_processed_days(iter(days))
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[1]) == {
+            "date": "30-04-2022",
+            "am_cheapest_3h_period": ["01-04", 250.1],
+        }
+
+    def test_file_input_adapter(self, tmp_path, raw_data: dict):
+        day_path = tmp_path / "2022-04-29.json"
+        day_path.write_text(json.dumps(raw_data))
+
+        assert FileInputAdapter(str(day_path)).get_raw_data() == raw_data
+
+    def test_message_output_adapter(self, raw_data: dict):
+        stream = io.StringIO()
+        data = PVPCDay(None, None).process(raw_data)
+
+        MessageOutputAdapter(stream, fmt=PLAIN, language="en").post_processed_data(data)
+
+        message = stream.getvalue()
+        assert message.startswith("Electricity prices for today:\n")
+        assert "*" not in message
+
+    def test_io_adapters_are_imported_lazily(self):
+        code = (
+            "import sys, pvpc.adapter as adapter;"
+            "assert 'requests' not in sys.modules;"
+            "assert 'telegram' not in sys.modules;"
+            "adapter.TelegramOutputAdapter;"
+            "assert 'telegram' in sys.modules"
+        )
+
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_archive_input_adapter(self, tmp_path, raw_data: dict):
+        with PriceArchive(str(tmp_path)) as archive:
+            archive.append_day(raw_data)
+            input_repo = ArchiveInputAdapter(archive, date(2022, 4, 29))
+
+            assert input_repo.get_raw_data() == raw_data
+
+    def test_archive_batch_input_adapter(self, tmp_path, raw_data: dict):
+        with PriceArchive(str(tmp_path)) as archive:
+            archive.append_day(raw_data)
+            input_repo = ArchiveBatchInputAdapter(
+                archive, date(2022, 1, 1), date(2022, 12, 31), weekdays={4}
+            )
+
+            days = list(input_repo.get_raw_days())
+
+        assert days == [raw_data]
+
+    def test_fan_out_sends_to_every_channel(
+        self, fan_out: TelegramFanOutOutputAdapter, monkeypatch
+    ):
+        monkeypatch.setattr(fan_out, "renderer", FakeRenderer())
+
+        statuses = fan_out.post_processed_data({})
+
+        assert statuses == {"@a": "sent to @a", "@b": "sent to @b", "@c": "sent to @c"}
+        assert sorted(fan_out.bot.sent) == [
+            ("@a", "message", telegram.ParseMode.MARKDOWN),
+            ("@b", "message", telegram.ParseMode.MARKDOWN),
+            ("@c", "message", telegram.ParseMode.MARKDOWN),
+        ]
+
+    def test_fan_out_retry_after(
+        self, fan_out: TelegramFanOutOutputAdapter, monkeypatch
+    ):
+        sleeps = []
+        fan_out.bot = FakeBot(retry_after={"@b": 7})
+        fan_out.sleep = sleeps.append
+        monkeypatch.setattr(fan_out, "renderer", FakeRenderer())
+
+        statuses = fan_out.post_processed_data({})
+
+        assert statuses["@b"] == "sent to @b"
+        assert sleeps == [7]
+        assert len(fan_out.bot.sent) == 3
+
+    def test_fan_out_failure_does_not_stop_others(
+        self, fan_out: TelegramFanOutOutputAdapter, monkeypatch
+    ):
+        fan_out.bot = FakeBot(fail={"@a"})
+        monkeypatch.setattr(fan_out, "renderer", FakeRenderer())
+
+        with pytest.raises(telegram.error.BadRequest):
+            fan_out.post_processed_data({})
+
+        assert sorted(chat_id for chat_id, _, _ in fan_out.bot.sent) == ["@b", "@c"]
+
+    def test_fan_out_variants(self, monkeypatch, raw_data: dict):
+        monkeypatch.setattr(telegram, "Bot", lambda token: FakeBot())
+        fan_out = TelegramFanOutOutputAdapter(
+            None,
+            ["@es", "@en", "@html"],
+            global_rate=1000,
+            per_chat_rate=1000,
+            variants={"@en": ("plain", "en"), "@html": ("HTML", "es")},
+        )
+        data = PVPCDay(input_repo=None, output_repo=None).process(raw_data)
+
+        fan_out.post_processed_data(data)
+
+        sent = {chat_id: (text, mode) for chat_id, text, mode in fan_out.bot.sent}
+        assert sent["@es"][1] == "Markdown"
+        assert sent["@es"][0].startswith("Precios de la luz para hoy:\n\n*Las")
+        assert sent["@en"][1] is None
+        assert sent["@en"][0].startswith("Electricity prices for today:\n\nThe")
+        assert sent["@html"][1] == "HTML"
+        assert "<b>AM</b> -&gt; Periodo (3h)" in sent["@html"][0]
@@ -0,0 +1,159 @@
+from datetime import date, timedelta
+from typing import List
+
+import pytest
+
+from benchmarks.synthetic import generate_days
+from pvpc.archive import ENDS_FILE, FLAGS_FILE, PRICES_FILE, PriceArchive
+from pvpc.record import DayRecord
+from tests.conftest import day_payload
+
+
+class TestArchive:
+    @pytest.fixture()
+    def archive(self, tmp_path) -> PriceArchive:
+        with PriceArchive(str(tmp_path / "archive")) as archive:
+            yield archive
+
+    @pytest.fixture()
+    def days(self, raw_data: dict) -> List[dict]:
+        start = date(2022, 1, 1)
+        return [day_payload(raw_data, start + timedelta(n), n) for n in range(60)]
+
+    def test_empty_archive(self, archive: PriceArchive):
+        assert len(archive) == 0
+        assert archive.get_row(date(2022, 1, 1)) is None
+        assert list(archive.iter_days(date(2022, 1, 1), date(2022, 12, 31))) == []
+
+    def test_get_day(self, archive: PriceArchive, days: List[dict]):
+        archive.append_days(days)
+
+        prices, flags = archive.get_day(date(2022, 1, 3))
+
+        assert len(archive) == 60
+        assert len(prices) == 24
+        assert prices[0] == 254.96 + 2
+        assert list(flags[:5]) == [3, 3, 3, 3, 2]
+
+    def test_get_day_missing(self, archive: PriceArchive, days: List[dict]):
+        archive.append_days(days)
+
+        with pytest.raises(KeyError):
+            archive.get_day(date(2021, 12, 31))
+
+    def test_to_record_roundtrip(
+        self, archive: PriceArchive, days: List[dict], raw_data: dict
+    ):
+        archive.append_days(days)
+        day = date(2022, 1, 1)
+
+        output = archive.to_record(day, *archive.get_day(day))
+
+        assert isinstance(output, DayRecord)
+        assert output == day_payload(raw_data, day)
+
+    def test_iter_days_weekdays(self, archive: PriceArchive, days: List[dict]):
+        archive.append_days(days)
+
+        mondays = list(
+            archive.iter_days(date(2022, 1, 1), date(2022, 1, 31), weekdays={0})
+        )
+
+        assert [day for day, _, _ in mondays] == [
+            date(2022, 1, 3),
+            date(2022, 1, 10),
+            date(2022, 1, 17),
+            date(2022, 1, 24),
+            date(2022, 1, 31),
+        ]
+        assert mondays[0][1][0] == 254.96 + 2
+
+    def test_append_reopens_maps(self, archive: PriceArchive, days: List[dict]):
+        archive.append_days(days[:10])
+        prices, _ = archive.get_day(date(2022, 1, 1))
+
+        archive.append_days(days[10:])
+
+        assert len(archive) == 60
+        assert prices[0] == 254.96
+        assert archive.get_row(date(2022, 3, 1)) == 59
+
+    def test_append_out_of_order(self, archive: PriceArchive, days: List[dict]):
+        archive.append_days(days[1:3])
+
+        with pytest.raises(ValueError):
+            archive.append_day(days[0])
+
+        assert len(archive) == 2
+
+    def test_append_quarter_hours(self, archive: PriceArchive, quarter_hour_data: dict):
+        with pytest.raises(ValueError):
+            archive.append_day(quarter_hour_data)
+
+    def test_clock_change_days(self, archive: PriceArchive):
+        start = date(2022, 3, 20)
+        payloads = list(generate_days(225, start))
+
+        archive.append_days(payloads)
+
+        for day, hours in (
+            (date(2022, 3, 27), 23),
+            (date(2022, 3, 28), 24),
+            (date(2022, 10, 30), 25),
+        ):
+            prices, flags = archive.get_day(day)
+            assert len(prices) == len(flags) == hours
+            assert archive.to_record(day, prices, flags) == DayRecord.from_payload(
+                payloads[(day - start).days]
+            )
+
+    def test_archive_without_ends(self, tmp_path, days: List[dict]):
+        path = tmp_path / "archive"
+        with PriceArchive(str(path)) as archive:
+            archive.append_days(days[:2])
+        (path / ENDS_FILE).unlink()
+
+        with PriceArchive(str(path)) as archive:
+            archive.append_days(days[2:3])
+
+            assert len(archive) == 3
+            assert archive.get_day(date(2022, 1, 3))[0][0] == 254.96 + 2
+
+    def test_persistence(self, tmp_path, days: List[dict]):
+        with PriceArchive(str(tmp_path / "archive")) as archive:
+            archive.append_days(days)
+
+        with PriceArchive(str(tmp_path / "archive")) as archive:
+            assert len(archive) == 60
+            assert archive.get_day(date(2022, 2, 1))[0][0] == 254.96 + 31
+
+    def test_interrupted_append(self, tmp_path, days: List[dict]):
+        path = tmp_path / "archive"
+        with PriceArchive(str(path)) as archive:
+            archive.append_days(days[:2])
+        # Prices and flags of a third day, without its date.
+        with open(path / PRICES_FILE, "ab") as column_file:
+            column_file.write(b"\0" * 8 * 30)
+        with open(path / FLAGS_FILE, "ab") as column_file:
+            column_file.write(b"\0" * 5)
+
+        with PriceArchive(str(path)) as archive:
+            assert len(archive) == 2
+            assert len(archive.get_day(date(2022, 1, 2))[0]) == 24
+
+            archive.append_days(days[2:4])
+
+            assert archive.get_day(date(2022, 1, 3))[0][0] == 254.96 + 2
+        assert (path / PRICES_FILE).stat().st_size == 4 * 24 * 8
+        assert (path / FLAGS_FILE).stat().st_size == 4 * 24
+
+    def test_corrupt_archive(self, tmp_path, days: List[dict]):
+        path = tmp_path / "archive"
+        with PriceArchive(str(path)) as archive:
+            archive.append_days(days[:2])
+        with open(path / FLAGS_FILE, "r+b") as column_file:
+            column_file.truncate(30)
+
+        with PriceArchive(str(path)) as archive:
+            with pytest.raises(ValueError, match="corrupt"):
+                len(archive)
@@ -0,0 +1,79 @@
+import copy
+from typing import Iterable, Iterator, List
+
+import pytest
+
+from pvpc.batch import PVPCBatch
+from pvpc.port import BatchInputPort, BatchOutputPort
+
+
+class ListInputAdapter(BatchInputPort):
+    def __init__(self, days: List[dict]) -> None:
+        self.days = days
+
+    def get_raw_days(self) -> Iterator[dict]:
+        yield from self.days
+
+
+class ListOutputAdapter(BatchOutputPort):
+    def __init__(self) -> None:
+        self.days = []
+
+    def post_processed_days(self, days: Iterable[dict]):
+        self.days.extend(days)
+
+
+def with_date(raw_data: dict, date: str) -> dict:
+    day = copy.deepcopy(raw_data)
+    for hour in day.values():
+        hour["date"] = date
+    return day
+
+
+class TestBatch:
+    @pytest.fixture()
+    def raw_days(self, raw_data: dict) -> List[dict]:
+        return [
+            with_date(raw_data, "29-04-2022"),
+            with_date(raw_data, "30-04-2022"),
+            with_date(raw_data, "01-05-2022"),
+        ]
+
+    def test_process_days(self, raw_days: List[dict]):
+        batch = PVPCBatch(ListInputAdapter(raw_days), ListOutputAdapter())
+
+        output = list(batch.process_days())
+
+        assert [day["date"] for day in output] == [
+            "29-04-2022",
+            "30-04-2022",
+            "01-05-2022",
+        ]
+        assert all(day["am_cheapest_3h_period"] == ("00-03", 255.67) for day in output)
+        assert all(day["pm_cheapest_3h_period"] == ("14-17", 259.52) for day in output)
+        assert all(len(day["cheapest_6h"]) == 6 for day in output)
+
+    def test_process_days_is_lazy(self, raw_days: List[dict]):
+        consumed = []
+
+        class TrackingInputAdapter(BatchInputPort):
+            def get_raw_days(self) -> Iterator[dict]:
+                for day in raw_days:
+                    consumed.append(day)
+                    yield day
+
+        batch = PVPCBatch(TrackingInputAdapter(), ListOutputAdapter())
+        days = batch.process_days()
+
+        next(days)
+
+        assert len(consumed) == 1
+
+    def test_run(self, raw_days: List[dict]):
+        output_repo = ListOutputAdapter()
+        batch = PVPCBatch(ListInputAdapter(raw_days), output_repo)
+
+        batch.run()
+
+        assert len(output_repo.days) == 3
+        assert output_repo.days[2]["date"] == "01-05-2022"
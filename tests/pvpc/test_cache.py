@@ -0,0 +1,75 @@
+from datetime import date
+
+import pytest
+
+from pvpc.cache import CachedResponse, ResponseCache
+
+ENDPOINT = "https://api.example.org/prices"
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCache:
+    @pytest.fixture()
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    @pytest.fixture()
+    def cache(self, tmp_path, clock: FakeClock) -> ResponseCache:
+        return ResponseCache(str(tmp_path), ttl=60, clock=clock)
+
+    def test_load_missing(self, cache: ResponseCache):
+        assert cache.load(ENDPOINT, date(2022, 4, 29)) is None
+
+    def test_store_and_load(self, cache: ResponseCache):
+        cache.store(ENDPOINT, date(2022, 4, 29), b"{}", etag='"abc"')
+
+        cached = cache.load(ENDPOINT, date(2022, 4, 29))
+
+        assert cached.body == b"{}"
+        assert cached.etag == '"abc"'
+        assert cached.last_modified is None
+        assert cache.load(ENDPOINT, date(2022, 4, 30)) is None
+        assert cache.load(f"{ENDPOINT}?zone=CYM", date(2022, 4, 29)) is None
+
+    def test_is_fresh(self, cache: ResponseCache, clock: FakeClock):
+        cached = cache.store(ENDPOINT, date(2022, 4, 29), b"{}")
+
+        assert cache.is_fresh(cached)
+        clock.now += 60
+        assert not cache.is_fresh(cached)
+
+    def test_touch(self, cache: ResponseCache, clock: FakeClock):
+        cached = cache.store(ENDPOINT, date(2022, 4, 29), b"{}")
+        clock.now += 120
+
+        cache.touch(ENDPOINT, date(2022, 4, 29), cached)
+
+        assert cache.is_fresh(cache.load(ENDPOINT, date(2022, 4, 29)))
+
+    @pytest.mark.parametrize(
+        "etag, last_modified, expected",
+        [
+            (None, None, {}),
+            ('"abc"', None, {"If-None-Match": '"abc"'}),
+            (
+                '"abc"',
+                "Fri, 29 Apr 2022 00:00:00 GMT",
+                {
+                    "If-None-Match": '"abc"',
+                    "If-Modified-Since": "Fri, 29 Apr 2022 00:00:00 GMT",
+                },
+            ),
+        ],
+        ids=["none", "etag", "both"],
+    )
+    def test_conditional_headers(self, etag, last_modified, expected: dict):
+        cached = CachedResponse(b"{}", etag, last_modified, 0)
+
+        assert cached.conditional_headers() == expected
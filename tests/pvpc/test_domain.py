@@ -1,8 +1,12 @@
+from datetime import date
 from typing import Tuple
 import pytest
 from deepdiff import DeepDiff
 from pvpc.domain import PVPCDay
+from pvpc.instrumentation import Instrumentation
 from pvpc.port import InputPort, OutputPort
+from pvpc.scheduler import Load
+from pvpc.slots import SlotLayout
 
 
 class DummyInputAdapter(InputPort):
@@ -90,6 +94,17 @@ class TestDomain:
 
         assert set(expected) == set(output)
 
+    def test_raw_data_is_parsed_into_arrays(self, domain_with_raw: PVPCDay):
+        pvpc = domain_with_raw
+
+        assert len(pvpc.prices) == 24
+        assert len(pvpc.cheap_flags) == 24
+        assert pvpc.prices[0] == 254.96
+        assert pvpc.prices[23] == pvpc.raw_data["23-24"]["price"]
+        assert sum(pvpc.cheap_flags) == 6
+        assert pvpc.cheap_flags[14] == 1
+        assert pvpc.cheap_flags[4] == 0
+
     def test_collect_processed_data(self, domain_with_raw: PVPCDay):
         input_cheapest_6h = {
             "00-01": 254.96,
@@ -309,6 +324,83 @@ class TestDomain:
 
         assert DeepDiff(expected, output) == {}
 
+    def test_get_6_cheapest_hours_ignores_cheap_flags(
+        self, domain_with_dummy: PVPCDay, raw_data: dict
+    ):
+        for hour in raw_data.values():
+            hour["is-cheap"] = hour["hour"] in ("20-21", "21-22")
+        domain_with_dummy.raw_data = raw_data
+
+        output = domain_with_dummy.get_6_cheapest_hours()
+
+        assert list(output) == ["00-01", "01-02", "02-03", "03-04", "14-15", "15-16"]
+
+    def test_get_cheapest_and_most_expensive_hours(self, domain_with_raw: PVPCDay):
+        assert domain_with_raw.get_cheapest_hours(2) == [
+            ("14-15", 253.06),
+            ("00-01", 254.96),
+        ]
+        assert domain_with_raw.get_most_expensive_hours(2) == [
+            ("20-21", 381.63),
+            ("21-22", 381.38),
+        ]
+
+    def test_get_hours_under(self, domain_with_raw: PVPCDay):
+        assert domain_with_raw.get_hours_under(255.29) == [
+            ("00-01", 254.96),
+            ("01-02", 255.29),
+            ("14-15", 253.06),
+        ]
+        assert domain_with_raw.get_hours_under_percentile(
+            25
+        ) == domain_with_raw.get_hours_under(258.82)
+
+    def test_schedule_loads(self, domain_with_raw: PVPCDay):
+        loads = [Load("dishwasher", 3, 1.5), Load("washer", 2, 2, earliest=8)]
+
+        schedule = domain_with_raw.schedule_loads(loads)
+
+        starts = [placement.start for placement in schedule.placements]
+        assert starts == [0, 14]
+        assert schedule.optimal
+
+    def test_quarter_hours_match_hourly(
+        self, domain_with_dummy: PVPCDay, raw_data: dict, quarter_hour_data: dict
+    ):
+        hourly = domain_with_dummy.process(raw_data)
+        quarter_hours = domain_with_dummy.process(quarter_hour_data)
+
+        assert quarter_hours["am_cheapest_3h_period"] == ("00:00-03:00", 255.67)
+        assert quarter_hours["pm_cheapest_3h_period"][1] == (
+            hourly["pm_cheapest_3h_period"][1]
+        )
+        assert len(quarter_hours["am_cheapest_3h_period_unfolded"]) == 12
+        assert len(quarter_hours["cheapest_6h"]) == 24
+        assert set(quarter_hours["cheapest_6h"].values()) == set(
+            hourly["cheapest_6h"].values()
+        )
+        assert len(domain_with_dummy.pm_3h_periods) == 37
+
+    def test_long_day(self, domain_with_dummy: PVPCDay, raw_data: dict):
+        hours = list(raw_data.values())
+        hours.insert(3, hours[2])
+        layout = SlotLayout.for_day(date(2022, 10, 30), 25)
+        domain_with_dummy.raw_data = {
+            key: {**hour, "hour": key, "date": "30-10-2022"}
+            for key, hour in zip(layout.keys, hours)
+        }
+
+        am_periods = domain_with_dummy.am_3h_periods
+
+        assert list(am_periods)[:4] == ["00-03", "01-03b", "02-04", "02b-05"]
+        assert len(am_periods) == 11
+        assert domain_with_dummy.am_cheapest_3h_period_unfolded == [
+            ("00-01", 254.96),
+            ("01-02", 255.29),
+            ("02-03", 256.76),
+        ]
+        assert len(domain_with_dummy.schedule_loads([]).placements) == 0
+
     def test_run(self, monkeypatch, domain_with_dummy: PVPCDay, raw_data: dict):
         def mock_raw_data():
             return raw_data
@@ -352,3 +444,144 @@ class TestDomain:
         assert processed_data_keys == pvpc.processed_data.keys()
         assert pvpc.processed_data["cheapest_6h"]["00-01"] == 254.96
         assert pvpc.processed_data["cheapest_6h"]["15-16"] == 256.81
+
+    @pytest.mark.parametrize("window", [1, 2, 3, 4, 6, 12])
+    def test_get_window_prices(self, window: int, domain_with_raw: PVPCDay):
+        pvpc = domain_with_raw
+        start_hours = range(24 - window + 1)
+
+        expected = {
+            pvpc.compose_key_from_hours(start, start + window): round(
+                round(sum(pvpc.prices[start : start + window]), 6) / window, 2
+            )
+            for start in start_hours
+        }
+        output = pvpc.get_window_prices(window, start_hours)
+
+        assert DeepDiff(expected, output) == {}
+
+    def test_get_window_prices_3h_matches_am_pm_periods(
+        self,
+        domain_with_raw: PVPCDay,
+        am_prices_3h_periods_data: dict,
+        pm_prices_3h_periods_data: dict,
+    ):
+        am_output = domain_with_raw.get_window_prices(3, range(10))
+        pm_output = domain_with_raw.get_window_prices(3, range(12, 22))
+
+        assert DeepDiff(am_prices_3h_periods_data, am_output) == {}
+        assert DeepDiff(pm_prices_3h_periods_data, pm_output) == {}
+
+    def test_get_best_windows(self, domain_with_raw: PVPCDay):
+        output = domain_with_raw.get_best_windows(
+            [1, 3], {"am": range(0, 10), "pm": range(12, 22)}
+        )
+
+        assert output == {
+            "am": {1: ("00-01", 254.96), 3: ("00-03", 255.67)},
+            "pm": {1: ("14-15", 253.06), 3: ("14-17", 259.52)},
+        }
+
+    @pytest.mark.parametrize(
+        "window, start_hours",
+        [(0, range(10)), (13, range(10)), (3, range(23)), (2, [-1]), (3, range(0))],
+        ids=["too-short", "too-long", "overflows-day", "negative-start", "no-starts"],
+    )
+    def test_get_window_prices_invalid(
+        self, window: int, start_hours, domain_with_raw: PVPCDay
+    ):
+        with pytest.raises(ValueError):
+            domain_with_raw.get_window_prices(window, start_hours)
+
+    def test_process(self, domain_with_dummy: PVPCDay, raw_data: dict):
+        output = domain_with_dummy.process(raw_data)
+
+        assert output is domain_with_dummy.processed_data
+        assert output["am_cheapest_3h_period"] == ("00-03", 255.67)
+        assert domain_with_dummy.get_date() == "29-04-2022"
+
+    def test_process_only_required_metrics(
+        self, domain_with_dummy: PVPCDay, raw_data: dict
+    ):
+        output = domain_with_dummy.process(raw_data, {"cheapest_6h"})
+
+        assert list(output) == ["cheapest_6h"]
+        assert "cheapest_6h" in vars(domain_with_dummy)
+        assert "am_3h_periods" not in vars(domain_with_dummy)
+        assert "sorted_pm_3h_periods" not in vars(domain_with_dummy)
+
+    def test_process_unknown_metric(self, domain_with_dummy: PVPCDay, raw_data: dict):
+        with pytest.raises(ValueError):
+            domain_with_dummy.process(raw_data, {"am_3h_periods"})
+
+    def test_process_detail_metrics(self, domain_with_dummy: PVPCDay, raw_data: dict):
+        output = domain_with_dummy.process(raw_data, {"date", "hourly_prices"})
+
+        assert output["date"] == "29-04-2022"
+        hourly_prices = output["hourly_prices"]
+        assert len(hourly_prices) == 24
+        assert hourly_prices[0][0] == "00-01"
+        assert sorted(rank for _, _, rank in hourly_prices) == list(range(1, 25))
+        cheapest = min(hourly_prices, key=lambda hour: hour[1])
+        assert cheapest[2] == 1
+
+    def test_detail_metrics_not_in_default_output(
+        self, domain_with_dummy: PVPCDay, raw_data: dict
+    ):
+        output = domain_with_dummy.process(raw_data)
+
+        assert "hourly_prices" not in output
+
+    def test_metrics_are_memoized(self, monkeypatch, domain_with_raw: PVPCDay):
+        pvpc = domain_with_raw
+        calls = []
+        get_prices = pvpc.get_prices_for_3h_periods
+
+        def counting_get_prices(is_am: bool) -> dict:
+            calls.append(is_am)
+            return get_prices(is_am=is_am)
+
+        monkeypatch.setattr(pvpc, "get_prices_for_3h_periods", counting_get_prices)
+
+        pvpc.am_cheapest_3h_period
+        pvpc.am_cheapest_3h_period_unfolded
+        pvpc.am_3h_periods
+
+        assert calls == [True]
+
+    def test_metrics_reset_with_raw_data(self, domain_with_raw: PVPCDay, raw_data):
+        pvpc = domain_with_raw
+        assert pvpc.am_cheapest_3h_period == ("00-03", 255.67)
+
+        pvpc.raw_data = {
+            hour_key: {**hour, "price": hour["price"] - 100}
+            for hour_key, hour in raw_data.items()
+        }
+
+        assert pvpc.am_cheapest_3h_period == ("00-03", 155.67)
+
+    def test_run_with_required_metrics(self, domain_with_dummy: PVPCDay, raw_data):
+        posted = []
+        pvpc = domain_with_dummy
+        pvpc.input_repo.get_raw_data = lambda: raw_data
+        pvpc.output_repo.required_metrics = frozenset({"pm_cheapest_3h_period"})
+        pvpc.output_repo.post_processed_data = posted.append
+
+        pvpc.run()
+
+        assert posted == [{"pm_cheapest_3h_period": ("14-17", 259.52)}]
+        assert "am_3h_periods" not in vars(pvpc)
+
+    def test_run_instrumentation(self, raw_data: dict):
+        instrumentation = Instrumentation()
+        input_repo = DummyInputAdapter()
+        input_repo.get_raw_data = lambda: raw_data
+        pvpc = PVPCDay(input_repo, DummyOutputAdapter(), instrumentation)
+
+        pvpc.run()
+
+        stages = instrumentation.stages
+        assert {"fetch", "process", "post"} <= stages.keys()
+        assert stages["am_3h_periods"].calls == 1
+        assert stages["am_cheapest_3h_period"].calls == 1
+        assert stages["process"].wall_time >= stages["am_cheapest_3h_period"].wall_time
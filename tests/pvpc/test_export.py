@@ -0,0 +1,191 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from pvpc.batch import PVPCBatch
+from pvpc.export import ExportOutputAdapter, get_format
+from pvpc.parallel import PVPCParallelBatch
+from tests.pvpc.test_batch import ListInputAdapter, with_date
+
+
+@pytest.fixture()
+def raw_days(raw_data: dict) -> List[dict]:
+    return [with_date(raw_data, "29-04-2022"), with_date(raw_data, "30-04-2022")]
+
+
+def export(raw_days: List[dict], path: Path, table: str = "prices", **kwargs) -> int:
+    output_repo = ExportOutputAdapter(str(path), table, **kwargs)
+    batch = PVPCBatch(ListInputAdapter(raw_days), output_repo)
+    return output_repo.post_processed_days(batch.process_days())
+
+
+def read_csv(path: Path) -> List[dict]:
+    with open(path, newline="") as export_file:
+        return list(csv.DictReader(export_file))
+
+
+class TestExportOutputAdapter:
+    def test_prices_csv(self, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "prices.csv"
+
+        assert export(raw_days, path) == 48
+
+        rows = read_csv(path)
+        assert list(rows[0]) == ["zone", "date", "hour", "price", "rank"]
+        assert len(rows) == 48
+        assert rows[0]["zone"] == ""
+        assert (rows[0]["date"], rows[0]["hour"]) == ("29-04-2022", "00-01")
+        assert rows[24]["date"] == "30-04-2022"
+        assert sorted(int(row["rank"]) for row in rows[:24]) == list(range(1, 25))
+
+    def test_windows_ndjson(self, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "windows.ndjson"
+
+        export(raw_days, path, "windows")
+
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+        am_rows = [row for row in rows if row["period"] == "am"]
+        assert am_rows[0] == {
+            "zone": None,
+            "date": "29-04-2022",
+            "period": "am",
+            "window": "00-03",
+            "price": 255.67,
+            "rank": 1,
+        }
+        assert [row["rank"] for row in am_rows] == list(
+            range(1, len(am_rows) // 2 + 1)
+        ) * 2
+
+    def test_summary(self, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "summary.csv"
+
+        export(raw_days, path, "summary")
+
+        rows = read_csv(path)
+        assert len(rows) == 2
+        assert rows[0]["am_cheapest_window"] == "00-03"
+        assert rows[0]["pm_cheapest_window"] == "14-17"
+        assert len(rows[0]["cheapest_hours"].split()) == 6
+
+    def test_only_computes_the_table_metrics(self, raw_days: List[dict]):
+        output_repo = ExportOutputAdapter("-", "prices")
+        domain_days = PVPCBatch(ListInputAdapter(raw_days), output_repo).process_days()
+
+        assert set(next(domain_days)) == {"date", "hourly_prices"}
+
+    def test_flushes_every_flush_rows(self, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "prices.csv"
+        output_repo = ExportOutputAdapter(str(path), flush_rows=30)
+        flushed = []
+
+        def days():
+            batch = PVPCBatch(ListInputAdapter(raw_days), output_repo)
+            for day in batch.process_days():
+                yield day
+                flushed.append(len(read_csv(path)))
+
+        output_repo.post_processed_days(days())
+
+        # A day's rows are held until there are 30, then written at once.
+        assert flushed == [0, 48]
+        assert len(read_csv(path)) == 48
+
+    def test_append_keeps_one_header(self, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "prices.csv"
+
+        export(raw_days[:1], path, append=True)
+        export(raw_days[1:], path, append=True)
+
+        rows = read_csv(path)
+        assert len(rows) == 48
+        assert [rows[0]["date"], rows[-1]["date"]] == ["29-04-2022", "30-04-2022"]
+
+    def test_overwrites_without_append(self, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "prices.ndjson"
+
+        export(raw_days, path)
+        export(raw_days[:1], path)
+
+        assert len(path.read_text().splitlines()) == 24
+
+    def test_zones(self, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "summary.csv"
+        output_repo = ExportOutputAdapter(str(path), "summary")
+
+        PVPCParallelBatch(
+            {zone: ListInputAdapter(raw_days) for zone in ("PCB", "CYM")},
+            output_repo,
+            executor_factory=ThreadPoolExecutor,
+        ).run()
+
+        assert [row["zone"] for row in read_csv(path)] == ["PCB", "PCB", "CYM", "CYM"]
+
+    def test_stdout(self, raw_days: List[dict], capsys):
+        PVPCBatch(ListInputAdapter(raw_days), ExportOutputAdapter("-", "summary")).run()
+
+        assert len(capsys.readouterr().out.splitlines()) == 3
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"table": "days"},
+            {"fmt": "xlsx"},
+            {"fmt": "parquet"},
+            {"flush_rows": 0},
+        ],
+    )
+    def test_invalid(self, kwargs: dict):
+        with pytest.raises(ValueError):
+            ExportOutputAdapter("-", **kwargs)
+
+    @pytest.mark.parametrize(
+        "path, fmt",
+        [
+            ("prices.csv", "csv"),
+            ("prices.ndjson", "ndjson"),
+            ("prices.jsonl", "ndjson"),
+            ("prices.parquet", "parquet"),
+            ("-", "csv"),
+        ],
+    )
+    def test_get_format(self, path: str, fmt: str):
+        assert get_format(path) == fmt
+
+
+class TestParquetExport:
+    @pytest.fixture(autouse=True)
+    def pyarrow(self):
+        return pytest.importorskip("pyarrow.parquet")
+
+    def test_prices(self, pyarrow, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "prices.parquet"
+
+        export(raw_days, path, flush_rows=24)
+
+        parquet_file = pyarrow.ParquetFile(path)
+        assert parquet_file.metadata.num_rows == 48
+        assert parquet_file.metadata.num_row_groups == 2
+        assert parquet_file.schema_arrow.names == [
+            "zone",
+            "date",
+            "hour",
+            "price",
+            "rank",
+        ]
+
+    def test_append_adds_parts(self, pyarrow, raw_days: List[dict], tmp_path: Path):
+        path = tmp_path / "prices"
+
+        export(raw_days[:1], path, fmt="parquet", append=True)
+        export(raw_days[1:], path, fmt="parquet", append=True)
+
+        assert sorted(part.name for part in path.iterdir()) == [
+            "part-00000.parquet",
+            "part-00001.parquet",
+        ]
+        assert pyarrow.read_table(path).num_rows == 48
@@ -0,0 +1,82 @@
+import io
+import json
+import time
+import tracemalloc
+
+from pvpc.instrumentation import (
+    Instrumentation,
+    JSONLogExporter,
+    NullInstrumentation,
+    PrometheusTextfileExporter,
+)
+
+
+class TestInstrumentation:
+    def test_stage(self):
+        instrumentation = Instrumentation()
+
+        for _ in range(2):
+            with instrumentation.stage("fetch"):
+                time.sleep(0.001)
+
+        stats = instrumentation.stages["fetch"]
+        assert stats.calls == 2
+        assert stats.wall_time >= 0.002
+        assert stats.allocated_bytes == 0
+
+    def test_stage_records_on_error(self):
+        instrumentation = Instrumentation()
+
+        try:
+            with instrumentation.stage("post"):
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+
+        assert instrumentation.stages["post"].calls == 1
+
+    def test_stage_allocations(self):
+        instrumentation = Instrumentation(trace_allocations=True)
+        try:
+            with instrumentation.stage("process"):
+                data = [bytearray(1024) for _ in range(100)]
+        finally:
+            tracemalloc.stop()
+
+        assert instrumentation.stages["process"].allocated_bytes >= 100 * 1024
+        assert len(data) == 100
+
+    def test_null_instrumentation(self):
+        instrumentation = NullInstrumentation()
+
+        with instrumentation.stage("fetch"):
+            pass
+        instrumentation.observe("http_attempt", 1.0)
+
+        assert instrumentation.stages == {}
+
+    def test_json_log_exporter(self):
+        instrumentation = Instrumentation()
+        instrumentation.observe("fetch", 0.5)
+        stream = io.StringIO()
+
+        JSONLogExporter(stream).export(instrumentation)
+
+        assert json.loads(stream.getvalue()) == {
+            "event": "pvpc_stages",
+            "stages": {"fetch": {"calls": 1, "wall_time": 0.5, "allocated_bytes": 0}},
+        }
+
+    def test_prometheus_textfile_exporter(self, tmp_path):
+        instrumentation = Instrumentation()
+        instrumentation.observe("fetch", 0.5)
+        instrumentation.observe("post", 0.25)
+        path = tmp_path / "pvpc.prom"
+
+        PrometheusTextfileExporter(str(path)).export(instrumentation)
+
+        lines = path.read_text().splitlines()
+        assert "# TYPE pvpc_stage_seconds_total counter" in lines
+        assert 'pvpc_stage_seconds_total{stage="fetch"} 0.5' in lines
+        assert 'pvpc_stage_calls_total{stage="post"} 1' in lines
+        assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,124 @@
+from datetime import date, datetime, timezone
+from typing import List, Tuple
+
+import pytest
+
+from pvpc.domain import PVPCDay
+from pvpc.outbox import FAILED, PENDING, SENT, Outbox, OutboxOutputAdapter
+from pvpc.port import InputPort
+from pvpc.render import HTML, MARKDOWN
+
+DAY = date(2022, 4, 29)
+
+
+class ListInputAdapter(InputPort):
+    def __init__(self, raw_data: dict) -> None:
+        self.raw_data = raw_data
+        self.calls = 0
+
+    def get_raw_data(self) -> dict:
+        self.calls += 1
+        return self.raw_data
+
+
+class FakeSender:
+    def __init__(self, failing: Tuple[str, ...] = ()) -> None:
+        self.failing = failing
+        self.sent: List[Tuple[str, str, str]] = []
+
+    def send(self, channel: str, message: str, fmt: str) -> object:
+        if channel in self.failing:
+            return RuntimeError(f"Can't send to {channel}")
+        self.sent.append((channel, message, fmt))
+        return "ok"
+
+
+class TestOutbox:
+    @pytest.fixture()
+    def outbox(self, tmp_path) -> Outbox:
+        with Outbox(str(tmp_path / "outbox.db"), max_attempts=2) as outbox:
+            yield outbox
+
+    def test_add_is_idempotent(self, outbox: Outbox):
+        assert outbox.add(DAY, "PCB", {"a": (MARKDOWN, "one"), "b": (HTML, "two")}) == 2
+        assert outbox.add(DAY, "PCB", {"a": (MARKDOWN, "changed")}) == 0
+
+        assert outbox.has_day(DAY, "PCB", ["a", "b"])
+        assert not outbox.has_day(DAY, "PCB", ["a", "c"])
+        assert not outbox.has_day(DAY, "CYM", ["a"])
+        assert [item.message for item in outbox.get_items()] == ["one", "two"]
+
+    def test_drain_sends_once(self, outbox: Outbox):
+        outbox.add(DAY, "PCB", {str(n): (MARKDOWN, f"m{n}") for n in range(25)})
+        sender = FakeSender()
+
+        report = outbox.drain(sender.send, batch_size=10)
+        again = outbox.drain(sender.send)
+
+        assert (report.sent, report.failed, report.pending) == (25, 0, 0)
+        assert again.sent == 0
+        assert len(sender.sent) == 25
+        assert len(outbox.get_items(SENT)) == 25
+
+    def test_failures_stay_pending(self, outbox: Outbox):
+        outbox.add(DAY, "PCB", {"a": (MARKDOWN, "one"), "b": (HTML, "two")})
+        sender = FakeSender(failing=("b",))
+
+        first = outbox.drain(sender.send, batch_size=1)
+        (item,) = outbox.get_items(PENDING)
+        second = outbox.drain(sender.send)
+
+        assert (first.sent, first.failed, first.pending) == (1, 1, 1)
+        assert (item.channel, item.attempts) == ("b", 1)
+        assert "Can't send to b" in item.error
+        assert (second.failed, second.pending) == (1, 0)
+        assert [item.channel for item in outbox.get_items(FAILED)] == ["b"]
+        assert sender.sent == [("a", "one", MARKDOWN)]
+
+    def test_send_exceptions_are_failures(self, outbox: Outbox):
+        outbox.add(DAY, "PCB", {"a": (MARKDOWN, "one")})
+
+        def send(channel: str, message: str, fmt: str):
+            raise ConnectionError("down")
+
+        assert outbox.drain(send).failed == 1
+
+    def test_run_skips_stored_day(self, outbox: Outbox, raw_data: dict):
+        input_repo = ListInputAdapter(raw_data)
+        output_repo = OutboxOutputAdapter(
+            outbox, ["a", "b"], day=DAY, variants={"b": (HTML, "en")}
+        )
+
+        PVPCDay(input_repo, output_repo).run()
+        PVPCDay(input_repo, output_repo).run()
+
+        assert input_repo.calls == 1
+        items = {item.channel: item for item in outbox.get_items()}
+        assert items["a"].fmt == MARKDOWN
+        # Stored for a day that isn't today, so titled with its date.
+        assert items["a"].message.startswith("Precios de la luz para el 29-04-2022:")
+        assert items["b"].fmt == HTML
+        assert items["b"].message.startswith("Electricity prices for 29-04-2022:")
+
+    def test_run_after_utc_midnight_skips_day(self, outbox: Outbox, raw_data: dict):
+        # The job runs at 23:15 UTC, already the next day in Spain, and is
+        # retried past midnight UTC.
+        now = [datetime(2022, 4, 28, 23, 15, tzinfo=timezone.utc)]
+        input_repo = ListInputAdapter(raw_data)
+        output_repo = OutboxOutputAdapter(outbox, ["a"], now=lambda: now[0])
+
+        PVPCDay(input_repo, output_repo).run()
+        now[0] = datetime(2022, 4, 29, 0, 30, tzinfo=timezone.utc)
+        PVPCDay(input_repo, output_repo).run()
+
+        assert input_repo.calls == 1
+        assert [item.day for item in outbox.get_items()] == ["2022-04-29"]
+
+    def test_new_channel_runs_again(self, outbox: Outbox, raw_data: dict):
+        input_repo = ListInputAdapter(raw_data)
+
+        PVPCDay(input_repo, OutboxOutputAdapter(outbox, ["a"], day=DAY)).run()
+        PVPCDay(input_repo, OutboxOutputAdapter(outbox, ["a", "b"], day=DAY)).run()
+
+        assert input_repo.calls == 2
+        assert len(outbox.get_items()) == 2
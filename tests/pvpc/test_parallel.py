@@ -0,0 +1,110 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List
+
+import pytest
+
+from benchmarks.synthetic import generate_days
+from pvpc.batch import PVPCBatch
+from pvpc.adapter import NDJSONInputAdapter, NDJSONOutputAdapter
+from pvpc.parallel import PVPCParallelBatch
+from pvpc.port import BatchOutputPort
+from tests.pvpc.test_batch import ListInputAdapter, ListOutputAdapter
+
+
+class TestParallelBatch:
+    @pytest.fixture()
+    def raw_days(self) -> List[dict]:
+        # Two years of days, so DST days are in.
+        return list(generate_days(730, seed=1))
+
+    def test_matches_serial_batch(self, raw_days: List[dict]):
+        serial = ListOutputAdapter()
+        PVPCBatch(ListInputAdapter(raw_days), serial).run()
+        parallel = ListOutputAdapter()
+
+        report = PVPCParallelBatch(
+            {None: ListInputAdapter(raw_days)},
+            parallel,
+            processes=2,
+            shard_size=100,
+        ).run()
+
+        assert parallel.days == serial.days
+        assert report.days == 730
+        assert report.shards == 8
+        assert report.processes == 2
+
+    def test_encoded_days_on_processes(self, raw_days: List[dict]):
+        # Workers parse the NDJSON lines and encode the output lines.
+        lines = "".join(json.dumps(day) + "\n" for day in raw_days)
+        serial = io.StringIO()
+        PVPCBatch(
+            NDJSONInputAdapter(io.StringIO(lines)), NDJSONOutputAdapter(serial)
+        ).run()
+        parallel = io.StringIO()
+
+        PVPCParallelBatch(
+            {None: NDJSONInputAdapter(io.StringIO(lines))},
+            NDJSONOutputAdapter(parallel),
+            processes=2,
+            shard_size=100,
+        ).run()
+
+        assert parallel.getvalue() == serial.getvalue()
+
+    def test_bounded_shards_in_flight(self, raw_days: List[dict]):
+        read = []
+
+        class TrackingInputAdapter(ListInputAdapter):
+            def get_raw_days(self) -> Iterator[dict]:
+                for day in self.days:
+                    read.append(day)
+                    yield day
+
+        class FirstDayOutputAdapter(BatchOutputPort):
+            def post_processed_days(self, days: Iterable[dict]):
+                for _ in days:
+                    self.read_at_first_day = len(read)
+                    break
+
+        output = FirstDayOutputAdapter()
+        PVPCParallelBatch(
+            {None: TrackingInputAdapter(raw_days)},
+            output,
+            shard_size=10,
+            max_pending=2,
+            executor_factory=ThreadPoolExecutor,
+        ).run()
+
+        # Two shards were read, not the whole input, before any output.
+        assert output.read_at_first_day == 20
+
+    def test_zones_in_order(self, raw_days: List[dict]):
+        output = ListOutputAdapter()
+
+        PVPCParallelBatch(
+            {
+                "PCB": ListInputAdapter(raw_days[:30]),
+                "CYM": ListInputAdapter(raw_days[:20]),
+            },
+            output,
+            shard_size=7,
+            executor_factory=ThreadPoolExecutor,
+        ).run()
+
+        assert [day["zone"] for day in output.days] == ["PCB"] * 30 + ["CYM"] * 20
+        assert [day["date"] for day in output.days] == [
+            day["00-01"]["date"] for day in raw_days[:30] + raw_days[:20]
+        ]
+
+    def test_empty_input(self):
+        output = ListOutputAdapter()
+
+        report = PVPCParallelBatch(
+            {None: ListInputAdapter([])}, output, executor_factory=ThreadPoolExecutor
+        ).run()
+
+        assert output.days == []
+        assert (report.days, report.shards) == (0, 0)
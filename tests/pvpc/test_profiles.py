@@ -0,0 +1,130 @@
+import random
+from datetime import date
+
+import pytest
+
+from benchmarks.synthetic import generate_day
+from pvpc.domain import PVPCDay
+from pvpc.profiles import DayIndex, Profile, ProfileReports
+from pvpc.record import DayRecord
+
+# A regular day and the 23h and 25h days.
+DAYS = (date(2022, 4, 29), date(2022, 3, 27), date(2022, 10, 30))
+
+
+class TestProfiles:
+    def test_matches_domain(self, raw_data: dict):
+        domain = PVPCDay(input_repo=None, output_repo=None)
+        domain.process(raw_data)
+        reports = ProfileReports(
+            [Profile("am", hours=(0, 12)), Profile("pm", hours=(12, 24))]
+        )
+
+        (_, am), (_, pm) = reports.run(raw_data)
+
+        assert am["cheapest_windows"]["3h"] == domain.am_cheapest_3h_period
+        assert pm["cheapest_windows"]["3h"] == domain.pm_cheapest_3h_period
+        cheapest = ProfileReports([Profile("all")]).run(raw_data)
+        assert next(cheapest)[1]["cheapest_hours"] == domain.cheapest_6h
+
+    def test_prices_with_surcharge(self, raw_data: dict):
+        profile = Profile("vat", windows=(1,), cheapest=1, factor=1.21, surcharge=10)
+
+        ((_, report),) = ProfileReports([profile]).run(raw_data)
+
+        price = raw_data["14-15"]["price"]
+        assert report["cheapest_hours"] == {"14-15": round(price * 1.21 + 10, 2)}
+        assert report["cheapest_windows"]["1h"] == (
+            "14-15",
+            round(price * 1.21 + 10, 2),
+        )
+
+    def test_threshold(self, raw_data: dict):
+        profile = Profile("cheap", threshold=300, factor=1.1, surcharge=5)
+
+        ((_, report),) = ProfileReports([profile]).run(raw_data)
+
+        assert report["hours_under_threshold"] == {
+            key: round(hour["price"] * 1.1 + 5, 2)
+            for key, hour in raw_data.items()
+            if hour["price"] * 1.1 + 5 <= 300
+        }
+
+    def test_shared_settings(self, raw_data: dict):
+        reports = ProfileReports([Profile("a"), Profile("b")])
+
+        (_, first), (_, second) = reports.run(raw_data)
+
+        assert (first["name"], second["name"]) == ("a", "b")
+        assert {**first, "name": "b"} == second
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_index_matches_brute_force(self, seed: int, quarter_hour_data: dict):
+        rng = random.Random(seed)
+        day = DayRecord.from_payload(
+            quarter_hour_data if seed == 0 else generate_day(rng.choice(DAYS), rng)
+        )
+        index = DayIndex(day)
+        start = rng.randrange(0, 12)
+        first, stop = index.get_slot_range((start, rng.randrange(start + 6, 25)))
+        prices = day.prices
+        window = day.layout.get_slots(rng.randint(1, 4))
+        k = rng.randint(0, stop - first)
+        price = rng.choice(prices)
+
+        sums = [
+            (sum(prices[slot : slot + window]), slot)
+            for slot in range(first, stop - window + 1)
+        ]
+        best_sum, best_start = min(sums)
+        assert index.get_best_window(window, first, stop) == (
+            best_start,
+            pytest.approx(best_sum),
+        )
+        cheapest = sorted(range(first, stop), key=lambda slot: (prices[slot], slot))
+        assert index.get_cheapest_slots(k, first, stop) == sorted(cheapest[:k])
+        assert index.get_slots_under(price) == [
+            slot for slot in range(len(prices)) if prices[slot] <= price
+        ]
+
+    @pytest.mark.parametrize("hours", [(0, 24), (0, 12), (12, 24)])
+    def test_windows_match_domain_prices(self, hours: tuple):
+        rng = random.Random(hours[0])
+        profile = Profile("windows", windows=(2, 3, 4), hours=hours)
+        for _ in range(100):
+            raw_data = generate_day(rng.choice(DAYS), rng)
+            domain = PVPCDay(input_repo=None, output_repo=None)
+            domain.raw_data = raw_data
+            first, stop = DayIndex(domain.day).get_slot_range(hours)
+
+            ((_, report),) = ProfileReports([profile]).run(raw_data)
+
+            for hours_window in profile.windows:
+                window = domain.layout.get_slots(hours_window)
+                prices = domain.get_window_prices(
+                    window, range(first, stop - window + 1)
+                )
+                key, price = report["cheapest_windows"][f"{hours_window}h"]
+                assert price == min(prices.values()) == prices[key]
+
+    def test_short_day_window(self):
+        day = generate_day(DAYS[1], random.Random(0))
+
+        ((_, report),) = ProfileReports([Profile("night", (1,), hours=(2, 3))]).run(day)
+
+        assert report["cheapest_windows"] == {"1h": None}
+        assert report["cheapest_hours"] == {}
+
+    @pytest.mark.parametrize(
+        "profile",
+        [
+            Profile("a", hours=(5, 5)),
+            Profile("b", windows=(4,), hours=(0, 3)),
+            Profile("c", windows=(13,)),
+            Profile("d", cheapest=-1),
+            Profile("e", factor=0),
+        ],
+    )
+    def test_invalid_profile(self, profile: Profile):
+        with pytest.raises(ValueError):
+            ProfileReports([profile])
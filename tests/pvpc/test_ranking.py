@@ -0,0 +1,126 @@
+import random
+from datetime import date, timedelta
+from typing import List
+
+import pytest
+
+from benchmarks.synthetic import generate_days
+from pvpc.archive import PriceArchive
+from pvpc.ranking import PriceSelection, select
+from pvpc.record import DayRecord
+from tests.conftest import day_payload
+
+
+class TestRanking:
+    @pytest.fixture()
+    def days(self, raw_data: dict) -> List[DayRecord]:
+        start = date(2022, 1, 1)
+        return [
+            DayRecord.from_payload(day_payload(raw_data, start + timedelta(n), -n))
+            for n in range(10)
+        ]
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_select_matches_sorted(self, seed: int):
+        rng = random.Random(seed)
+        values = [rng.choice([1.5, 2.0, 3.25]) * rng.randint(0, 50) for _ in range(301)]
+
+        for k in (0, 1, 150, 299, 300):
+            assert select(values, k) == sorted(values)[k]
+
+    def test_select_out_of_bounds(self):
+        with pytest.raises(ValueError):
+            select([1.0, 2.0], 2)
+
+    def test_cheapest_and_most_expensive(self):
+        selection = PriceSelection([3.0, 1.0, 2.0, 1.0], lambda index: index)
+
+        assert selection.cheapest(3) == [(1, 1.0), (3, 1.0), (2, 2.0)]
+        assert selection.most_expensive(2) == [(0, 3.0), (2, 2.0)]
+        assert selection.cheapest(10) == selection.cheapest(4)
+        assert selection.cheapest(0) == []
+
+    def test_negative_count(self):
+        with pytest.raises(ValueError):
+            PriceSelection([1.0], str).cheapest(-1)
+
+    @pytest.mark.parametrize(
+        "percentile, expected",
+        [(0, 1.0), (25, 1.0), (50, 2.0), (75, 3.0), (100, 4.0)],
+    )
+    def test_percentile(self, percentile: float, expected: float):
+        selection = PriceSelection([4.0, 2.0, 3.0, 1.0], str)
+
+        assert selection.percentile(percentile) == expected
+
+    def test_percentile_invalid(self):
+        with pytest.raises(ValueError):
+            PriceSelection([1.0], str).percentile(101)
+        with pytest.raises(ValueError):
+            PriceSelection([], str).percentile(50)
+
+    def test_under(self):
+        selection = PriceSelection([4.0, 2.0, 3.0, 1.0], str)
+
+        assert selection.under(2.0) == [("1", 2.0), ("3", 1.0)]
+        assert selection.under_percentile(75) == selection.under(3.0)
+
+    def test_from_days(self, days: List[DayRecord]):
+        selection = PriceSelection.from_days(days)
+
+        assert len(selection) == 240
+        assert selection.cheapest(2) == [
+            ((date(2022, 1, 10), "14-15"), 244.06),
+            ((date(2022, 1, 9), "14-15"), 245.06),
+        ]
+        assert selection.most_expensive(1) == [((date(2022, 1, 1), "20-21"), 381.63)]
+
+    def test_from_days_of_any_length(
+        self, days: List[DayRecord], quarter_hour_data: dict
+    ):
+        quarter_hours = DayRecord.from_payload(quarter_hour_data)
+
+        selection = PriceSelection.from_days([quarter_hours, days[-1]])
+
+        assert len(selection) == 120
+        assert selection.most_expensive(1) == [
+            ((date(2022, 4, 29), "20:00-20:15"), 381.63)
+        ]
+        assert selection.cheapest(1) == [((date(2022, 1, 10), "14-15"), 244.06)]
+
+    def test_from_archive(self, tmp_path, days: List[DayRecord]):
+        with PriceArchive(str(tmp_path)) as archive:
+            archive.append_days(days)
+            start, end = date(2022, 1, 3), date(2022, 1, 5)
+
+            selection = PriceSelection.from_archive(archive, start, end)
+            weekday_selection = PriceSelection.from_archive(
+                archive, start, end, weekdays={0, 1, 2}
+            )
+
+            assert len(selection) == 72
+            assert selection.cheapest(5) == PriceSelection.from_days(
+                days[2:5]
+            ).cheapest(5)
+            assert selection.percentile(10) == PriceSelection.from_days(
+                days[2:5]
+            ).percentile(10)
+            assert weekday_selection.cheapest(1) == [
+                ((date(2022, 1, 5), "14-15"), 249.06)
+            ]
+
+    def test_from_archive_clock_change_days(self, tmp_path):
+        records = [
+            DayRecord.from_payload(payload)
+            for payload in generate_days(5, date(2022, 10, 28))
+        ]
+        with PriceArchive(str(tmp_path)) as archive:
+            archive.append_days(records)
+            start, end = date(2022, 10, 29), date(2022, 10, 31)
+
+            selection = PriceSelection.from_archive(archive, start, end)
+            expected = PriceSelection.from_days(records[1:4])
+
+            assert len(selection) == 24 + 25 + 24
+            assert selection.cheapest(10) == expected.cheapest(10)
+            assert selection.most_expensive(10) == expected.most_expensive(10)
@@ -0,0 +1,68 @@
+import threading
+
+from pvpc.ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+        for _ in range(3):
+            bucket.acquire()
+        assert clock.now == 0
+
+        bucket.acquire()
+        assert clock.now == 0.5
+        bucket.acquire()
+        assert clock.now == 1.0
+
+    def test_refills_while_idle(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+
+        clock.now += 10
+        bucket.acquire()
+        bucket.acquire()
+
+        assert clock.now == 10
+
+    def test_threads_share_tokens(self):
+        bucket = TokenBucket(rate=1000, capacity=5)
+        acquired = []
+
+        def worker():
+            for _ in range(10):
+                bucket.acquire()
+                acquired.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(acquired) == 40
+
+    def test_try_acquire(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        clock.now += 1
+        assert bucket.try_acquire()
+        assert clock.now == 1
@@ -0,0 +1,117 @@
+import json
+from datetime import date
+
+import pytest
+
+from pvpc.record import DayRecord, InvalidPayloadError, parse_date
+from pvpc.slots import HOURLY, SlotLayout
+
+
+def with_hour(raw_data: dict, hour_key: str, **fields) -> dict:
+    return {**raw_data, hour_key: {**raw_data[hour_key], **fields}}
+
+
+class TestRecord:
+    def test_parse_date(self):
+        assert parse_date("29-04-2022") == date(2022, 4, 29)
+
+    def test_from_json(self, raw_data: dict):
+        record = DayRecord.from_json(json.dumps(raw_data).encode())
+
+        assert record.date == "29-04-2022"
+        assert record.get_date() == date(2022, 4, 29)
+        assert record.prices[0] == 254.96
+        assert list(record.cheap_flags[:5]) == [1, 1, 1, 1, 0]
+        assert sum(record.under_avg_flags) == raw_data_under_avg(raw_data)
+
+    def test_from_payload_matches_from_json(self, raw_data: dict):
+        from_json = DayRecord.from_json(json.dumps(raw_data))
+        from_payload = DayRecord.from_payload(raw_data)
+
+        assert from_payload.prices == from_json.prices
+        assert from_payload.cheap_flags == from_json.cheap_flags
+        assert DayRecord.from_payload(from_payload) is from_payload
+
+    def test_mapping_view(self, raw_data: dict):
+        record = DayRecord.from_payload(raw_data)
+
+        assert len(record) == 24
+        assert list(record) == list(raw_data)
+        assert record["14-15"] == raw_data["14-15"]
+        assert record == raw_data
+        assert "24-25" not in record
+        assert record.get("24-25") is None
+
+    def test_is_compact(self, raw_data: dict):
+        record = DayRecord.from_payload(raw_data)
+
+        assert not hasattr(record, "__dict__")
+
+    @pytest.mark.parametrize(
+        "payload_changes",
+        [
+            lambda raw: {k: v for k, v in raw.items() if k != "13-14"},
+            lambda raw: {**raw, "24-25": raw["23-24"]},
+            lambda raw: with_hour(raw, "05-06", units="€/kWh"),
+            lambda raw: with_hour(raw, "05-06", price="270.57"),
+            lambda raw: with_hour(raw, "05-06", price=None),
+            lambda raw: with_hour(raw, "05-06", hour="06-07"),
+            lambda raw: with_hour(raw, "05-06", date="30-04-2022"),
+        ],
+        ids=[
+            "missing-hour",
+            "extra-hour",
+            "wrong-units",
+            "string-price",
+            "null-price",
+            "wrong-hour",
+            "mixed-dates",
+        ],
+    )
+    def test_invalid_payloads(self, payload_changes, raw_data: dict):
+        payload = payload_changes(raw_data)
+
+        with pytest.raises(InvalidPayloadError):
+            DayRecord.from_payload(payload)
+        with pytest.raises(InvalidPayloadError):
+            DayRecord.from_json(json.dumps(payload))
+
+    def test_quarter_hours(self, quarter_hour_data: dict):
+        record = DayRecord.from_payload(quarter_hour_data)
+
+        assert len(record) == 96
+        assert record.layout.minutes == 15
+        assert list(record) == list(quarter_hour_data)
+        assert record["14:45-15:00"]["price"] == 253.06
+
+    def test_short_day(self, raw_data: dict):
+        layout = SlotLayout.for_day(date(2022, 3, 27), 23)
+        hours = list(raw_data.values())
+        payload = {
+            key: {**hours[slot], "hour": key, "date": "27-03-2022"}
+            for slot, key in enumerate(layout.keys)
+        }
+
+        record = DayRecord.from_json(json.dumps(payload))
+
+        assert len(record) == 23
+        assert "02-03" not in record
+        assert record["03-04"]["price"] == hours[2]["price"]
+
+    @pytest.mark.parametrize("raw_date", ["27-03-2022", "30-10-2022"])
+    def test_hourly_payload_on_clock_change_day(self, raw_data: dict, raw_date: str):
+        payload = {key: {**hour, "date": raw_date} for key, hour in raw_data.items()}
+
+        record = DayRecord.from_payload(payload)
+
+        assert record.layout is HOURLY
+        assert list(record) == list(raw_data)
+
+    @pytest.mark.parametrize("payload", ["[]", "1", '{"message": "Not found"}'])
+    def test_invalid_json(self, payload: str):
+        with pytest.raises(InvalidPayloadError):
+            DayRecord.from_json(payload)
+
+
+def raw_data_under_avg(raw_data: dict) -> int:
+    return sum(hour["is-under-avg"] for hour in raw_data.values())
@@ -0,0 +1,127 @@
+from datetime import date
+
+import pytest
+
+from pvpc.domain import PVPCDay
+from pvpc.render import (
+    FORMATS,
+    HTML,
+    LANGUAGES,
+    MARKDOWN,
+    MARKDOWN_V2,
+    PLAIN,
+    Bold,
+    Field,
+    MessageRenderer,
+    Text,
+    compile_template,
+)
+
+EXPECTED_MARKDOWN_ES = (
+    "Precios de la luz para hoy:\n"
+    "\n*Las horas más baratas:*\n"
+    "00-01: 254.96 €/mWh\n"
+    "01-02: 255.29 €/mWh\n"
+    "02-03: 256.76 €/mWh\n"
+    "03-04: 258.82 €/mWh\n"
+    "14-15: 253.06 €/mWh\n"
+    "15-16: 256.81 €/mWh\n"
+    "\n\n*Periodos AM/PM más baratos:*\n"
+    "\n*AM* -> Periodo (3h) más barato:\n"
+    "00-03: 255.67 €/mWh\n"
+    "\nDetalle por hora:\n"
+    "00-01: 254.96 €/mWh\n"
+    "01-02: 255.29 €/mWh\n"
+    "02-03: 256.76 €/mWh\n"
+    "\n*PM* -> Periodo (3h) más barato:\n"
+    "14-17: 259.52 €/mWh\n"
+    "\nDetalle por hora:\n"
+    "14-15: 253.06 €/mWh\n"
+    "15-16: 256.81 €/mWh\n"
+    "16-17: 268.7 €/mWh\n"
+)
+
+
+class TestRender:
+    @pytest.fixture()
+    def processed_data(self, raw_data: dict) -> dict:
+        return PVPCDay(input_repo=None, output_repo=None).process(raw_data)
+
+    @pytest.fixture()
+    def renderer(self) -> MessageRenderer:
+        return MessageRenderer()
+
+    def test_compile_template_merges_literals(self):
+        template = (Text("title"), "\n", Bold("AM"), Field("x", "prices"), "\n")
+
+        compiled = compile_template(template, HTML, "en")
+
+        assert compiled.parts == ("Electricity prices for today:\n<b>AM</b>", "", "\n")
+        assert compiled.slots == ((1, Field("x", "prices")),)
+
+    def test_render_markdown_es(self, renderer: MessageRenderer, processed_data):
+        assert renderer.render(processed_data) == EXPECTED_MARKDOWN_ES
+
+    def test_render_markdown_v2_escapes(
+        self, renderer: MessageRenderer, processed_data
+    ):
+        message = renderer.render(processed_data, MARKDOWN_V2, "es")
+
+        assert "00\\-01: 254\\.96 €/mWh\n" in message
+        assert "*AM* \\-\\> Periodo \\(3h\\) más barato:\n" in message
+
+    def test_render_html(self, renderer: MessageRenderer, processed_data):
+        message = renderer.render(processed_data, HTML, "en")
+
+        assert message.startswith("Electricity prices for today:\n\n<b>The cheapest")
+        assert "<b>PM</b> -&gt; Cheapest (3h) period:\n14-17: 259.52" in message
+
+    def test_render_plain(self, renderer: MessageRenderer, processed_data):
+        message = renderer.render(processed_data, PLAIN, "es")
+
+        assert message == EXPECTED_MARKDOWN_ES.replace("*", "")
+
+    def test_render_all(self, renderer: MessageRenderer, processed_data):
+        messages = renderer.render_all(processed_data)
+
+        assert set(messages) == {
+            (fmt, language) for fmt in FORMATS for language in LANGUAGES
+        }
+        for (fmt, language), message in messages.items():
+            assert message == renderer.render(processed_data, fmt, language)
+
+    def test_render_all_variants(self, renderer: MessageRenderer, processed_data):
+        messages = renderer.render_all(processed_data, [(MARKDOWN, "es")])
+
+        assert messages == {(MARKDOWN, "es"): EXPECTED_MARKDOWN_ES}
+
+    def test_render_subset_of_formats(self, processed_data):
+        renderer = MessageRenderer(formats=[HTML], languages=["en"])
+
+        assert list(renderer.templates) == [(HTML, "en")]
+        with pytest.raises(KeyError):
+            renderer.render(processed_data, MARKDOWN, "es")
+
+    @pytest.mark.parametrize(
+        "day, title",
+        [
+            (None, "Precios de la luz para hoy:"),
+            (date(2022, 4, 29), "Precios de la luz para hoy:"),
+            (date(2022, 4, 30), "Precios de la luz para mañana:"),
+            (date(2022, 4, 27), "Precios de la luz para el 27\\-04\\-2022:"),
+        ],
+    )
+    def test_render_title_day(self, processed_data, day: date, title: str):
+        renderer = MessageRenderer(today=lambda: date(2022, 4, 29))
+
+        message = renderer.render(processed_data, MARKDOWN_V2, "es", day)
+
+        assert message.startswith(title + "\n")
+        assert (
+            renderer.render_all(processed_data, day=day)[(MARKDOWN_V2, "es")] == message
+        )
+
+    def test_render_zone(self, renderer: MessageRenderer, processed_data):
+        message = renderer.render({**processed_data, "zone": "CYM"})
+
+        assert message == "Ceuta y Melilla\n" + EXPECTED_MARKDOWN_ES
@@ -0,0 +1,158 @@
+import itertools
+import random
+from typing import List, Optional
+
+import pytest
+
+from pvpc.record import DayRecord
+from pvpc.scheduler import Load, LoadScheduler
+
+
+def brute_force_cost(scheduler: LoadScheduler, loads: List[Load]) -> Optional[float]:
+    best = None
+    for starts in itertools.product(*map(scheduler.get_candidates, loads)):
+        power = [0.0] * len(scheduler.prices)
+        busy = set()
+        fits = True
+        for load, (_, start) in zip(loads, starts):
+            for hour in range(start, start + load.hours):
+                power[hour] += load.power
+                if (
+                    scheduler.max_power is not None
+                    and power[hour] > scheduler.max_power
+                ):
+                    fits = False
+                if load.group is not None:
+                    fits = fits and (load.group, hour) not in busy
+                    busy.add((load.group, hour))
+        cost = sum(cost for cost, _ in starts)
+        if fits and (best is None or cost < best):
+            best = cost
+    return best
+
+
+class TestScheduler:
+    def test_independent_loads(self):
+        scheduler = LoadScheduler([300, 100, 100, 200, 50, 400])
+
+        schedule = scheduler.schedule([Load("a", 2, 1000), Load("b", 1, 2000)])
+
+        assert [placement.start for placement in schedule.placements] == [1, 4]
+        assert schedule.cost == pytest.approx(200 + 100)
+        assert schedule.placements[0].end == 3
+        assert schedule.optimal
+
+    def test_window(self):
+        scheduler = LoadScheduler([300, 100, 100, 200, 50, 400])
+
+        schedule = scheduler.schedule([Load("a", 1, 1000, earliest=2, latest=4)])
+
+        assert schedule.placements[0].start == 2
+
+    def test_group_loads_do_not_overlap(self):
+        scheduler = LoadScheduler([300, 100, 100, 200, 50, 400])
+
+        schedule = scheduler.schedule(
+            [Load("a", 2, 1000, group="plug"), Load("b", 2, 1000, group="plug")]
+        )
+
+        starts = sorted(placement.start for placement in schedule.placements)
+        assert starts == [1, 3]
+        assert schedule.cost == pytest.approx(200 + 250)
+
+    def test_max_power(self):
+        scheduler = LoadScheduler([300, 100, 100, 200, 50, 400], max_power=3)
+
+        schedule = scheduler.schedule([Load("a", 1, 2), Load("b", 1, 2)])
+
+        assert sorted(placement.start for placement in schedule.placements) == [1, 4]
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_brute_force(self, seed: int):
+        rng = random.Random(seed)
+        scheduler = LoadScheduler(
+            [rng.choice([100, 150, 200, 250]) for _ in range(10)],
+            max_power=rng.choice([None, 3, 4]),
+        )
+        loads = [
+            Load(
+                str(n),
+                rng.randint(1, 3),
+                rng.choice([1, 2]),
+                group=rng.choice([None, "a"]),
+            )
+            for n in range(4)
+        ]
+
+        expected = brute_force_cost(scheduler, loads)
+
+        if expected is None:
+            with pytest.raises(ValueError):
+                scheduler.schedule(loads)
+        else:
+            assert scheduler.schedule(loads).cost == pytest.approx(expected)
+
+    def test_infeasible(self):
+        scheduler = LoadScheduler([100, 200, 300])
+
+        with pytest.raises(ValueError):
+            scheduler.schedule([Load("a", 2, 1, group="g"), Load("b", 2, 1, group="g")])
+
+    @pytest.mark.parametrize(
+        "load",
+        [Load("a", 0, 1), Load("b", 1, -1), Load("c", 4, 1), Load("d", 2, 1, 2, 3)],
+    )
+    def test_invalid_load(self, load: Load):
+        with pytest.raises(ValueError):
+            LoadScheduler([100, 200, 300]).schedule([load])
+
+    def test_over_max_power(self):
+        with pytest.raises(ValueError):
+            LoadScheduler([100, 200], max_power=1).schedule([Load("a", 1, 2)])
+
+    def test_time_budget(self):
+        ticks = itertools.count()
+        rng = random.Random(0)
+        scheduler = LoadScheduler(
+            [rng.uniform(100, 300) for _ in range(48)],
+            time_budget=1,
+            clock=lambda: next(ticks),
+        )
+        loads = [Load(str(n), rng.randint(1, 4), 1, group="g") for n in range(12)]
+
+        schedule = scheduler.schedule(loads)
+
+        assert not schedule.optimal
+        assert len(schedule.placements) == 12
+
+    def test_gap(self):
+        rng = random.Random(1)
+        prices = [rng.uniform(100, 300) for _ in range(48)]
+        loads = [
+            Load(str(n), rng.randint(1, 4), rng.uniform(0.5, 2)) for n in range(10)
+        ]
+
+        exact = LoadScheduler(prices, max_power=4).schedule(loads)
+        within_gap = LoadScheduler(prices, max_power=4, gap=0.05).schedule(loads)
+
+        assert within_gap.optimal
+        assert within_gap.cost <= exact.cost * 1.05
+
+    def test_from_days(self, raw_data: dict):
+        day = DayRecord.from_payload(raw_data)
+        scheduler = LoadScheduler.from_days([day, day])
+
+        schedule = scheduler.schedule([Load("a", 3, 1, earliest=20)])
+
+        assert len(scheduler.prices) == 48
+        assert schedule.placements[0].start == 24
+
+    def test_from_quarter_hour_days(self, quarter_hour_data: dict):
+        day = DayRecord.from_payload(quarter_hour_data)
+        scheduler = LoadScheduler.from_days([day])
+
+        schedule = scheduler.schedule([Load("a", 3, 1)])
+
+        assert len(scheduler.prices) == 24
+        assert schedule.placements[0].start == 0
+        assert schedule.cost == pytest.approx(0.76701)
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import threading
+from datetime import date
+from typing import List, Tuple
+
+import pytest
+
+from pvpc import service as service_module
+from pvpc.domain import PVPCDay
+from pvpc.service import CachedDay, DayCache, ReportService
+
+TODAY = date(2022, 4, 29)
+
+
+class FakeLoader:
+    def __init__(self, raw_data: dict) -> None:
+        self.raw_data = raw_data
+        self.loads: List[date] = []
+        self.published = {TODAY}
+
+    def __call__(self, day: date) -> dict:
+        self.loads.append(day)
+        if day not in self.published:
+            raise LookupError(day.isoformat())
+        return self.raw_data
+
+
+class TestReportService:
+    @pytest.fixture()
+    def loader(self, raw_data: dict) -> FakeLoader:
+        return FakeLoader(raw_data)
+
+    @pytest.fixture()
+    def service(self, loader: FakeLoader) -> ReportService:
+        return ReportService(DayCache(loader, capacity=2), today=lambda: TODAY)
+
+    def get(self, service: ReportService, target: str) -> Tuple[int, object]:
+        status, body = asyncio.run(service.handle(target))
+        return status, json.loads(body)
+
+    def test_report(self, service: ReportService, raw_data: dict):
+        processed = PVPCDay(input_repo=None, output_repo=None).process(raw_data)
+
+        status, report = self.get(service, "/report/today")
+
+        assert status == 200
+        assert report["date"] == "29-04-2022"
+        assert report["am_cheapest_3h_period"] == list(
+            processed["am_cheapest_3h_period"]
+        )
+        assert self.get(service, "/report/2022-04-29") == (200, report)
+
+    def test_window(self, service: ReportService):
+        status, window = self.get(service, "/windows/today?hours=3&start=12")
+
+        assert status == 200
+        assert window == {
+            "date": "29-04-2022",
+            "hours": 3,
+            "window": "14-17",
+            "price": 259.52,
+        }
+
+    def test_ranked(self, service: ReportService, raw_data: dict):
+        by_price = sorted(raw_data, key=lambda key: raw_data[key]["price"])
+
+        _, cheapest = self.get(service, "/cheapest/today?k=3")
+        _, expensive = self.get(service, "/most-expensive/today?k=2")
+
+        assert [key for key, _ in cheapest["prices"]] == by_price[:3]
+        assert [key for key, _ in expensive["prices"]] == by_price[::-1][:2]
+
+    @pytest.mark.parametrize(
+        "target, status",
+        [
+            ("/unknown/today", 404),
+            ("/report", 404),
+            ("/report/yesterday", 400),
+            ("/report/2022-04-30", 404),
+            ("/windows/today?hours=13", 400),
+            ("/windows/today?hours=3&start=22", 400),
+            ("/cheapest/today?k=-1", 400),
+            ("/cheapest/today?start=5&stop=5", 400),
+        ],
+    )
+    def test_errors(self, service: ReportService, target: str, status: int):
+        assert self.get(service, target)[0] == status
+
+    def test_load_failure(self, loader: FakeLoader, raw_data: dict):
+        def load_day(day: date) -> dict:
+            raise ConnectionError("down")
+
+        service = ReportService(DayCache(load_day), today=lambda: TODAY)
+
+        assert self.get(service, "/report/today")[0] == 503
+
+    def test_cache(self, loader: FakeLoader, service: ReportService):
+        loader.published |= {date(2022, 4, 27), date(2022, 4, 28)}
+
+        async def requests():
+            await asyncio.gather(*(service.handle("/report/today") for _ in range(5)))
+            await service.handle("/report/2022-04-28")
+            await service.handle("/report/today")
+            await service.handle("/report/2022-04-27")
+
+        asyncio.run(requests())
+
+        assert loader.loads == [TODAY, date(2022, 4, 28), date(2022, 4, 27)]
+        assert list(service.cache.days) == [TODAY, date(2022, 4, 27)]
+
+    def test_refresh(self, loader: FakeLoader, service: ReportService):
+        assert asyncio.run(service.refresh()) == [TODAY]
+
+        loader.published.add(date(2022, 4, 30))
+
+        assert asyncio.run(service.refresh()) == [date(2022, 4, 30)]
+        assert asyncio.run(service.refresh()) == []
+        assert self.get(service, "/report/tomorrow")[0] == 200
+
+    def test_missing_day_is_remembered(self, loader: FakeLoader):
+        now = [0.0]
+        cache = DayCache(loader, missing_ttl=60, clock=lambda: now[0])
+        service = ReportService(cache, today=lambda: TODAY)
+
+        assert self.get(service, "/report/tomorrow")[0] == 404
+        assert self.get(service, "/report/tomorrow")[0] == 404
+        assert loader.loads == [date(2022, 4, 30)]
+
+        loader.published.add(date(2022, 4, 30))
+        now[0] = 61
+
+        assert self.get(service, "/report/tomorrow")[0] == 200
+        assert loader.loads == [date(2022, 4, 30)] * 2
+
+    def test_invalid_day_is_unavailable(self, loader: FakeLoader, raw_data: dict):
+        now = [0.0]
+        cache = DayCache(loader, missing_ttl=60, clock=lambda: now[0])
+        service = ReportService(cache, today=lambda: TODAY)
+        # Published, but not every hour yet.
+        loader.raw_data = dict(list(raw_data.items())[:20])
+
+        assert self.get(service, "/report/today")[0] == 503
+        assert self.get(service, "/report/today")[0] == 503
+        assert loader.loads == [TODAY]
+
+        loader.raw_data = raw_data
+        now[0] = 61
+
+        assert self.get(service, "/report/today")[0] == 200
+
+    def test_refresh_picks_up_corrections(
+        self, loader: FakeLoader, service: ReportService, raw_data: dict
+    ):
+        asyncio.run(service.refresh())
+        loader.raw_data = {
+            key: {**hour, "price": hour["price"] - 100}
+            for key, hour in raw_data.items()
+        }
+
+        assert asyncio.run(service.refresh()) == [TODAY]
+        _, report = self.get(service, "/cheapest/today?k=1")
+        assert report["prices"] == [["14-15", 153.06]]
+
+    def test_days_built_off_the_event_loop(self, monkeypatch, loader: FakeLoader):
+        threads = []
+
+        class TrackedDay(CachedDay):
+            def __init__(self, raw_data: dict) -> None:
+                threads.append(threading.current_thread())
+                super().__init__(raw_data)
+
+        monkeypatch.setattr(service_module, "CachedDay", TrackedDay)
+        service = ReportService(DayCache(loader), today=lambda: TODAY)
+
+        assert self.get(service, "/report/today")[0] == 200
+        assert threads and threading.main_thread() not in threads
+
+    def test_http(self, service: ReportService):
+        async def exchange() -> List[bytes]:
+            server = await asyncio.start_server(
+                service.handle_connection, "127.0.0.1", 0
+            )
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                b"GET /windows/today?hours=1 HTTP/1.1\r\nHost: test\r\n\r\n"
+                b"GET /report/nowhere HTTP/1.1\r\nConnection: close\r\n\r\n"
+            )
+            responses = await reader.read()
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return responses.split(b"HTTP/1.1 ")[1:]
+
+        first, second = asyncio.run(exchange())
+
+        assert first.startswith(b"200 OK\r\n")
+        assert b"Connection: keep-alive" in first
+        assert first.endswith(b'"window": "14-15", "price": 253.06}')
+        assert second.startswith(b"400 Bad Request\r\n")
+        assert b"Connection: close" in second
@@ -0,0 +1,135 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from pvpc.record import HOUR_KEYS
+from pvpc.slots import (
+    HOURLY,
+    SlotLayout,
+    from_spanish_time,
+    get_day_minutes,
+    get_last_sunday,
+    get_spanish_today,
+    to_spanish_time,
+)
+
+
+class TestSlots:
+    @pytest.mark.parametrize(
+        "year, month, expected",
+        [
+            (2022, 3, date(2022, 3, 27)),
+            (2022, 10, date(2022, 10, 30)),
+            (2023, 3, date(2023, 3, 26)),
+            (2024, 12, date(2024, 12, 29)),
+            (2027, 10, date(2027, 10, 31)),
+        ],
+    )
+    def test_get_last_sunday(self, year: int, month: int, expected: date):
+        assert get_last_sunday(year, month) == expected
+
+    @pytest.mark.parametrize(
+        "day, expected",
+        [
+            (date(2022, 3, 27), 23 * 60),
+            (date(2022, 3, 20), 24 * 60),
+            (date(2022, 10, 30), 25 * 60),
+            (date(2022, 4, 29), 24 * 60),
+        ],
+    )
+    def test_get_day_minutes(self, day: date, expected: int):
+        assert get_day_minutes(day) == expected
+
+    @pytest.mark.parametrize(
+        "utc, wall_time",
+        [
+            (datetime(2022, 1, 5, 19, 15), datetime(2022, 1, 5, 20, 15)),
+            (datetime(2022, 4, 28, 18, 15), datetime(2022, 4, 28, 20, 15)),
+            (datetime(2022, 3, 27, 0, 59), datetime(2022, 3, 27, 1, 59)),
+            (datetime(2022, 3, 27, 1, 0), datetime(2022, 3, 27, 3, 0)),
+            (datetime(2022, 10, 30, 0, 30), datetime(2022, 10, 30, 2, 30)),
+            (datetime(2022, 10, 30, 2, 0), datetime(2022, 10, 30, 3, 0)),
+        ],
+    )
+    def test_spanish_time(self, utc: datetime, wall_time: datetime):
+        utc = utc.replace(tzinfo=timezone.utc)
+
+        assert to_spanish_time(utc) == wall_time
+        assert from_spanish_time(wall_time) == utc
+
+    def test_skipped_spanish_time(self):
+        utc = from_spanish_time(datetime(2022, 3, 27, 2, 30))
+
+        assert to_spanish_time(utc) == datetime(2022, 3, 27, 3, 30)
+
+    def test_get_spanish_today(self):
+        now = datetime(2022, 4, 28, 23, 15, tzinfo=timezone.utc)
+
+        assert get_spanish_today(lambda: now) == date(2022, 4, 29)
+
+    def test_hourly_keys(self):
+        assert HOURLY.keys == HOUR_KEYS
+        assert HOURLY.count == 24
+        assert SlotLayout.for_day(date(2022, 4, 29), 24) is HOURLY
+
+    def test_quarter_hour_keys(self):
+        layout = SlotLayout.for_day(date(2022, 4, 29), 96)
+
+        assert layout.count == 96
+        assert layout.slots_per_hour == 4
+        assert layout.keys[:2] == ("00:00-00:15", "00:15-00:30")
+        assert layout.keys[-1] == "23:45-24:00"
+        assert layout.get_window_key(4, 16) == "01:00-04:00"
+
+    def test_short_day_keys(self):
+        layout = SlotLayout.for_day(date(2022, 3, 27), 23)
+
+        assert layout.keys[:3] == ("00-01", "01-02", "03-04")
+        assert layout.keys[-1] == "23-24"
+        assert layout.get_window_key(1, 3) == "01-04"
+
+    def test_long_day_keys(self):
+        layout = SlotLayout.for_day(date(2022, 10, 30), 100)
+
+        assert layout.count == 100
+        assert layout.keys[8:16] == (
+            "02:00-02:15",
+            "02:15-02:30",
+            "02:30-02:45",
+            "02:45-03:00",
+            "02:00-02:15b",
+            "02:15-02:30b",
+            "02:30-02:45b",
+            "02:45-03:00b",
+        )
+        assert layout.keys[-1] == "23:45-24:00"
+        assert len(set(layout.keys)) == 100
+
+    @pytest.mark.parametrize(
+        "day, count",
+        [(date(2022, 4, 29), 25), (date(2022, 3, 27), 25), (date(2022, 4, 29), 48)],
+    )
+    def test_uneven_slots(self, day: date, count: int):
+        with pytest.raises(ValueError):
+            SlotLayout.for_day(day, count)
+
+    @pytest.mark.parametrize("day", [date(2022, 3, 27), date(2022, 10, 30)])
+    def test_regular_slots_on_clock_change_days(self, day: date):
+        assert SlotLayout.for_day(day, 24) is HOURLY
+        assert SlotLayout.for_day(day, 96) is SlotLayout.for_day(date(2022, 4, 29), 96)
+
+    def test_get_start_slots(self):
+        assert HOURLY.get_start_slots(range(10), 3) == range(10)
+        assert HOURLY.get_start_slots(range(12, 22), 3) == range(12, 22)
+        assert HOURLY.get_start_slots(range(12, 24), 3) == range(12, 22)
+
+        short_day = SlotLayout.for_day(date(2022, 3, 27), 23)
+        assert short_day.get_start_slots(range(10), 3) == range(9)
+
+        quarter_hours = SlotLayout.for_day(date(2022, 4, 29), 96)
+        assert quarter_hours.get_start_slots(range(12, 22), 12) == range(48, 85)
+
+    def test_to_hourly(self):
+        layout = SlotLayout.for_day(date(2022, 4, 29), 96)
+
+        assert layout.to_hourly([1.0, 2.0, 3.0, 4.0] * 24) == [2.5] * 24
@@ -0,0 +1,143 @@
+import random
+import statistics
+from datetime import date
+from typing import List
+
+import pytest
+
+from benchmarks.synthetic import generate_days
+from pvpc.domain import PVPCDay
+from pvpc.record import DayRecord
+from pvpc.stats import (
+    P2Quantile,
+    PriceStatistics,
+    RunningMoments,
+    StatisticsStore,
+)
+
+
+class TestRunningMoments:
+    def test_matches_statistics(self):
+        rng = random.Random(0)
+        values = [rng.uniform(50, 300) for _ in range(1000)]
+        moments = RunningMoments()
+
+        for value in values:
+            moments.add(value)
+
+        assert moments.count == 1000
+        assert moments.mean == pytest.approx(statistics.fmean(values))
+        assert moments.variance == pytest.approx(statistics.variance(values))
+
+
+class TestP2Quantile:
+    @pytest.mark.parametrize("quantile", [0.1, 0.5, 0.9])
+    def test_estimates_quantile(self, quantile: float):
+        rng = random.Random(1)
+        values = [rng.gauss(150, 40) for _ in range(5000)]
+        estimate = P2Quantile(quantile)
+
+        for value in values:
+            estimate.add(value)
+
+        exact = sorted(values)[int(quantile * len(values))]
+        assert estimate.value == pytest.approx(exact, abs=3)
+        assert len(estimate.heights) == 5
+
+    def test_few_values(self):
+        estimate = P2Quantile(0.5)
+        assert estimate.value is None
+
+        for value in [3, 1, 2]:
+            estimate.add(value)
+
+        assert estimate.value == 2
+
+    def test_invalid_quantile(self):
+        with pytest.raises(ValueError):
+            P2Quantile(1)
+
+
+class TestPriceStatistics:
+    @pytest.fixture()
+    def days(self) -> List[DayRecord]:
+        return [DayRecord.from_payload(day) for day in generate_days(120, seed=2)]
+
+    def test_add_day_skips_replayed_days(self, days: List[DayRecord]):
+        stats = PriceStatistics()
+
+        assert stats.add_day(days[1])
+        assert not stats.add_day(days[1])
+        assert not stats.add_day(days[0])
+        assert stats.daily.moments.count == 1
+
+    def test_rolling_window(self, days: List[DayRecord]):
+        stats = PriceStatistics()
+        for day in days[:60]:
+            stats.add_day(day)
+
+        averages = [statistics.fmean(day.prices) for day in days[30:60]]
+        comparison = stats.compare(days[60])
+
+        assert len(stats.window) == 30
+        assert comparison["median_30d"] == round(statistics.median(averages), 2)
+        assert comparison["mean_30d"] == round(statistics.fmean(averages), 2)
+        assert comparison["cheapest_day_30d"] == (
+            statistics.fmean(days[60].prices) < min(averages)
+        )
+
+    def test_compare_without_history(self, days: List[DayRecord]):
+        comparison = PriceStatistics().compare(days[0])
+
+        assert comparison["median_30d"] is None
+        assert comparison["weekday_mean"] is None
+        assert not comparison["cheapest_weekday_30d"]
+        assert comparison["cheaper_than_usual"] == []
+
+    def test_cheaper_than_usual(self, raw_data: dict):
+        day = DayRecord.from_payload(raw_data)
+        expensive = DayRecord(
+            "28-04-2022",
+            [price * 2 for price in day.prices],
+            day.cheap_flags,
+            day.under_avg_flags,
+        )
+        stats = PriceStatistics()
+        stats.add_day(expensive)
+
+        comparison = stats.compare(day)
+
+        assert comparison["cheaper_than_usual"] == list(day.layout.keys)
+        assert comparison["cheapest_day_30d"]
+        assert comparison["vs_median_30d"] == -50
+
+    def test_store_roundtrip(self, days: List[DayRecord], tmp_path):
+        store = StatisticsStore(str(tmp_path / "stats.json"))
+        continuous = PriceStatistics()
+        for day in days[:100]:
+            continuous.add_day(day)
+        store.save(continuous)
+
+        restored = store.load()
+        for day in days[100:]:
+            continuous.add_day(day)
+            restored.add_day(day)
+
+        assert restored.to_dict() == continuous.to_dict()
+        assert restored.last_date == days[-1].get_date()
+        assert (tmp_path / "stats.json").stat().st_size < 8192
+
+    def test_store_missing_file(self, tmp_path):
+        stats = StatisticsStore(str(tmp_path / "stats.json")).load()
+
+        assert stats.last_date is None
+
+    def test_domain_comparison(self, raw_data: dict):
+        stats = PriceStatistics()
+        domain = PVPCDay(input_repo=None, output_repo=None, statistics=stats)
+
+        processed = domain.process(raw_data)
+
+        assert processed["price_comparison"]["median_30d"] is None
+        assert stats.last_date == date(2022, 4, 29)
+        assert "price_comparison" not in PVPCDay(None, None).process(raw_data)
@@ -0,0 +1,93 @@
+import pytest
+import requests
+import requests_mock
+
+from pvpc.transport import HTTPTransport
+
+URL = "https://api.example.org/prices"
+
+
+class TestTransport:
+    @pytest.fixture()
+    def sleeps(self) -> list:
+        return []
+
+    @pytest.fixture()
+    def transport(self, sleeps: list) -> HTTPTransport:
+        return HTTPTransport(
+            retries=2, backoff=0.5, max_backoff=1, sleep=sleeps.append, jitter=lambda: 1
+        )
+
+    def test_get_success(self, transport: HTTPTransport, sleeps: list):
+        with requests_mock.Mocker() as mock:
+            mock.get(URL, json={})
+            response = transport.get(URL)
+
+        assert response.status_code == 200
+        assert sleeps == []
+        assert len(transport.metrics) == 1
+        assert transport.metrics[0].status == 200
+        assert transport.metrics[0].latency >= 0
+        assert mock.request_history[0].timeout == (3.05, 10)
+
+    def test_get_retries_server_errors(self, transport: HTTPTransport, sleeps: list):
+        with requests_mock.Mocker() as mock:
+            mock.get(URL, [{"status_code": 503}, {"status_code": 429}, {"json": {}}])
+            response = transport.get(URL)
+
+        assert response.status_code == 200
+        assert sleeps == [0.5, 1]
+        assert [metric.status for metric in transport.metrics] == [503, 429, 200]
+        assert [metric.attempt for metric in transport.metrics] == [0, 1, 2]
+
+    def test_get_returns_last_error_response(self, transport: HTTPTransport):
+        with requests_mock.Mocker() as mock:
+            mock.get(URL, status_code=500)
+            response = transport.get(URL)
+
+        assert response.status_code == 500
+        assert mock.call_count == 3
+
+    def test_get_does_not_retry_client_errors(self, transport: HTTPTransport):
+        with requests_mock.Mocker() as mock:
+            mock.get(URL, status_code=404)
+            response = transport.get(URL)
+
+        assert response.status_code == 404
+        assert mock.call_count == 1
+
+    def test_get_retries_connection_errors(
+        self, transport: HTTPTransport, sleeps: list
+    ):
+        with requests_mock.Mocker() as mock:
+            mock.get(URL, exc=requests.ConnectTimeout)
+            with pytest.raises(requests.ConnectTimeout):
+                transport.get(URL)
+
+        assert mock.call_count == 3
+        assert len(sleeps) == 2
+        assert {metric.error for metric in transport.metrics} == {"ConnectTimeout"}
+
+    def test_metrics_keep_the_last_attempts(self):
+        transport = HTTPTransport(retries=0, max_metrics=2)
+
+        with requests_mock.Mocker() as mock:
+            mock.get(URL, [{"status_code": status} for status in (200, 201, 202)])
+            for _ in range(3):
+                transport.get(URL)
+
+        assert [metric.status for metric in transport.metrics] == [201, 202]
+
+    @pytest.mark.parametrize(
+        "attempt, jitter, expected",
+        [(0, 1, 0.5), (1, 1, 1), (2, 1, 2), (10, 1, 10), (3, 0.5, 2)],
+    )
+    def test_get_backoff(self, attempt: int, jitter: float, expected: float):
+        transport = HTTPTransport(backoff=0.5, max_backoff=10, jitter=lambda: jitter)
+
+        assert transport.get_backoff(attempt) == expected
+
+    def test_session_pool(self):
+        transport = HTTPTransport(pool_size=4)
+
+        assert transport.session.get_adapter(URL)._pool_maxsize == 4
@@ -0,0 +1,147 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+import pytest
+
+from pvpc.port import InputPort
+from pvpc.watcher import PublicationWatcher
+
+DAY = date(2022, 4, 29)
+# 20:15 in Spain, on summer time.
+PUBLICATION = datetime(2022, 4, 28, 18, 15, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += timedelta(seconds=seconds)
+
+
+class SequenceAdapter(InputPort):
+    """Answers each poll with the next outcome, repeating the last one."""
+
+    def __init__(self, outcomes: list) -> None:
+        self.outcomes = outcomes
+        self.calls = 0
+
+    def get_raw_data(self) -> dict:
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def with_date(raw_data: dict, raw_date: str) -> dict:
+    return {key: {**hour, "date": raw_date} for key, hour in raw_data.items()}
+
+
+def make_watcher(clock: FakeClock, adapter: InputPort, **kwargs) -> PublicationWatcher:
+    return PublicationWatcher(
+        DAY,
+        lambda day: adapter,
+        min_interval=60,
+        max_interval=600,
+        now=clock,
+        sleep=clock.sleep,
+        **kwargs,
+    )
+
+
+class TestPublicationWatcher:
+    def test_waits_for_publication(self, raw_data: dict):
+        clock = FakeClock(datetime(2022, 4, 28, 16, 0, tzinfo=timezone.utc))
+        adapter = SequenceAdapter([raw_data])
+
+        record = make_watcher(clock, adapter).get_raw_data()
+
+        assert record.get_date() == DAY
+        assert clock.sleeps == [2.25 * 3600]
+        assert adapter.calls == 1
+
+    def test_backs_off_while_unchanged(self, raw_data: dict):
+        clock = FakeClock(PUBLICATION)
+        missing = LookupError("404")
+        adapter = SequenceAdapter([missing] * 5 + [raw_data])
+
+        watcher = make_watcher(clock, adapter)
+        watcher.get_raw_data()
+
+        assert clock.sleeps == [60, 120, 240, 480, 600]
+        assert watcher.polls == 6
+
+    def test_change_resets_backoff(self, raw_data: dict):
+        clock = FakeClock(PUBLICATION)
+        partial = dict(list(raw_data.items())[:20])
+        stale = with_date(raw_data, "28-04-2022")
+        adapter = SequenceAdapter(
+            [LookupError("404"), LookupError("404"), stale, partial, partial, raw_data]
+        )
+
+        make_watcher(clock, adapter).get_raw_data()
+
+        assert clock.sleeps == [60, 120, 60, 60, 120]
+
+    def test_publication_in_winter(self, raw_data: dict):
+        clock = FakeClock(datetime(2022, 1, 4, 18, 0, tzinfo=timezone.utc))
+        adapter = SequenceAdapter([with_date(raw_data, "05-01-2022")])
+        watcher = make_watcher(clock, adapter)
+        watcher.day = date(2022, 1, 5)
+
+        watcher.get_raw_data()
+
+        # 20:15 in Spain is 19:15 UTC on standard time.
+        assert clock.sleeps == [1.25 * 3600]
+
+    def test_programming_errors_fail(self):
+        clock = FakeClock(PUBLICATION)
+        adapter = SequenceAdapter([TypeError("bug")])
+
+        with pytest.raises(TypeError):
+            make_watcher(clock, adapter).get_raw_data()
+
+        assert adapter.calls == 1
+
+    def test_timeout(self):
+        clock = FakeClock(PUBLICATION)
+        adapter = SequenceAdapter([LookupError("404")])
+
+        with pytest.raises(TimeoutError, match="404"):
+            make_watcher(clock, adapter, timeout=3600).get_raw_data()
+
+        assert clock.now == PUBLICATION + timedelta(hours=1)
+        # The last poll is at the deadline.
+        assert adapter.calls == 10
+
+    def test_conditional_polls(self, tmp_path):
+        from benchmarks.fake_api import FakeAPIServer
+        from pvpc.cache import ResponseCache
+        from pvpc.http_adapter import PrecioLuzInputAdapter
+        from pvpc.transport import HTTPTransport
+
+        clock = FakeClock(PUBLICATION)
+        cache = ResponseCache(str(tmp_path), ttl=0)
+
+        with FakeAPIServer() as server:
+
+            def get_adapter(day: date) -> InputPort:
+                return PrecioLuzInputAdapter(
+                    cache=cache,
+                    day=day,
+                    transport=HTTPTransport(retries=0),
+                    base_endpoint=server.base_endpoint,
+                )
+
+            first = PublicationWatcher(DAY, get_adapter, now=clock, sleep=clock.sleep)
+            second = PublicationWatcher(DAY, get_adapter, now=clock, sleep=clock.sleep)
+            assert first.get_raw_data() == second.get_raw_data()
+            stats = server.stats
+
+        assert (stats.served, stats.not_modified) == (1, 1)
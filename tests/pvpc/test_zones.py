@@ -0,0 +1,46 @@
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from pvpc.port import AsyncInputPort, OutputPort
+from pvpc.zones import PVPCZones
+
+
+class DictAsyncInputAdapter(AsyncInputPort):
+    def __init__(self, raw_days: dict) -> None:
+        self.raw_days = raw_days
+
+    async def get_raw_days(self) -> Dict[Tuple[str, Optional[date]], dict]:
+        return self.raw_days
+
+
+class ListOutputAdapter(OutputPort):
+    def __init__(self) -> None:
+        self.posted = []
+
+    def post_processed_data(self, data: dict):
+        self.posted.append(data)
+
+
+class TestZones:
+    def test_run(self, raw_data: dict):
+        cheaper = {
+            hour_key: {**hour, "price": hour["price"] - 100}
+            for hour_key, hour in raw_data.items()
+        }
+        input_repo = DictAsyncInputAdapter(
+            {("PCB", None): raw_data, ("CYM", None): cheaper}
+        )
+        output_repos = {"PCB": ListOutputAdapter(), "CYM": ListOutputAdapter()}
+
+        processed_days = PVPCZones(input_repo, output_repos).run()
+
+        assert set(processed_days) == {("PCB", None), ("CYM", None)}
+        assert output_repos["PCB"].posted[0]["am_cheapest_3h_period"] == (
+            "00-03",
+            255.67,
+        )
+        assert output_repos["CYM"].posted[0]["am_cheapest_3h_period"] == (
+            "00-03",
+            155.67,
+        )
+        assert output_repos["CYM"].posted[0]["zone"] == "CYM"
@@ -0,0 +1,156 @@
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+import pytest
+import requests_mock
+
+from main import dry_run, get_watch_day, parse_args, run
+from pvpc.http_adapter import PrecioLuzInputAdapter
+from tests.conftest import DAILY_SAMPLE_PATH
+
+# Import time budgets, in seconds, generous enough for a cold CI runner. They
+# cover what the scheduled job imports on top of the interpreter's own startup.
+DOMAIN_IMPORT_BUDGET = 0.1
+DRY_RUN_IMPORT_BUDGET = 0.25
+
+
+def import_times(args: List[str]) -> Dict[str, Tuple[int, float]]:
+    """Nesting level and cumulative seconds of every module imported, as
+    reported by `-X importtime`, after the interpreter's own startup ones."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 0 and name.strip() == "site":
+            times.clear()
+        else:
+            times[name.strip()] = (level, int(cumulative) / 1e6)
+    return times
+
+
+def top_level_time(times: Dict[str, Tuple[int, float]]) -> float:
+    return sum(seconds for level, seconds in times.values() if level == 0)
+
+
+class TestMain:
+    def test_dry_run(self, capsys):
+        run(parse_args(["--dry-run", "--input", DAILY_SAMPLE_PATH]))
+
+        message = capsys.readouterr().out
+        assert message.startswith("Precios de la luz para hoy:\n")
+        assert "00-01: 254.96 €/mWh\n" in message
+
+    def test_dry_run_tomorrow(self, capsys):
+        dry_run(DAILY_SAMPLE_PATH, watch_day=get_watch_day("tomorrow"))
+
+        assert capsys.readouterr().out.startswith("Precios de la luz para mañana:\n")
+
+    def test_requires_token_and_channel(self):
+        with pytest.raises(SystemExit):
+            parse_args(["--input", DAILY_SAMPLE_PATH])
+
+    @pytest.mark.parametrize(
+        "sources, expected",
+        [
+            (["days"], [(None, "days")]),
+            (["PCB=days/year=2022"], [("PCB", "days/year=2022")]),
+            (["PCB=pcb.ndjson", "CYM=cym"], [("PCB", "pcb.ndjson"), ("CYM", "cym")]),
+        ],
+    )
+    def test_batch_sources(
+        self, monkeypatch, tmp_path, sources: List[str], expected: list
+    ):
+        monkeypatch.chdir(tmp_path)
+        for _, path in expected:
+            if path.endswith(".ndjson"):
+                (tmp_path / path).touch()
+            else:
+                (tmp_path / path).mkdir(parents=True)
+        args = [arg for source in sources for arg in ("--batch", source)]
+
+        assert parse_args(args).batch == expected
+
+    @pytest.mark.parametrize(
+        "sources",
+        [["=days"], ["PCB="], ["days", "CYM=cym"], ["PCB=pcb", "PCB=other"]],
+    )
+    def test_invalid_batch_sources(self, sources: List[str]):
+        args = [arg for source in sources for arg in ("--batch", source)]
+
+        with pytest.raises(SystemExit):
+            parse_args(args)
+
+    @pytest.mark.parametrize("source", [DAILY_SAMPLE_PATH, "/nonexistent/dir"])
+    def test_batch_source_must_exist(self, source: str):
+        with pytest.raises(SystemExit):
+            parse_args(["--batch", source])
+
+    def test_dry_run_zones(self, capsys, raw_data: dict):
+        with requests_mock.Mocker() as mock:
+            mock.get(f"{PrecioLuzInputAdapter.base_endpoint}?zone=PCB", json=raw_data)
+            mock.get(f"{PrecioLuzInputAdapter.base_endpoint}?zone=CYM", json=raw_data)
+            run(parse_args(["--dry-run", "--zones", "PCB,CYM"]))
+
+        out = capsys.readouterr().out
+        assert out.startswith("Península, Canarias y Baleares\nPrecios de la luz")
+        assert "\nCeuta y Melilla\nPrecios de la luz para hoy:\n" in out
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            ["--zones", "PCB,XYZ"],
+            ["--zones", "PCB,PCB"],
+            ["--zones", "PCB,CYM", "--input", DAILY_SAMPLE_PATH],
+            ["--zones", "PCB,CYM", "--watch"],
+        ],
+    )
+    def test_invalid_zones(self, args: List[str]):
+        with pytest.raises(SystemExit):
+            parse_args(["--dry-run", *args])
+
+    def test_export_day(self, tmp_path):
+        path = str(tmp_path / "summary.csv")
+        args = ["--input", DAILY_SAMPLE_PATH, "--export-table", "summary"]
+
+        run(parse_args([*args, "--output", path]))
+        run(parse_args([*args, "--output", path, "--append"]))
+
+        with open(path) as export_file:
+            lines = export_file.read().splitlines()
+        assert len(lines) == 3
+        assert lines[1].startswith(",29-04-2022,00-03,255.67,")
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            ["--export-format", "csv"],
+            ["--export-table", "prices", "--dry-run"],
+            ["--export-table", "prices", "--serve", "8080"],
+            ["--export-table", "prices", "--zones", "PCB,CYM"],
+        ],
+    )
+    def test_invalid_export(self, args: List[str]):
+        with pytest.raises(SystemExit):
+            parse_args(args)
+
+    def test_domain_import_budget(self):
+        times = import_times(["-c", "import pvpc.domain"])
+
+        assert "requests" not in times
+        assert "telegram" not in times
+        assert top_level_time(times) < DOMAIN_IMPORT_BUDGET
+
+    def test_dry_run_import_budget(self):
+        times = import_times(["main.py", "--dry-run", "--input", DAILY_SAMPLE_PATH])
+
+        assert "requests" not in times
+        assert "telegram" not in times
+        assert "pvpc.parallel" not in times
+        assert top_level_time(times) < DRY_RUN_IMPORT_BUDGET